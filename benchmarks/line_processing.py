@@ -0,0 +1,81 @@
+"""
+Time how long line processors take per line, on a large generated file.
+
+Run with the package installed: `python benchmarks/line_processing.py`
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import docker, gha
+from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.network import offline
+from pre_commit_hooks.processors import LineProcessor
+from pre_commit_hooks.report import collect
+
+
+if TYPE_CHECKING:
+    from pre_commit_hooks.processors import FileProcessor
+
+
+class NoopProcessor(LineProcessor):
+    """Only the work that every line processor does."""
+
+    def process_line_internal(  # ruff:ignore[no-self-use]
+        self, _orig_line: str, _line: str, _logger: Logger
+    ) -> str | None:
+        return None
+
+
+# The lines each processor's file is made of, repeated
+CASES: dict[str, tuple[type[FileProcessor], str]] = {
+    "no-op": (NoopProcessor, "echo hello world\n"),
+    "docker": (docker.Processor, "FROM debian:12.5\nRUN echo hello world\n"),
+    # Errors that are allowed don't build their message
+    "gha (allowed errors)": (
+        gha.Processor,
+        "  - uses: actions/checkout@v4 # allow-no-digest\n",
+    ),
+}
+
+
+def ns_per_line(
+    processor_type: type[FileProcessor], text: str, *, lines: int, repeat: int
+) -> float:
+    content = text * max(1, lines // text.count("\n"))
+    with tempfile.TemporaryDirectory() as directory:
+        file = Path(directory) / "file"
+        file.write_text(content, encoding="utf-8")
+        args = processor_type.parse_args([str(file)])
+        best = float("inf")
+        for _ in range(repeat):
+            processor = processor_type(args)
+            processor.start_file(file)
+            start = time.perf_counter_ns()
+            with collect():
+                processor.process_content(content, logger=Logger.from_file(file))
+            best = min(best, time.perf_counter_ns() - start)
+    return best / content.count("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="the fastest run is reported"
+    )
+    args = parser.parse_args()
+    # Lookups would be timed instead of the processing
+    offline.set(True)
+    for name, (processor_type, text) in CASES.items():
+        result = ns_per_line(processor_type, text, lines=args.lines, repeat=args.repeat)
+        print(f"{name}: {result:.0f} ns/line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import difflib
+import importlib
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import cache, network
+from pre_commit_hooks.composite import HOOKS
+from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.report import collect
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+    from pre_commit_hooks.processors import Args, FileProcessor
+    from pre_commit_hooks.report import Diagnostic
+
+
+__all__ = ["FileResult", "Results", "run"]
+
+
+@dataclass(frozen=True, slots=True)
+class FileResult:
+    file: Path
+    retval: int
+    diagnostics: list[Diagnostic]
+    content: str
+    # The proposed content, equal to `content` if the hook doesn't change the file
+    new_content: str
+
+    @property
+    def changed(self) -> bool:
+        return self.new_content != self.content
+
+    def diff(self) -> str:
+        return "".join(
+            difflib.unified_diff(
+                self.content.splitlines(keepends=True),
+                self.new_content.splitlines(keepends=True),
+                fromfile=str(self.file),
+                tofile=str(self.file),
+            )
+        )
+
+    def apply(self) -> None:
+        if self.changed:
+            self.file.write_text(self.new_content, encoding="utf-8")
+
+
+@dataclass(frozen=True, slots=True)
+class Results:
+    files: list[FileResult]
+
+    @property
+    def diagnostics(self) -> list[Diagnostic]:
+        return [d for result in self.files for d in result.diagnostics]
+
+    @property
+    def changed(self) -> list[FileResult]:
+        return [result for result in self.files if result.changed]
+
+    # Whether the hook would fail in pre-commit
+    @property
+    def failed(self) -> bool:
+        return any(result.retval or result.changed for result in self.files)
+
+    def apply(self) -> None:
+        for result in self.files:
+            result.apply()
+
+
+def make_args(
+    processor_type: type[FileProcessor],
+    entry_argv: Sequence[str],
+    files: Sequence[Path],
+    options: Mapping[str, object],
+) -> Args:
+    # Start from the defaults of the command line, so options behave the same
+    args = processor_type.parse_args([
+        *entry_argv,
+        *processor_type.files_argv(files),
+    ])
+    for key, value in options.items():
+        if not hasattr(args, key):
+            msg = f"unknown option '{key}'"
+            raise ValueError(msg)
+        setattr(args, key, value)
+    return args
+
+
+def run(
+    hook: str,
+    files: Sequence[Path] | Mapping[Path, str],
+    options: Mapping[str, object] | None = None,
+) -> Results:
+    """
+    Run the hook with id `hook` (see `.pre-commit-hooks.yaml`) on `files`.
+
+    `files` are either paths to read, or a mapping from paths to their content,
+    to check content that isn't (yet) on disk. `options` are the hook's command
+    line arguments, by their attribute names (e.g. `{"indent": 2}` for
+    `--indent 2`).
+
+    Returns:
+        The diagnostics and proposed content of every file
+
+    Raises:
+        ValueError: for unknown hooks or options
+
+    """
+    if hook not in HOOKS:
+        msg = f"unknown hook id '{hook}'"
+        raise ValueError(msg)
+    module, entry_argv = HOOKS[hook]
+    processor_type: type[FileProcessor] = importlib.import_module(
+        f"pre_commit_hooks.{module}"
+    ).Processor
+
+    paths = list(files)
+    if not paths:
+        return Results([])
+    args = make_args(processor_type, entry_argv, paths, options or {})
+    # Calls are apart, like the requests of the daemon
+    network.expire_lookups()
+    network.reset_warnings()
+    if args.cache:
+        # Kept open, so it's shared by later calls
+        cache.open_cache()
+    processor = processor_type(args)
+
+    results = []
+    for file in paths:
+        content = (
+            files[file]
+            if isinstance(files, Mapping)
+            else file.read_text(encoding="utf-8")
+        )
+        logger = Logger.from_file(file)
+        with collect() as diagnostics:
+            processor.start_file(file)
+            new_content = processor.process_content(content, logger=logger)
+        results.append(
+            FileResult(file, logger.retval, diagnostics, content, new_content)
+        )
+    return Results(results)
@@ -3,13 +3,14 @@ from __future__ import annotations
 import re
 import tomllib
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
 
 from pre_commit_hooks.processors import LineProcessor
 
 
 if TYPE_CHECKING:
     from argparse import ArgumentParser
+    from collections.abc import Sequence
 
     import pre_commit_hooks
     from pre_commit_hooks.logger import Logger
@@ -18,7 +19,12 @@ if TYPE_CHECKING:
         pyproject: Path
 
 
+BUMPSYNC_RE = re.compile(r'bumpsync: "(.*?)"')
+
+
 class Processor(LineProcessor):
+    triggers: ClassVar[tuple[bytes, ...]] = (b"bumpsync:",)
+
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
         super().add_arguments(parser)
@@ -28,6 +34,10 @@ class Processor(LineProcessor):
             default=Path("pyproject.toml"),
         )
 
+    @classmethod
+    def cache_dependencies(cls, args: Args) -> Sequence[Path]:  # type: ignore[override]
+        return [args.pyproject]
+
     def __init__(self, args: Args) -> None:
         super().__init__(args)
 
@@ -35,23 +45,37 @@ class Processor(LineProcessor):
             data = tomllib.load(f)
         self.version = data["project"]["version"]
         self.looking_for: list[tuple[str, str]] = []
+        # All patterns in `looking_for` in one alternation, so most lines are
+        #  scanned only once
+        self.looking_for_re: re.Pattern[str] | None = None
 
     def process_line_internal(
         self, orig_line: str, _line: str, _logger: Logger
     ) -> str | None:
-        match = re.search(r'bumpsync: "(.*?)"', orig_line)
+        match = BUMPSYNC_RE.search(orig_line)
         if match:
             m = match.group(1)
             self.looking_for.append((
                 m.format(self.version),
                 m.format(r"[0-9]+\.[0-9]+\.[0-9]+"),
             ))
+            self.looking_for_re = None
+
+        if not self.looking_for:
+            return None
+        if self.looking_for_re is None:
+            self.looking_for_re = re.compile(
+                "|".join(f"(?:{search_for})" for _, search_for in self.looking_for)
+            )
+        if not self.looking_for_re.search(orig_line):
+            return None
 
         for replace_with, search_for in self.looking_for:
             new_line = re.sub(search_for, replace_with, orig_line)
             if new_line != orig_line:
                 # Totally invalidating the iterator here, but we return anyway
                 self.looking_for.remove((replace_with, search_for))
+                self.looking_for_re = None
                 return new_line
 
         return None
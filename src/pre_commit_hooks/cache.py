@@ -0,0 +1,447 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from pre_commit_hooks.processors import Args, FileProcessor
+
+
+MAX_CACHE_SIZE = 64 * 1024 * 1024
+# HTTP responses are kept this long after they were last used, so they can be
+#  revalidated instead of downloaded again
+RESPONSE_MAX_AGE = 30 * 24 * 60 * 60
+# Arguments that don't influence the result of processing a single file
+IGNORED_ARGS = frozenset({
+    "files",
+    "jobs",
+    "cache",
+    "stats",
+    "format",
+    "group",
+    "daemon",
+    "watch",
+    # Backends give the same answers
+    "resolver",
+})
+
+
+def user_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "pre-commit-hooks"
+
+
+@cache
+def package_version() -> str | None:
+    from importlib import metadata  # ruff:ignore[import-outside-top-level]
+
+    try:
+        return metadata.version("pre-commit-hooks")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResponse:
+    url: str
+    status: int
+    body: str
+    etag: str | None
+    last_modified: str | None
+    # Until when the response can be used without revalidating it
+    expires: float
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class Cache:
+    """
+    A persistent key-value store, shared by all hooks.
+
+    Entries are grouped in namespaces, can expire, and the least recently used
+    entries are evicted when the cache grows over `max_size` bytes.
+    """
+
+    def __init__(self, path: Path, *, max_size: int = MAX_CACHE_SIZE) -> None:
+        import sqlite3  # ruff:ignore[import-outside-top-level]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        # Network-bound processors use threads, which share this connection
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT, key TEXT, value TEXT, expires REAL, used REAL, "
+            "size INTEGER, PRIMARY KEY (namespace, key))"
+        )
+        # Bodies are compressed, as API responses and package pages compress well
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status INTEGER, body BLOB, etag TEXT, "
+            "last_modified TEXT, expires REAL, used REAL, size INTEGER)"
+        )
+
+    def get(self, namespace: str, key: str) -> str | None:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "UPDATE entries SET used = ? WHERE namespace = ? AND key = ? "
+                "AND (expires IS NULL OR expires > ?) RETURNING value",
+                (now, namespace, key, now),
+            ).fetchone()
+        if row is None:
+            self.misses[namespace] += 1
+            return None
+        self.hits[namespace] += 1
+        value: str = row[0]
+        return value
+
+    def set(
+        self, namespace: str, key: str, value: str, *, ttl: float | None = None
+    ) -> None:
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, value, expires, now, len(key) + len(value)),
+            )
+
+    def get_response(self, key: str) -> CachedResponse | None:
+        import zlib  # ruff:ignore[import-outside-top-level]
+
+        with self.lock:
+            row = self.conn.execute(
+                "UPDATE responses SET used = ? WHERE key = ? "
+                "RETURNING url, status, body, etag, last_modified, expires",
+                (time.time(), key),
+            ).fetchone()
+        if row is None:
+            self.misses["http"] += 1
+            return None
+        self.hits["http"] += 1
+        url, status, body, etag, last_modified, expires = row
+        return CachedResponse(
+            url, status, zlib.decompress(body).decode(), etag, last_modified, expires
+        )
+
+    def set_response(self, key: str, response: CachedResponse) -> None:
+        import zlib  # ruff:ignore[import-outside-top-level]
+
+        body = zlib.compress(response.body.encode())
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.url,
+                    response.status,
+                    body,
+                    response.etag,
+                    response.last_modified,
+                    response.expires,
+                    time.time(),
+                    len(key) + len(response.url) + len(body),
+                ),
+            )
+
+    def evict(self) -> None:
+        now = time.time()
+        with self.lock:
+            self.conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+            # Errors can't be revalidated, other responses are kept for a while
+            self.conn.execute(
+                "DELETE FROM responses WHERE (status >= 400 AND expires <= ?) "
+                "OR used <= ?",
+                (now, now - RESPONSE_MAX_AGE),
+            )
+            (total,) = self.conn.execute(
+                "SELECT (SELECT COALESCE(SUM(size), 0) FROM entries) "
+                "+ (SELECT COALESCE(SUM(size), 0) FROM responses)"
+            ).fetchone()
+            if total <= self.max_size:
+                return
+            # Evict down to 3/4 of the maximum, so we don't evict on every run
+            to_free = total - self.max_size * 3 // 4
+            rows = self.conn.execute(
+                "SELECT 'entries', rowid, size, used FROM entries "
+                "UNION ALL SELECT 'responses', rowid, size, used FROM responses "
+                "ORDER BY used"
+            )
+            evict: dict[str, list[tuple[int]]] = {"entries": [], "responses": []}
+            for table, rowid, size, _used in rows:
+                if to_free <= 0:
+                    break
+                evict[table].append((rowid,))
+                to_free -= size
+            for table, rowids in evict.items():
+                self.conn.executemany(
+                    f"DELETE FROM {table} WHERE rowid = ?",  # ruff:ignore[hardcoded-sql-expression]
+                    rowids,
+                )
+
+    def usage(self) -> list[tuple[str, int, int]]:
+        """
+        Measure the size of the cache.
+
+        Returns:
+            The amount of entries and their size in bytes, by namespace
+
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace "
+                "UNION ALL SELECT 'http', COUNT(*), SUM(size) FROM responses "
+                "HAVING COUNT(*) ORDER BY 1"
+            ).fetchall()
+
+    def close(self) -> None:
+        self.evict()
+        self.conn.close()
+
+    def stats(self) -> str:
+        return ", ".join(
+            f"{namespace}: {self.hits[namespace]}/{total} hits "
+            f"({self.hits[namespace] / total:.0%})"
+            for namespace in sorted(self.hits.keys() | self.misses.keys())
+            if (total := self.hits[namespace] + self.misses[namespace])
+        )
+
+
+# The cache for this run, if enabled with `--cache`
+current: Cache | None = None
+
+
+def forget_cache() -> None:
+    global current  # ruff:ignore[global-statement]
+    current = None
+
+
+# A connection (and its lock) can't be shared with forked worker processes, which
+#  open their own
+os.register_at_fork(after_in_child=forget_cache)
+
+
+def open_cache() -> Cache:
+    global current  # ruff:ignore[global-statement]
+    if current is None:
+        current = Cache(user_cache_dir() / "cache.sqlite")
+    return current
+
+
+def close_cache() -> None:
+    global current  # ruff:ignore[global-statement]
+    if current is not None:
+        # Not at the top, as `network` imports this module
+        from pre_commit_hooks import network  # ruff:ignore[import-outside-top-level]
+
+        network.wait_for_refreshes()
+        current.close()
+        current = None
+
+
+def get_resolution(namespace: str, key: str) -> str | None:
+    if current is None:
+        return None
+    return current.get(namespace, key)
+
+
+def set_resolution(namespace: str, key: str, value: str, *, ttl: float) -> None:
+    if current is not None:
+        current.set(namespace, key, value, ttl=ttl)
+
+
+def hash_file(file: Path) -> str:
+    import hashlib  # ruff:ignore[import-outside-top-level]
+
+    with file.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def content_ids(files: Sequence[Path]) -> dict[Path, str]:
+    """
+    Identify the content of `files`.
+
+    Uses the blob ids from the git index where the working tree matches it,
+    and hashes the content of any other files.
+
+    Returns:
+        A content id for every file
+
+    """
+    import subprocess  # ruff:ignore[import-outside-top-level]
+
+    ids = {}
+    try:
+        # Both list paths relative to the top of the repository, also when
+        #  running in a subdirectory
+        staged = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+            ["git", "ls-files", "--stage", "--full-name", "-z", "--", *map(str, files)],  # ruff:ignore[start-process-with-partial-path]
+            capture_output=True,
+            check=True,
+        ).stdout
+        modified = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+            ["git", "diff-files", "--name-only", "-z", "--", *map(str, files)],  # ruff:ignore[start-process-with-partial-path]
+            capture_output=True,
+            check=True,
+        ).stdout
+        top = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],  # ruff:ignore[start-process-with-partial-path]
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        # Not in a git repository, or files outside of it
+        pass
+    else:
+        modified_files = {os.fsdecode(name) for name in modified.split(b"\0")}
+        for entry in staged.split(b"\0"):
+            if not entry:
+                continue
+            info, name = entry.split(b"\t", maxsplit=1)
+            if os.fsdecode(name) not in modified_files:
+                _mode, blob_id, _stage = info.split()
+                ids[Path(top, os.fsdecode(name))] = f"git:{blob_id.decode()}"
+
+    ids_resolved = {file.resolve(): id_ for file, id_ in ids.items()}
+    return {
+        file: ids_resolved.get(file.resolve()) or f"sha256:{hash_file(file)}"
+        for file in files
+    }
+
+
+def stat_signature(file: Path) -> tuple[int, int, int]:
+    stat = file.stat()
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ResultCache:
+    """Remembers which files were clean (no changes and no diagnostics)."""
+
+    namespace = "clean"
+
+    def __init__(
+        self, store: Cache, processor_type: type[FileProcessor], args: Args
+    ) -> None:
+        import json  # ruff:ignore[import-outside-top-level]
+
+        self.store = store
+        options = {
+            key: str(value)
+            for key, value in sorted(vars(args).items())
+            if key not in IGNORED_ARGS
+        }
+        dependencies = {
+            str(file): hash_file(file)
+            for file in processor_type.cache_dependencies(args)
+        }
+        self.prefix = json.dumps([
+            processor_type.__module__,
+            package_version(),
+            options,
+            dependencies,
+        ])
+        self.keys: dict[Path, str] = {}
+        self.signatures: dict[Path, tuple[int, int, int]] = {}
+
+    @classmethod
+    def open(
+        cls, processor_type: type[FileProcessor], args: Args
+    ) -> ResultCache | None:
+        # Without a version, results from different code would be mixed up
+        if package_version() is None:
+            return None
+        return cls(open_cache(), processor_type, args)
+
+    def filter(self, files: Sequence[Path]) -> list[Path]:
+        """
+        Filter out files that were clean in a previous run.
+
+        Returns:
+            The files that need to be processed
+
+        """
+        import hashlib  # ruff:ignore[import-outside-top-level]
+
+        ids = content_ids([file for file in files if file.exists()])
+        todo = []
+        for file in files:
+            if file not in ids:
+                # Let the processor report the missing file
+                todo.append(file)
+                continue
+            key = hashlib.sha256((self.prefix + ids[file]).encode()).hexdigest()
+            if self.store.get(self.namespace, key) is None:
+                self.keys[file] = key
+                self.signatures[file] = stat_signature(file)
+                todo.append(file)
+        return todo
+
+    def record_clean(self, file: Path) -> None:
+        # If the processor changed the file, the key is for the old content
+        if file in self.keys and stat_signature(file) == self.signatures[file]:
+            self.store.set(self.namespace, self.keys[file], "")
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:  # ruff:ignore[magic-value-comparison]
+            return f"{size:.0f} {unit}"
+        size //= 1024
+    return f"{size} GiB"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse  # ruff:ignore[import-outside-top-level]
+
+    parser = argparse.ArgumentParser(
+        description="Manage the cache used with `--cache`",
+    )
+    parser.add_argument(
+        "command",
+        choices=["stats", "prune"],
+        help="stats: show what is cached; prune: remove expired entries, "
+        "evict entries over the size limit and compact the cache",
+    )
+    args = parser.parse_args(argv)
+
+    path = user_cache_dir() / "cache.sqlite"
+    if not path.exists():
+        print(f"No cache at {path}")
+        return 0
+    store = Cache(path)
+    try:
+        if args.command == "prune":
+            before = path.stat().st_size
+            store.evict()
+            with store.lock:
+                store.conn.execute("VACUUM")
+            print(f"Freed {format_size(before - path.stat().st_size)}")
+        print(f"{path} ({format_size(path.stat().st_size)})")
+        for namespace, count, size in store.usage():
+            print(f"{namespace}: {count} entries, {format_size(size)}")
+    finally:
+        store.conn.close()
+    return 0
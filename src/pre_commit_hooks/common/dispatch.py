@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+class Dispatcher[H]:
+    """
+    Routes lines to handlers, based on which pattern matches the start of a line.
+
+    All patterns are compiled into a single alternation, so a line is scanned
+    only once, however many patterns there are. Patterns are tried in order.
+    Named groups must be unique across all patterns.
+    """
+
+    def __init__(self, patterns: Sequence[tuple[str, H]]) -> None:
+        self.handlers = [handler for _pattern, handler in patterns]
+        self.patterns = [re.compile(pattern) for pattern, _handler in patterns]
+        self.master = re.compile(
+            "|".join(
+                f"(?P<_{i}>{pattern})" for i, (pattern, _handler) in enumerate(patterns)
+            )
+        )
+
+    def dispatch(self, line: str) -> tuple[H, re.Match[str]] | None:
+        """
+        Find the handler for `line`.
+
+        Returns:
+            The handler and the match of its own pattern, or `None` if no
+            pattern matches
+
+        """
+        if not self.patterns:
+            return None
+        match = self.master.match(line)
+        if match is None:
+            return None
+        # The outer group of an alternative is always the last one to close
+        assert match.lastgroup is not None  # ruff:ignore[assert]
+        i = int(match.lastgroup.removeprefix("_"))
+        # Match again, so the handler's group numbers are its own
+        own_match = self.patterns[i].match(line)
+        assert own_match is not None  # ruff:ignore[assert]
+        return self.handlers[i], own_match
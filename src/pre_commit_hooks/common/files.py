@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import contextlib
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterator, Sequence
+
+
+# For files that are written while they're still being read (like the memory
+#  maps of streamed files). Other writes are done in place, as replacing a file
+#  breaks its hard links, and loses metadata that can't be copied (like ACLs).
+@contextmanager
+def atomic_write(file: Path) -> Generator[BinaryIO]:
+    # Write the symlink target, not the symlink itself
+    file = file.resolve()
+    # Create the temporary file next to the target, so the rename
+    #  stays on the same filesystem
+    fd, tmp_name = tempfile.mkstemp(
+        dir=file.parent, prefix=f".{file.name}.", suffix=".tmp"
+    )
+    tmp = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        copy_metadata(file, tmp)
+        tmp.replace(file)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+# Not the timestamps, as the content did change
+def copy_metadata(source: Path, target: Path) -> None:
+    stat = source.stat()
+    shutil.copymode(source, target)
+    # Changing the owner needs root, changing the group needs to be in it
+    with contextlib.suppress(OSError):
+        os.chown(target, stat.st_uid, stat.st_gid)
+    # Extended attributes are Linux only, and may be restricted (like those in
+    #  the "security" and "trusted" namespaces)
+    if hasattr(os, "listxattr"):
+        with contextlib.suppress(OSError):
+            for name in os.listxattr(source):
+                with contextlib.suppress(OSError):
+                    os.setxattr(target, name, os.getxattr(source, name))
+
+
+def iter_line_spans(buffer: mmap.mmap) -> Iterator[tuple[int, int]]:
+    # Offsets include the newline, like `str.splitlines(keepends=True)`
+    size = len(buffer)
+    start = 0
+    while start < size:
+        end = buffer.find(b"\n", start)
+        end = size if end == -1 else end + 1
+        yield start, end
+        start = end
+
+
+def contains_any(file: Path, needles: Sequence[bytes]) -> bool:
+    """
+    Check if `file` contains any of `needles`, without decoding it.
+
+    Returns:
+        `True` if any needle was found, or the file couldn't be read
+
+    """
+    try:
+        with file.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return any(buffer.find(needle) != -1 for needle in needles)
+    except OSError:
+        # Let the processor report it
+        return True
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+HUNK_RE = re.compile(rb"^@@ -\d+(?:,\d+)? \+(?P<start>\d+)(?:,(?P<count>\d+))? @@")
+# The escapes in the C-quoted names git prints
+ESCAPE_RE = re.compile(rb"\\(?:([0-7]{3})|(.))")
+ESCAPES = {
+    b"a": b"\a",
+    b"b": b"\b",
+    b"f": b"\f",
+    b"n": b"\n",
+    b"r": b"\r",
+    b"t": b"\t",
+    b"v": b"\v",
+}
+
+
+def changed_lines(files: Sequence[Path]) -> dict[Path, set[int]] | None:
+    """
+    Find the lines of `files` that changed since the last commit.
+
+    During a pre-commit run unstaged changes are stashed, so this is the
+    staged diff.
+
+    Returns:
+        The changed (0-based) line numbers by resolved path, or `None` if
+        there is no diff to compare against (not in a git repository,
+        no commits yet, or files outside of the repository)
+
+    """
+    import subprocess  # ruff:ignore[import-outside-top-level]
+
+    try:
+        diff = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+            [  # ruff:ignore[start-process-with-partial-path]
+                "git",
+                "-c",
+                "core.quotePath=false",
+                "diff",
+                "HEAD",
+                "--unified=0",
+                "--relative",
+                "--no-color",
+                "--no-ext-diff",
+                "--no-renames",
+                "--",
+                *map(str, files),
+            ],
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    cwd = Path.cwd()
+    # Files that are not in the diff didn't change at all
+    changes: dict[Path, set[int]] = {file.resolve(): set() for file in files}
+    current: set[int] | None = None
+    for line in diff.splitlines():
+        if line.startswith(b"+++ "):
+            name = diff_name(line.removeprefix(b"+++ "))
+            # Deleted files have no new side
+            current = (
+                changes.setdefault(
+                    (cwd / os.fsdecode(name.removeprefix(b"b/"))).resolve(), set()
+                )
+                if name != b"/dev/null"
+                else None
+            )
+        elif current is not None and (match := HUNK_RE.match(line)):
+            start = int(match.group("start"))
+            count = int(match.group("count") or 1)
+            if count == 0:
+                # Only removed lines, after line `start`. Count the lines
+                #  around the removal as changed.
+                current.update((start - 1, start))
+            else:
+                current.update(range(start - 1, start - 1 + count))
+    return changes
+
+
+def diff_name(name: bytes) -> bytes:
+    # Names with a space are followed by a tab, names with special characters
+    #  (like quotes or newlines) are quoted
+    if not name.startswith(b'"'):
+        return name.removesuffix(b"\t")
+    return ESCAPE_RE.sub(
+        lambda match: (
+            bytes([int(match.group(1), 8)])
+            if match.group(1)
+            else ESCAPES.get(match.group(2), match.group(2))
+        ),
+        name.removesuffix(b"\t")[1:-1],
+    )
+
+
+def git(*args: str, cwd: Path) -> bytes:
+    import subprocess  # ruff:ignore[import-outside-top-level]
+
+    return subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        ["git", *args],  # ruff:ignore[start-process-with-partial-path]
+        cwd=cwd,
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+# Oldest first, parents before children. With the parents of each commit.
+def rev_list(revisions: Sequence[str], *, cwd: Path) -> list[tuple[str, list[str]]]:
+    out = git(
+        "rev-list", "--topo-order", "--reverse", "--parents", *revisions, "--", cwd=cwd
+    )
+    return [
+        (commit, parents)
+        for commit, *parents in map(str.split, out.decode().splitlines())
+    ]
+
+
+# The blob ids of the files in `commit`, by path
+def ls_tree(commit: str, *, cwd: Path) -> dict[str, str]:
+    blobs = {}
+    for entry in git("ls-tree", "-r", "-z", commit, cwd=cwd).split(b"\0"):
+        if not entry:
+            continue
+        info, _, path = entry.partition(b"\t")
+        _mode, object_type, oid = info.split()
+        # Skip submodules
+        if object_type == b"blob":
+            blobs[os.fsdecode(path)] = oid.decode()
+    return blobs
+
+
+class CatFile:
+    """
+    Reads objects through a single `git cat-file --batch` process.
+
+    Starting a process per object is slow when reading thousands of them.
+    """
+
+    def __init__(self, cwd: Path) -> None:
+        import subprocess  # ruff:ignore[import-outside-top-level]
+
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],  # ruff:ignore[start-process-with-partial-path]
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        assert self.process.stdin is not None  # ruff:ignore[assert]
+        assert self.process.stdout is not None  # ruff:ignore[assert]
+        self.stdin = self.process.stdin
+        self.stdout = self.process.stdout
+
+    def read(self, oid: str) -> bytes:
+        self.stdin.write(f"{oid}\n".encode())
+        self.stdin.flush()
+        header = self.stdout.readline().split()
+        if len(header) != 3:  # ruff:ignore[magic-value-comparison]
+            # `<oid> missing`
+            msg = f"can't read git object {oid}"
+            raise KeyError(msg)
+        content = self.stdout.read(int(header[2]))
+        # Every object is followed by a newline
+        self.stdout.read(1)
+        return content
+
+    def close(self) -> None:
+        self.stdin.close()
+        self.process.wait()
+        self.stdout.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        self.close()
@@ -4,6 +4,10 @@ from typing import TYPE_CHECKING
 
 
 if TYPE_CHECKING:
+    import mmap
+    from collections.abc import Iterable, Sequence
+    from typing import BinaryIO
+
     from pre_commit_hooks.logger import Logger
 
 
@@ -18,3 +22,60 @@ def line_replace(line: str, a: str, b: str, *, logger: Logger) -> str:  # ruff:i
 def line_append(line: str, s: str) -> str:
     line_without_newline = line.rstrip("\r\n")
     return line_without_newline + s + line[len(line_without_newline) :]
+
+
+class EditList:
+    """
+    Edits to the lines of a file, by line number.
+
+    Edits are recorded while processing, and applied in a single pass
+    afterwards, so lines can be inserted before lines that are already
+    processed.
+    """
+
+    def __init__(self) -> None:
+        self.insertions: dict[int, list[str]] = {}
+        self.replacements: dict[int, str] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.insertions or self.replacements)
+
+    def insert_before(self, lnr: int, s: str) -> None:
+        self.insertions.setdefault(lnr, []).append(s)
+
+    def replace(self, lnr: int, s: str) -> None:
+        self.replacements[lnr] = s
+
+    def delete(self, lnr: int) -> None:
+        self.replace(lnr, "")
+
+    def apply(self, lines: Sequence[str]) -> str:
+        parts: list[str] = []
+        for lnr, line in enumerate(lines):
+            parts.extend(self.insertions.get(lnr, ()))
+            parts.append(self.replacements.get(lnr, line))
+        return "".join(parts)
+
+    def write_buffer(
+        self,
+        buffer: mmap.mmap,
+        spans: Iterable[tuple[int, int]],
+        f: BinaryIO,
+        *,
+        encoding: str = "utf-8",
+    ) -> None:
+        """Write the edited `buffer` to `f`, copying unchanged lines as-is."""
+        with memoryview(buffer) as view:
+            # Unchanged lines are written in runs, straight from the buffer
+            run_start = 0
+            for lnr, (start, end) in enumerate(spans):
+                if lnr not in self.insertions and lnr not in self.replacements:
+                    continue
+                f.write(view[run_start:start])
+                f.writelines(s.encode(encoding) for s in self.insertions.get(lnr, ()))
+                if lnr in self.replacements:
+                    f.write(self.replacements[lnr].encode(encoding))
+                    run_start = end
+                else:
+                    run_start = start
+            f.write(view[run_start:])
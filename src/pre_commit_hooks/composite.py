@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import shlex
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks.processors import FileContentProcessor, FileProcessor
+from pre_commit_hooks.yaml import YamlProcessor, dumps, get_yaml
+
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+    from collections.abc import Sequence
+    from pathlib import Path
+
+    from ruamel.yaml import CommentedMap  # type: ignore[attr-defined]
+
+    import pre_commit_hooks
+    from pre_commit_hooks.logger import Logger
+
+    class Args(pre_commit_hooks.processors.Args):
+        hooks: list[str]
+
+
+# Hook ids from `.pre-commit-hooks.yaml`, with the module and arguments of their entry
+HOOKS: dict[str, tuple[str, list[str]]] = {
+    "docker-image-pin": ("docker", []),
+    "gha-pin": ("gha", []),
+    "shfuncdecfmt": ("shfuncdecfmt", []),
+    "set-euo-pipefail": ("set_euo_pipefail", []),
+    "pre-commit-additional-dependencies": ("pcad", []),
+    "pre-commit-ci-skip": ("pccs", []),
+    **{
+        f"pre-commit-config-sections-{language}": ("sections", [language])
+        for language in ("shell", "python", "docker", "pytest", "gha")
+    },
+    "bumpsync": ("bumpsync", []),
+    "docker-apt-renovate": ("docker_apt_renovate", []),
+    "pre-commit-config-fmt": ("pccf", []),
+}
+
+
+def hook_spec(s: str) -> str:
+    hook_id = shlex.split(s)[0] if s.strip() else ""
+    if hook_id not in HOOKS:
+        msg = f"unknown hook id '{hook_id}'"
+        raise argparse.ArgumentTypeError(msg)
+    return s
+
+
+def parse_hooks(
+    args: Args,
+) -> list[tuple[type[FileProcessor], pre_commit_hooks.processors.Args]]:
+    hooks = []
+    for hook in args.hooks:
+        hook_id, *hook_argv = shlex.split(hook)
+        module, entry_argv = HOOKS[hook_id]
+        processor_type: type[FileProcessor] = importlib.import_module(
+            f"pre_commit_hooks.{module}"
+        ).Processor
+        hook_args = processor_type.parse_args([
+            *entry_argv,
+            *hook_argv,
+            *processor_type.files_argv(args.files),
+        ])
+        hooks.append((processor_type, hook_args))
+    return hooks
+
+
+class Processor(FileProcessor):
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--hook",
+            dest="hooks",
+            action="append",
+            required=True,
+            type=hook_spec,
+            help="hook id, optionally followed by arguments for that hook "
+            "(e.g. 'docker-apt-renovate --indent 2'). Can be given multiple "
+            "times, hooks are run in the given order.",
+        )
+
+    @classmethod
+    def cache_dependencies(cls, args: Args) -> Sequence[Path]:  # type: ignore[override]
+        return [
+            file
+            for processor_type, hook_args in parse_hooks(args)
+            for file in processor_type.cache_dependencies(hook_args)
+        ]
+
+    def __init__(self, args: Args) -> None:
+        super().__init__(args)
+        self.processors = [
+            processor_type(hook_args) for processor_type, hook_args in parse_hooks(args)
+        ]
+
+    def start_file(self, file: Path) -> None:
+        for processor in self.processors:
+            processor.start_file(file)
+
+    def process_file_path_internal(self, file: Path, *, logger: Logger) -> None:
+        content = file.read_text(encoding="utf-8")
+        text = self.process_content(content, logger=logger)
+        if text != content:
+            file.write_text(text, encoding="utf-8")
+
+    def process_content(self, content: str, *, logger: Logger) -> str:
+        text = content
+        # The parsed YAML document, shared by consecutive YAML processors
+        data: CommentedMap | None = None
+        data_changed = False
+
+        for processor in self.processors:
+            if processor.triggers and not any(
+                trigger.decode() in text for trigger in processor.triggers
+            ):
+                continue
+            hook_logger = logger.from_file(logger.file)
+            if isinstance(processor, YamlProcessor):
+                if data is None:
+                    data = get_yaml().load(text)
+                data_changed |= processor.process_yaml_internal(
+                    data, logger=hook_logger
+                )
+            else:
+                assert isinstance(processor, FileContentProcessor)  # ruff:ignore[assert]
+                if data_changed:
+                    assert data is not None  # ruff:ignore[assert]
+                    text = dumps(data)
+                    data_changed = False
+                new_text = processor.process_file_internal(text, logger=hook_logger)
+                if new_text is not None and new_text != text:
+                    text = new_text
+                    data = None
+            logger.consume(hook_logger)
+
+        if data_changed:
+            assert data is not None  # ruff:ignore[assert]
+            text = dumps(data)
+        return text
+
+
+main = Processor.main
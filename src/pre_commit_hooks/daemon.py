@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks.cache import package_version, user_cache_dir
+
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+
+# Shut down after this many seconds without requests. Until then, network
+#  lookups and the GitHub token stay cached in memory (for up to
+#  `network.FRESH_TTL` seconds).
+IDLE_TIMEOUT = 15 * 60
+# How long to wait for a newly started daemon to listen
+START_TIMEOUT = 5
+
+# Set in the daemon itself, so it doesn't forward requests to itself
+serving = False
+
+# The environment variables that change the answers of the hooks. The daemon
+#  keeps the environment of the client that started it, so these are sent with
+#  each request instead.
+FORWARDED_ENV = (
+    "GH_TOKEN",
+    "GITHUB_TOKEN",
+    "PRE_COMMIT_HOOKS_OFFLINE",
+    "PRE_COMMIT_HOOKS_STALE_WHILE_REVALIDATE",
+    "XDG_CACHE_HOME",
+)
+# The forwarded environment of the previous request
+previous_env: dict[str, str] | None = None
+
+
+def default_socket_path() -> Path:
+    # A daemon only serves clients of the same version and interpreter
+    key = hashlib.sha256(f"{package_version()}:{sys.executable}".encode()).hexdigest()
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    directory = Path(base) if base else user_cache_dir()
+    return directory / f"pre-commit-hooks-{key[:16]}.sock"
+
+
+def connect(path: Path) -> socket.socket | None:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def start(path: Path, *, idle_timeout: float) -> socket.socket | None:
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    subprocess.Popen(  # ruff:ignore[subprocess-without-shell-equals-true]
+        [
+            sys.executable,
+            # Not `-m`, which would run a second copy of this module as
+            #  `__main__`, so processors wouldn't see `serving`
+            "-c",
+            "from pre_commit_hooks import daemon; daemon.main()",
+            str(path),
+            str(idle_timeout),
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = connect(path)
+        if sock is not None:
+            return sock
+        time.sleep(0.05)
+    return None
+
+
+def call(
+    module: str,
+    argv: Sequence[str],
+    *,
+    path: Path | None = None,
+    idle_timeout: float = IDLE_TIMEOUT,
+) -> int | None:
+    """
+    Run `module.main(argv)` in the daemon, starting it if it isn't running.
+
+    Output is streamed to `sys.stdout` and `sys.stderr`.
+
+    Returns:
+        The exit code, or `None` if the daemon couldn't be reached
+
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    if path is None:
+        path = default_socket_path()
+    sock = connect(path) or start(path, idle_timeout=idle_timeout)
+    if sock is None:
+        return None
+
+    with sock, sock.makefile("rwb") as f:
+        request = {
+            "module": module,
+            "argv": list(argv),
+            "cwd": str(Path.cwd()),
+            "env": {
+                name: os.environ[name] for name in FORWARDED_ENV if name in os.environ
+            },
+            # For usage messages
+            "prog": sys.argv[0],
+        }
+        f.write(json.dumps(request).encode() + b"\n")
+        f.flush()
+        for line in f:
+            message = json.loads(line)
+            if "exit" in message:
+                exit_code: int = message["exit"]
+                return exit_code
+            stream = sys.stdout if message["stream"] == "stdout" else sys.stderr
+            stream.write(message["data"])
+    # The daemon went away mid-request
+    return None
+
+
+class MessageStream(io.TextIOBase):
+    """Forwards everything written to it to the client, as it is written."""
+
+    def __init__(self, f: io.BufferedIOBase, name: str) -> None:
+        self.f = f
+        self.name = name
+
+    def write(self, s: str) -> int:
+        if s:
+            self.f.write(json.dumps({"stream": self.name, "data": s}).encode() + b"\n")
+        return len(s)
+
+    def flush(self) -> None:
+        self.f.flush()
+
+    def isatty(self) -> bool:  # ruff:ignore[no-self-use]
+        return False
+
+
+def set_env(env: Mapping[str, str | None]) -> None:
+    for name in FORWARDED_ENV:
+        value = env.get(name)
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+def handle(f: io.BufferedIOBase) -> None:
+    from pre_commit_hooks import network  # ruff:ignore[import-outside-top-level]
+
+    global previous_env  # ruff:ignore[global-statement]
+    request = json.loads(f.readline())
+    cwd = Path.cwd()
+    argv = sys.argv
+    env = {name: os.environ.get(name) for name in FORWARDED_ENV}
+    exit_code = 1
+    stdout = MessageStream(f, "stdout")
+    stderr = MessageStream(f, "stderr")
+    try:
+        os.chdir(request["cwd"])
+        sys.argv = [request["prog"], *request["argv"]]
+        set_env(request["env"])
+        # Lookups (and the GitHub token) of another environment don't apply
+        if request["env"] != previous_env:
+            network.clear_lookups()
+        else:
+            network.expire_lookups()
+        previous_env = request["env"]
+        network.reset_warnings()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                main = importlib.import_module(request["module"]).main
+                exit_code = main(request["argv"])
+            except SystemExit as e:
+                # argparse errors, `--help` and `sys.exit()`. Like the
+                #  interpreter, other codes (like messages) are printed.
+                if e.code is None:
+                    exit_code = 0
+                elif isinstance(e.code, int):
+                    exit_code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    exit_code = 1
+            except Exception:  # ruff:ignore[blind-except]
+                traceback.print_exc()
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+        set_env(env)
+    f.write(json.dumps({"exit": exit_code}).encode() + b"\n")
+    f.flush()
+
+
+def serve(path: Path, *, idle_timeout: float = IDLE_TIMEOUT) -> None:
+    global serving  # ruff:ignore[global-statement]
+    serving = True
+
+    existing = connect(path)
+    if existing is not None:
+        # Another daemon won the race to start
+        existing.close()
+        return
+    # Left over from a daemon that didn't shut down cleanly
+    path.unlink(missing_ok=True)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(path))
+        path.chmod(0o600)
+        server.listen()
+        server.settimeout(idle_timeout)
+        try:
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except TimeoutError:
+                    break
+                # Requests are handled one at a time, as they change the
+                #  working directory and `sys.stdout`
+                conn.settimeout(None)
+                with (
+                    conn,
+                    conn.makefile("rwb") as f,
+                    contextlib.suppress(OSError),
+                ):
+                    handle(f)
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    serve(Path(sys.argv[1]), idle_timeout=float(sys.argv[2]))
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import contextlib
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
 
 from pre_commit_hooks.common.util import is_valid_sha256
 from pre_commit_hooks.common.versions import process_version
@@ -13,6 +13,9 @@ if TYPE_CHECKING:
 
 
 class Processor(LineProcessor):
+    stateless = True
+    triggers: ClassVar[tuple[bytes, ...]] = (b"image:", b"FROM")
+
     # TODO(GideonBear): query and replace the version with latest, if online
     #  also add sha hashes to docker, etc.
     def process_line_internal(  # ruff:ignore[no-self-use]
@@ -46,7 +49,8 @@ class Processor(LineProcessor):
         if version in {"latest", "stable"}:
             logger.error(
                 id=version,
-                msg=f"uses dynamic tag '{version}' instead of pinned version",
+                msg="uses dynamic tag '{}' instead of pinned version",
+                args=(version,),
             )
         else:
             if "-" in version:
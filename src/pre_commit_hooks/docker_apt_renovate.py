@@ -9,7 +9,12 @@ from typing import TYPE_CHECKING, ClassVar, Self
 
 from pre_commit_hooks.common.lines import line_replace
 from pre_commit_hooks.common.util import remove_ws_splitted_part
-from pre_commit_hooks.network import is_connected, request
+from pre_commit_hooks.network import (
+    Unreachable,
+    Unresolved,
+    is_connected,
+    request,
+)
 from pre_commit_hooks.processors import Bookmark, LineProcessor
 
 
@@ -19,6 +24,7 @@ if TYPE_CHECKING:
 
     import pre_commit_hooks
     from pre_commit_hooks.logger import Logger
+    from pre_commit_hooks.parallel import ExecutorType
 
     class Args(pre_commit_hooks.processors.Args):
         indent: int
@@ -67,6 +73,11 @@ class OsRelease(ABC):
     @abstractmethod
     def install_command() -> str: ...
 
+    # Where `get_version` looks up package versions
+    @staticmethod
+    @abstractmethod
+    def packages_url() -> str: ...
+
     @classmethod
     def from_from_line(cls, line: str, *, logger: Logger) -> OsRelease | None:
         for type_ in cls.types:
@@ -112,7 +123,12 @@ class OsRelease(ABC):
     def from_docker_tag(cls, tag: str, *, logger: Logger) -> OsRelease | None: ...
 
     def make_env_line(self, depname: str, *, logger: Logger) -> str:
-        version = self.get_version(depname, logger=logger)
+        try:
+            version = self.get_version(depname, logger=logger)
+        except Unresolved:
+            # While planning nothing is written, so carry on to find the lookups
+            #  for the other packages on the line, see `prefetch.plan`
+            version = None
         if version is None:
             version = "<insert version here>"
         return f'ENV {envilize(depname)}="{version}"\n'
@@ -137,6 +153,10 @@ class OsRelease(ABC):
 DEB_PAK_RE = r"[a-z0-9][a-z0-9+\-.]+"
 PAK_VER_RE = r"[^\s]+?"  # Dirty, but doesn't matter
 DEB_PAK_PINNED_RE = rf"{DEB_PAK_RE}={PAK_VER_RE}"
+# Classifies an install argument in a single match
+INSTALL_ARG_RE = re.compile(
+    rf"(?P<option>-)|(?P<pinned>{DEB_PAK_PINNED_RE})|(?P<unpinned>{DEB_PAK_RE})"
+)
 
 
 @dataclass
@@ -153,6 +173,10 @@ class DebianRelease(OsRelease):
     def install_command() -> str:
         return "apt-get install"
 
+    @staticmethod
+    def packages_url() -> str:
+        return "https://packages.debian.org"
+
     def identifier(self) -> str:
         return self.codename
 
@@ -227,12 +251,12 @@ class DebianRelease(OsRelease):
         return f"# renovate: suite={self} depName={depname}\n"
 
     def get_version(self, depname: str, *, logger: Logger) -> str | None:
-        if not is_connected():
-            msg = "This function is only supposed to be called in connected contexts"
-            raise Exception(msg)  # ruff:ignore[raise-vanilla-class]
-
-        url = f"https://packages.debian.org/{self.codename}/{depname}"
-        text = request(url, json=False)
+        url = f"{self.packages_url()}/{self.codename}/{depname}"
+        try:
+            text = request(url, json=False)
+        except Unreachable:
+            # Only if it became unreachable since `is_connected` was checked
+            return None
         # TODO(GideonBear): example gosu: 1.17-3 (what we currently get) isn't valid,
         #  1.17-3+b4 is expected. API has the same problem.
         match = re.search(
@@ -277,6 +301,10 @@ class AlpineRelease(OsRelease):
     def install_command() -> str:
         return "apk add"
 
+    @staticmethod
+    def packages_url() -> str:
+        return "https://pkgs.alpinelinux.org"
+
     def identifier(self) -> str:
         return self.version
 
@@ -351,12 +379,15 @@ class AlpineRelease(OsRelease):
         )
 
     def get_version(self, depname: str, *, logger: Logger) -> str | None:
-        if not is_connected():
-            msg = "This function is only supposed to be called in connected contexts"
-            raise Exception(msg)  # ruff:ignore[raise-vanilla-class]
-
-        url = f"https://pkgs.alpinelinux.org/package/{self.version_with_v()}/main/x86_64/{depname}"
-        text = request(url, json=False)
+        url = (
+            f"{self.packages_url()}/package/{self.version_with_v()}"
+            f"/main/x86_64/{depname}"
+        )
+        try:
+            text = request(url, json=False)
+        except Unreachable:
+            # Only if it became unreachable since `is_connected` was checked
+            return None
         match = re.search(
             rf'<th class="header">Version</th>\s*'
             rf"<td>\s*<strong>\s*(?P<version>{PAK_VER_RE})\s*</strong>\s*</td>",
@@ -420,6 +451,14 @@ UNKNOWN_OS_MSG = (
 
 class Processor(LineProcessor):
     remove_comments = False  # renovate comments
+    executor: ClassVar[ExecutorType] = "thread"  # Network-bound
+    network_bound = True
+    triggers: ClassVar[tuple[bytes, ...]] = (b"FROM", b"RUN")
+    line_patterns: ClassVar[Sequence[tuple[str, str]]] = (
+        (r"FROM|# docker-apt-renovate: FROM", "process_line_from"),
+        (r"#\s*renovate:", "process_line_renovate"),
+        (r"RUN", "process_line_run"),
+    )
 
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
@@ -453,35 +492,32 @@ class Processor(LineProcessor):
 
             return self.current_os.make_env_line(depname, logger=logger)
 
-        if line.startswith(("FROM", "# docker-apt-renovate: FROM")):
-            self.process_line_from(line, logger)
-            return None
-
-        if self.current_os and (match := self.current_os.renovate_re().match(line)):
-            return self.process_line_renovate(orig_line, match, logger)
-
-        if line.startswith("RUN"):
-            # The first command can be on the same line as RUN, so we pass it along too
-            self.in_run = self.bookmark()
-            self.in_install = False
-            line = line.removeprefix("RUN").strip()
+        if dispatched := self.dispatch(line):
+            handler, match = dispatched
+            return handler(orig_line, line, match, logger)
 
         if self.in_run:
             return self.process_line_in_run(orig_line, line, logger)
 
         return None
 
-    def process_line_from(self, line: str, logger: Logger) -> None:
+    def process_line_from(
+        self, _orig_line: str, line: str, _match: re.Match[str], logger: Logger
+    ) -> None:
         # If we find this comment, we can process the line like normal
         line = line.removeprefix("# docker-apt-renovate: ")
         line = line.removeprefix("FROM").strip()
         self.current_os = OsRelease.from_from_line(line, logger=logger)
 
     def process_line_renovate(
-        self, orig_line: str, match: re.Match[str], logger: Logger
+        self, orig_line: str, line: str, _match: re.Match[str], logger: Logger
     ) -> str | None:
-        if self.current_os is None:
-            logger.error(UNKNOWN_OS_MSG)
+        if self.current_os is None or not (
+            match := self.current_os.renovate_re().match(line)
+        ):
+            # Not a renovate comment for this OS, so just a comment
+            if self.in_run:
+                return self.process_line_in_run(orig_line, line, logger)
             return None
 
         os_s = match.group("osRelease")
@@ -490,23 +526,33 @@ class Processor(LineProcessor):
         os = self.current_os.from_renovate(os_s, logger=logger)
         if os is None:
             return None
-        if os != self.current_os:
+        if os != self.current_os and (
             logger.error(
                 id="wrong-suite",
                 msg=f"suite set to `{os}`, while FROM image suggests suite "
                 f"`{self.current_os}`",
             )
-            if is_connected():
-                self.bump_version_next = depname
-                return line_replace(
-                    orig_line,
-                    os_s,
-                    self.current_os.renovate_version(),
-                    logger=logger,
-                )
+            and is_connected(self.current_os.packages_url())
+        ):
+            self.bump_version_next = depname
+            return line_replace(
+                orig_line,
+                os_s,
+                self.current_os.renovate_version(),
+                logger=logger,
+            )
 
         return None
 
+    def process_line_run(
+        self, orig_line: str, line: str, _match: re.Match[str], logger: Logger
+    ) -> str | None:
+        # The first command can be on the same line as RUN, so we pass it along too
+        self.in_run = self.bookmark()
+        self.in_install = False
+        line = line.removeprefix("RUN").strip()
+        return self.process_line_in_run(orig_line, line, logger)
+
     def process_line_in_run(  # ruff:ignore[complex-structure, too-many-branches]
         self, orig_line: str, line: str, logger: Logger
     ) -> str | None:
@@ -544,17 +590,17 @@ class Processor(LineProcessor):
             args = line.split()
             new_lines = []
             for arg in args:
-                if arg.startswith("-"):
+                arg_match = INSTALL_ARG_RE.match(arg)
+                kind = arg_match.lastgroup if arg_match else None
+                if kind in {"option", "pinned"}:
                     # Some argument, like -y or --no-install-recommends
-                    # (packages can't start with a dash)
-                    pass
-                elif re.match(DEB_PAK_PINNED_RE, arg):
-                    # An already pinned package
+                    #  (packages can't start with a dash), or an already
+                    #  pinned package
                     pass
-                elif re.match(DEB_PAK_RE, arg):
-                    logger.error(id="unpinned", msg=f"'{arg}' is unpinned")
-
-                    if is_connected():
+                elif kind == "unpinned":
+                    if logger.error(
+                        id="unpinned", msg="'{}' is unpinned", args=(arg,)
+                    ) and is_connected(self.current_os.packages_url()):
                         in_run.write(
                             self.current_os.make_renovate_line(arg)
                             + self.current_os.make_env_line(arg, logger=logger),
@@ -575,9 +621,9 @@ class Processor(LineProcessor):
                 else:
                     logger.error(
                         id="unexpected-install-arg",
-                        msg=f"Unexpected argument to "
-                        f"`{self.current_os.install_command()}` found ('{arg}') "
-                        f"that is not a valid package name",
+                        msg="Unexpected argument to `{}` found ('{}') "
+                        "that is not a valid package name",
+                        args=(self.current_os.install_command(), arg),
                     )
 
             if new_lines:
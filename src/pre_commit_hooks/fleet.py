@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import importlib
+import os
+import re
+import sys
+import threading
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import cache
+from pre_commit_hooks.composite import HOOKS
+from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.prefetch import prefetch
+from pre_commit_hooks.report import FORMATS, Format, collect, make_reporter
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+
+    from pre_commit_hooks.processors import FileProcessor
+    from pre_commit_hooks.report import Diagnostic
+
+
+# The hooks that take file names, with the `files` and `types` of their entry in
+#  `.pre-commit-hooks.yaml` (which isn't installed with the package). Kept in
+#  sync by `test_file_rules_match_the_hooks`.
+FILE_RULES: dict[str, tuple[re.Pattern[str] | None, frozenset[str]]] = {
+    "docker-image-pin": (
+        re.compile(r"docker-compose\.ya?ml$|Dockerfile$"),
+        frozenset(),
+    ),
+    "gha-pin": (None, frozenset({"yaml"})),
+    "docker-apt-renovate": (None, frozenset({"dockerfile"})),
+    "shfuncdecfmt": (None, frozenset({"shell"})),
+    "set-euo-pipefail": (None, frozenset({"shell"})),
+}
+DEFAULT_HOOKS = ["gha-pin", "docker-image-pin", "docker-apt-renovate"]
+
+# The subset of `identify` (which pre-commit uses for `types`) that the hooks
+#  above need
+EXTENSION_TYPES = {
+    "yml": "yaml",
+    "yaml": "yaml",
+    "dockerfile": "dockerfile",
+    "sh": "shell",
+    "bash": "shell",
+    "zsh": "shell",
+    "ksh": "shell",
+}
+NAME_TYPES = {"Dockerfile": "dockerfile"}
+SHELL_RE = re.compile(rb"^#!\s*(?:/usr/bin/env\s+(?:-S\s+)?)?\S*?\b(?:ba|z|k|da)?sh\b")
+
+
+class Args(argparse.Namespace):
+    roots: list[Path]
+    hooks: list[str] | None
+    jobs: int | None
+    cache: bool
+    fix: bool
+    format: Format
+    group: bool
+
+
+# `read_head` returns the start of the file, which is only read for files
+#  without an extension
+def file_types(file: Path, read_head: Callable[[], bytes]) -> set[str]:
+    if file.name in NAME_TYPES:
+        return {NAME_TYPES[file.name]}
+    extension_type = EXTENSION_TYPES.get(file.suffix.removeprefix(".").lower())
+    if extension_type is not None:
+        return {extension_type}
+    if not file.suffix and SHELL_RE.match(read_head()):
+        return {"shell"}
+    return set()
+
+
+def read_head(file: Path) -> bytes:
+    try:
+        with file.open("rb") as f:
+            return f.readline(256)
+    except OSError:
+        return b""
+
+
+def discover(root: Path) -> list[Path]:
+    """
+    Find the files in the repository at `root`.
+
+    Returns:
+        The tracked files if `root` is a git repository (like `pre-commit run
+        --all-files`), otherwise all files outside of `.git`, relative to `root`
+
+    """
+    import subprocess  # ruff:ignore[import-outside-top-level]
+
+    try:
+        out = subprocess.run(
+            ["git", "ls-files", "-z"],  # ruff:ignore[start-process-with-partial-path]
+            cwd=root,
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    else:
+        return sorted(Path(os.fsdecode(name)) for name in out.split(b"\0") if name)
+
+    files: list[Path] = []
+    for directory, directories, names in os.walk(root):
+        if ".git" in directories:
+            directories.remove(".git")
+        files.extend((Path(directory) / name).relative_to(root) for name in names)
+    return sorted(files)
+
+
+def matches(hook: str, relative: Path, read_head: Callable[[], bytes]) -> bool:
+    files_re, types = FILE_RULES[hook]
+    if files_re is not None and not files_re.search(relative.as_posix()):
+        return False
+    return types <= file_types(relative, read_head)
+
+
+def load_processor(hook: str) -> tuple[type[FileProcessor], list[str]]:
+    module, entry_argv = HOOKS[hook]
+    processor_type: type[FileProcessor] = importlib.import_module(
+        f"pre_commit_hooks.{module}"
+    ).Processor
+    return processor_type, entry_argv
+
+
+# Every worker thread gets its own processors, as processors are allowed to keep
+#  state between files. Network lookups are cached per process, so they are
+#  shared by all workers and repositories.
+_worker = threading.local()
+
+
+def get_processor(hook: str) -> FileProcessor:
+    processors: dict[str, FileProcessor] | None = getattr(_worker, "processors", None)
+    if processors is None:
+        processors = _worker.processors = {}
+    if hook not in processors:
+        processor_type, entry_argv = load_processor(hook)
+        processors[hook] = processor_type(processor_type.parse_args([*entry_argv, "-"]))
+    return processors[hook]
+
+
+# The hooks to run on a file, in order
+type Task = tuple[list[str], Path, Path]
+
+
+def process(task: Task, *, fix: bool) -> tuple[int, list[Diagnostic]]:
+    hooks, root, relative = task
+    file = root / relative
+    # Most files of the matching types don't use what the hook checks
+    processors = [
+        (hook, processor)
+        for hook in hooks
+        if (processor := get_processor(hook)).prefilter([file])
+    ]
+    if not processors:
+        return 0, []
+
+    logger = Logger.from_file(file)
+    changed = False
+    with collect() as diagnostics:
+        try:
+            content = file.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"can't read file ({e})")
+            return logger.retval, diagnostics
+
+        # One hook after another, so their fixes don't overwrite each other.
+        #  Like with pre-commit, each hook sees the fixes of the hooks before it.
+        new_content = content
+        for hook, processor in processors:
+            processor.start_file(file)
+            text = processor.process_content(new_content, logger=logger)
+            if text == new_content:
+                continue
+            changed = True
+            if fix:
+                new_content = text
+            else:
+                logger.error(f"{hook} can fix this file, run with --fix")
+        if new_content != content:
+            file.write_text(new_content, encoding="utf-8")
+    # Like pre-commit, fixing a file counts as a failure
+    return logger.retval | changed, diagnostics
+
+
+def tasks(roots: Sequence[Path], hooks: Sequence[str]) -> Iterator[Task]:
+    for root in roots:
+        for relative in discover(root):
+            read = functools.partial(read_head, root / relative)
+            file_hooks = [hook for hook in hooks if matches(hook, relative, read)]
+            if file_hooks:
+                yield file_hooks, root, relative
+
+
+def prefetch_all(work: Sequence[Task], hooks: Sequence[str]) -> list[Diagnostic]:
+    # The lookups of all repositories are made at once
+    diagnostics = []
+    for hook in hooks:
+        processor_type, entry_argv = load_processor(hook)
+        if not processor_type.network_bound:
+            continue
+        files = [
+            root / relative for file_hooks, root, relative in work if hook in file_hooks
+        ]
+        diagnostics += prefetch(
+            processor_type,
+            processor_type.parse_args([*entry_argv, "-"]),
+            processor_type.prefilter(files),
+        )
+    return diagnostics
+
+
+def parse_args(argv: Sequence[str] | None) -> Args:
+    parser = ArgumentParser(
+        description="Run hooks on many repositories at once, sharing network lookups",
+        # For long lists of repositories: `@repos.txt`, one per line
+        fromfile_prefix_chars="@",
+    )
+    parser.add_argument("roots", nargs="+", type=Path, help="repository checkouts")
+    parser.add_argument(
+        "--hook",
+        dest="hooks",
+        action="append",
+        choices=FILE_RULES,
+        help=f"hook id to run, can be repeated (default: {", ".join(DEFAULT_HOOKS)})",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="amount of files to process in parallel (default: based on CPU count)",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="cache network lookups between runs",
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="apply autofixes, instead of reporting the files they would change",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        help="output format for diagnostics",
+    )
+    parser.add_argument(
+        "--group",
+        action="store_true",
+        help="print each distinct diagnostic once, with a count (text format only)",
+    )
+    return parser.parse_args(argv, namespace=Args())
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    from concurrent.futures import (  # ruff:ignore[import-outside-top-level]
+        ThreadPoolExecutor,
+    )
+
+    args = parse_args(argv)
+    hooks = args.hooks or DEFAULT_HOOKS
+    work = list(tasks(args.roots, hooks))
+    if args.cache:
+        cache.open_cache()
+    early_diagnostics = prefetch_all(work, hooks)
+
+    reporter = make_reporter(
+        args.format,
+        sys.stdout,
+        tool="pre-commit-hooks-fleet",
+        version=cache.package_version(),
+        flush_per_file=True,
+        group=args.group,
+    )
+    reporter.add(early_diagnostics)
+    retval = 0
+    # Threads, as the hooks spend their time waiting on the network
+    with ThreadPoolExecutor(
+        max_workers=args.jobs or min(32, (os.cpu_count() or 1) * 4)
+    ) as executor:
+        # `map` yields in input order, so the report is stable
+        for file_retval, diagnostics in executor.map(
+            functools.partial(process, fix=args.fix), work
+        ):
+            reporter.add(diagnostics)
+            retval |= file_retval
+    reporter.close()
+
+    if cache.current is not None:
+        cache.close_cache()
+    return retval
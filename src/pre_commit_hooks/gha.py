@@ -1,23 +1,61 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import json
+from typing import TYPE_CHECKING, ClassVar
 
+from pre_commit_hooks.cache import get_resolution, set_resolution
 from pre_commit_hooks.common.lines import line_replace
 from pre_commit_hooks.common.util import is_valid_sha1
 from pre_commit_hooks.common.versions import process_version
+from pre_commit_hooks.github import RESOLVERS, get_resolver, repository
 from pre_commit_hooks.logger import Error
-from pre_commit_hooks.network import is_connected, request
+from pre_commit_hooks.network import Unreachable
 from pre_commit_hooks.processors import LineProcessor
 
 
 if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+    import pre_commit_hooks
+    from pre_commit_hooks.github import Resolver, ResolverName
     from pre_commit_hooks.logger import Logger
+    from pre_commit_hooks.parallel import ExecutorType
+
+    class Args(pre_commit_hooks.processors.Args):
+        resolver: ResolverName
+
+
+# How long network lookups are cached with `--cache`. Tags are rarely moved,
+#  but branches move all the time.
+TAGS_TTL = 24 * 60 * 60
+REF_TTL = 60 * 60
 
 
 class Processor(LineProcessor):
     remove_comments = False  # GHA expects a comment.
+    executor: ClassVar[ExecutorType] = "thread"  # Network-bound
+    network_bound = True
+    stateless = True
+    triggers: ClassVar[tuple[bytes, ...]] = (b"uses:",)
+
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--resolver",
+            choices=RESOLVERS,
+            default="auto",
+            help="how to look up tags and branches: with the REST API, with "
+            "batched GraphQL queries (needs a GitHub token), or with `git "
+            "ls-remote` (needs no token, and isn't rate limited). Default: "
+            "GraphQL if there is a token.",
+        )
+
+    def __init__(self, args: Args) -> None:
+        super().__init__(args)
+        self.resolver = get_resolver(args.resolver)
 
-    def process_line_internal(  # ruff:ignore[no-self-use]
+    def process_line_internal(
         self, orig_line: str, line: str, logger: Logger
     ) -> str | None:
         line = line.strip().removeprefix("- ")
@@ -28,7 +66,9 @@ class Processor(LineProcessor):
         try:
             action_digest, version = line.split("#")
         except ValueError:
-            return process_line_no_comment(orig_line, line, logger)
+            return process_line_no_comment(
+                orig_line, line, logger, resolver=self.resolver
+            )
 
         version = version.strip()
         action_digest = action_digest.strip()
@@ -44,11 +84,13 @@ class Processor(LineProcessor):
 
         logger.use_defaults("gha", "action", action)
 
-        return process_version_gha(orig_line, action, digest, version, logger=logger)
+        return process_version_gha(
+            orig_line, action, digest, version, logger=logger, resolver=self.resolver
+        )
 
 
 def process_line_no_comment(  # ruff:ignore[too-many-return-statements]
-    orig_line: str, line: str, logger: Logger
+    orig_line: str, line: str, logger: Logger, *, resolver: Resolver
 ) -> str | None:
     try:
         action, digest_or_version = line.split("@")
@@ -64,7 +106,9 @@ def process_line_no_comment(  # ruff:ignore[too-many-return-statements]
             id="no-version",
             msg="no '#' but using digest; add a comment with a tag",
         ):
-            full_version = get_full_version(action, digest, "no-version", logger=logger)
+            full_version = get_full_version(
+                action, digest, "no-version", logger=logger, resolver=resolver
+            )
             if full_version is not None:
                 return line_replace(
                     orig_line, line, f"{line} # {full_version}", logger=logger
@@ -74,30 +118,38 @@ def process_line_no_comment(  # ruff:ignore[too-many-return-statements]
     version = digest_or_version
     if logger.error(
         id="no-digest",
-        msg=f"no '#', using tag or branch ({version}) instead of digest.",
+        msg="no '#', using tag or branch ({}) instead of digest.",
+        args=(version,),
     ):
-        digest_ret = get_digest(action, version, logger=logger)
+        digest_ret = get_digest(action, version, resolver=resolver)
         if digest_ret is None:
-            process_version_gha(orig_line, action, None, version, logger=logger)
+            process_version_gha(
+                orig_line, action, None, version, logger=logger, resolver=resolver
+            )
             return None
         digest = digest_ret
         orig_line = line_replace(
             orig_line, version, f"{digest} # {version}", logger=logger
         )
-        ret = process_version_gha(orig_line, action, digest, version, logger=logger)
+        ret = process_version_gha(
+            orig_line, action, digest, version, logger=logger, resolver=resolver
+        )
         if ret is not None:
             return ret
         return orig_line
-    return process_version_gha(orig_line, action, None, version, logger=logger)
+    return process_version_gha(
+        orig_line, action, None, version, logger=logger, resolver=resolver
+    )
 
 
-def process_version_gha(  # ruff:ignore[too-many-return-statements]
+def process_version_gha(  # ruff:ignore[too-many-return-statements, too-many-arguments]
     orig_line: str,
     action: str,
     digest: str | None,
     version: str,
     *,
     logger: Logger,
+    resolver: Resolver,
 ) -> str | None:
     # When allowing `main` or `master`, there's no use in trying to find a tag,
     #  as we want should be using `main` or `master` anyway. Most likely this
@@ -106,8 +158,9 @@ def process_version_gha(  # ruff:ignore[too-many-return-statements]
         if version != logger.allow:
             logger.error(
                 id=f"not-{logger.allow}",
-                msg=f"expected {logger.allow}, as it was specified with "
-                f"an `allow-` comment, or a default allow.",
+                msg="expected {}, as it was specified with "
+                "an `allow-` comment, or a default allow.",
+                args=(logger.allow,),
             )
         return None
 
@@ -118,11 +171,21 @@ def process_version_gha(  # ruff:ignore[too-many-return-statements]
     if error.id in {"major-minor", "major", "mutable-rev"}:
         if version in {"main", "master"}:
             error = Error(
-                id=version, msg=f"using '{version}' branch. Can you use a tag instead?"
+                id=version,
+                msg="using '{}' branch. Can you use a tag instead?",
+                args=(version,),
             )
 
         if logger.error(error) and digest is not None:
-            full_version = get_full_version(action, digest, error.id, logger=logger)
+            full_version = get_full_version(
+                action,
+                digest,
+                error.id,
+                logger=logger,
+                resolver=resolver,
+                # Only the tags of the version are searched, like `v1.*` for `v1`
+                prefix=version if error.id in {"major-minor", "major"} else None,
+            )
             if full_version is None:
                 return None
             if full_version == version:
@@ -143,19 +206,19 @@ def process_version_gha(  # ruff:ignore[too-many-return-statements]
     return None
 
 
-def get_full_version(
+def get_full_version(  # ruff:ignore[too-many-arguments]
     action: str,
     digest: str,
     id: str,  # ruff:ignore[builtin-argument-shadowing]
     *,
     logger: Logger,
+    resolver: Resolver,
+    prefix: str | None = None,
 ) -> str | None:
-    if not is_connected():
+    matching_tags = get_matching_tags(action, digest, resolver=resolver, prefix=prefix)
+    if matching_tags is None:
         return None
 
-    tags = request(f"https://api.github.com/repos/{action}/tags")
-    matching_tags: list[str] = [t["name"] for t in tags if t["commit"]["sha"] == digest]
-
     if len(matching_tags) == 0:
         logger.warn(
             f"Could not find a tag matching commit {digest}. "
@@ -166,7 +229,7 @@ def get_full_version(
         return matching_tags[0]
 
     for tag in matching_tags:
-        if process_version(tag) is None:
+        if is_full_version(tag):
             return tag
 
     logger.warn(
@@ -177,12 +240,48 @@ def get_full_version(
     return None
 
 
-def get_digest(action: str, ref: str, *, logger: Logger) -> str | None:  # ruff:ignore[unused-function-argument]
-    if not is_connected():
+def is_full_version(tag: str) -> bool:
+    return process_version(tag) is None
+
+
+def get_matching_tags(
+    action: str, digest: str, *, resolver: Resolver, prefix: str | None = None
+) -> list[str] | None:
+    # Searches stop at the first full version, and with a prefix only look at
+    #  the tags of that version. So these are some of the matching tags, which
+    #  depend on the prefix.
+    key = f"{action}@{digest}" if prefix is None else f"{action}@{digest}#{prefix}"
+    cached = get_resolution("gha-tags", key)
+    if cached is not None:
+        matching_tags: list[str] = json.loads(cached)
+        return matching_tags
+
+    try:
+        found = resolver.matching_tags(
+            repository(action), digest, prefix=prefix, enough=is_full_version
+        )
+    except Unreachable:
         return None
+    if found is None:
+        return None
+    set_resolution("gha-tags", key, json.dumps(found), ttl=TAGS_TTL)
+    return found
+
+
+def get_digest(action: str, ref: str, *, resolver: Resolver) -> str | None:
+    key = f"{action}@{ref}"
+    cached = get_resolution("gha-ref", key)
+    if cached is not None:
+        return cached
 
-    data = request(f"https://api.github.com/repos/{action}/commits/{ref}")
-    return data["sha"]  # type: ignore[no-any-return]
+    try:
+        digest = resolver.commit(repository(action), ref)
+    except Unreachable:
+        return None
+    if digest is None:
+        return None
+    set_resolution("gha-ref", key, digest, ttl=REF_TTL)
+    return digest
 
 
 main = Processor.main
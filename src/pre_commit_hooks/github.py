@@ -0,0 +1,553 @@
+from __future__ import annotations
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from functools import cache, cached_property
+from typing import TYPE_CHECKING, Any, Literal, NoReturn
+
+from pre_commit_hooks import network
+from pre_commit_hooks.common.util import is_valid_sha1
+from pre_commit_hooks.network import (
+    RateLimited,
+    Unreachable,
+    Unresolved,
+    post,
+    request,
+)
+from pre_commit_hooks.report import Diagnostic, report
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Mapping
+
+
+type ResolverName = Literal["auto", "rest", "graphql", "git"]
+RESOLVERS: tuple[ResolverName, ...] = ("auto", "rest", "graphql", "git")
+
+# A tag name, and the commit it points to (also for annotated tags)
+type Tag = tuple[str, str]
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Repositories per GraphQL query. Every repository costs a few hundred nodes, far
+#  below the limit of 500,000 per query.
+GRAPHQL_BATCH = 50
+# The tags of a repository that are looked up per query, most recent first. The
+#  next pages are only looked up when a search needs them.
+TAGS_PER_REPOSITORY = 100
+# Tags per page of the REST API, the most it allows
+TAGS_PER_PAGE = 100
+# Where `GitResolver` finds repositories
+GIT_URL = "https://github.com/{}"
+# Concurrent `git ls-remote` processes while flushing
+GIT_JOBS = 8
+
+
+def repository(action: str) -> str:
+    # Actions can be in a subdirectory, like `github/codeql-action/init`
+    return "/".join(action.split("/")[:2])
+
+
+class Resolver(ABC):
+    """Looks up the refs and tags of GitHub repositories."""
+
+    # The commit `ref` (a branch, tag or commit) of `repo` points to, `None` if
+    #  there's no such ref
+    @abstractmethod
+    def commit(self, repo: str, ref: str) -> str | None: ...
+
+    # `None` if there's no such repository
+    @abstractmethod
+    def tags(self, repo: str) -> list[Tag] | None: ...
+
+    def matching_tags(
+        self,
+        repo: str,
+        commit: str,
+        *,
+        prefix: str | None,  # ruff:ignore[unused-method-argument]
+        enough: Callable[[str], bool],
+    ) -> list[str] | None:
+        """
+        Find the tags of `repo` that point to `commit`.
+
+        Resolvers can stop looking once a tag is `enough`, and look at the tags
+        that are `prefix` or start with `prefix.` first.
+
+        Returns:
+            The tags found, `None` if there's no such repository
+
+        """
+        tags = self.tags(repo)
+        if tags is None:
+            return None
+        return search(tags, commit, enough)
+
+
+def search(
+    tags: Iterable[Tag], commit: str, enough: Callable[[str], bool]
+) -> list[str]:
+    # Lazy `tags` are only consumed up to the first tag that is `enough`
+    matches = []
+    for name, sha in tags:
+        if sha == commit:
+            matches.append(name)
+            if enough(name):
+                break
+    return matches
+
+
+class RestResolver(Resolver):
+    """
+    Uses the REST API, with a request per lookup.
+
+    Tags are paged through lazily, most recent first, so finding the tag of a
+    recent commit usually takes a single request.
+    """
+
+    def commit(self, repo: str, ref: str) -> str | None:  # ruff:ignore[no-self-use]
+        data = request(f"https://api.github.com/repos/{repo}/commits/{ref}")
+        sha: str = data["sha"]
+        return sha
+
+    def tags(self, repo: str) -> list[Tag] | None:
+        return list(self.paged_tags(repo))
+
+    def matching_tags(
+        self,
+        repo: str,
+        commit: str,
+        *,
+        prefix: str | None,
+        enough: Callable[[str], bool],
+    ) -> list[str] | None:
+        if prefix is not None:
+            matches = search(self.prefixed_tags(repo, prefix), commit, enough)
+            # Otherwise the prefix is wrong, so all tags are searched
+            if matches:
+                return matches
+        return search(self.paged_tags(repo), commit, enough)
+
+    def paged_tags(self, repo: str) -> Iterator[Tag]:  # ruff:ignore[no-self-use]
+        for page in itertools.count(1):
+            tags = request(
+                f"https://api.github.com/repos/{repo}/tags",
+                frozenset({("per_page", str(TAGS_PER_PAGE)), ("page", str(page))}),
+            )
+            yield from ((tag["name"], tag["commit"]["sha"]) for tag in tags)
+            if len(tags) < TAGS_PER_PAGE:
+                return
+
+    def prefixed_tags(self, repo: str, prefix: str) -> Iterator[Tag]:  # ruff:ignore[no-self-use]
+        refs = request(
+            f"https://api.github.com/repos/{repo}/git/matching-refs/tags/{prefix}"
+        )
+        for ref in refs:
+            name = ref["ref"].removeprefix("refs/tags/")
+            # `v1` also matches `v10` and `v1-beta`
+            if name != prefix and not name.startswith(f"{prefix}."):
+                continue
+            target = ref["object"]
+            if target["type"] == "tag":
+                # An annotated tag, which points to the commit. Only looked up
+                #  when the tags before it weren't enough.
+                target = request(
+                    f"https://api.github.com/repos/{repo}/git/tags/{target["sha"]}"
+                )["object"]
+            yield name, target["sha"]
+
+
+class GraphQLResolver(Resolver):
+    """
+    Uses the GraphQL API, looking up many repositories in a single query.
+
+    While planning (see `pre_commit_hooks.prefetch`), lookups are queued, and
+    `flush` makes all of them at once. Later lookups use those results. Lookups
+    that weren't planned are made right away, in a query of their own.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # Why queries fail, once they do. The lookups are skipped after that.
+        self.failure: str | None = None
+        self.commits: dict[tuple[str, str], str | None] = {}
+        self.tag_lists: dict[str, list[Tag] | None] = {}
+        # Where the next page of tags starts, `None` once all tags were looked up
+        self.cursors: dict[str, str | None] = {}
+        self.pending_commits: set[tuple[str, str]] = set()
+        self.pending_tags: set[str] = set()
+        # Lookups that `flush` made already. Failed ones are queued again by
+        #  each planning round, but are only made again while processing.
+        self.flushed_commits: set[tuple[str, str]] = set()
+        self.flushed_tags: set[str] = set()
+        network.batches.append(self.flush)
+
+    def commit(self, repo: str, ref: str) -> str | None:
+        with self.lock:
+            if (repo, ref) in self.commits:
+                return self.commits[repo, ref]
+            if network.planning.get() is not None:
+                self.pending_commits.add((repo, ref))
+                # The tags are usually needed next, to find the version of the
+                #  commit. Getting them in the same query is nearly free.
+                if repo not in self.tag_lists:
+                    self.pending_tags.add(repo)
+                raise Unresolved(repo)
+        self.query({(repo, ref)}, set())
+        return self.commits.get((repo, ref))
+
+    def tags(self, repo: str) -> list[Tag] | None:
+        if self.first_tags(repo) is None:
+            return None
+        return list(self.all_tags(repo))
+
+    def matching_tags(
+        self,
+        repo: str,
+        commit: str,
+        *,
+        prefix: str | None,  # ruff:ignore[unused-method-argument]
+        enough: Callable[[str], bool],
+    ) -> list[str] | None:
+        if self.first_tags(repo) is None:
+            return None
+        return search(self.all_tags(repo), commit, enough)
+
+    # The first page of tags, which is looked up together with the refs
+    def first_tags(self, repo: str) -> list[Tag] | None:
+        with self.lock:
+            if repo in self.tag_lists:
+                return self.tag_lists[repo]
+            if network.planning.get() is not None:
+                self.pending_tags.add(repo)
+                raise Unresolved(repo)
+        self.query(set(), {repo})
+        return self.tag_lists.get(repo)
+
+    def all_tags(self, repo: str) -> Iterator[Tag]:
+        # The next pages are looked up as the tags are consumed
+        index = 0
+        while True:
+            with self.lock:
+                tags = self.tag_lists.get(repo) or []
+                cursor = self.cursors.get(repo)
+            yield from tags[index:]
+            index = len(tags)
+            if cursor is None:
+                return
+            # Rarely needed, so left for processing instead of batched
+            if network.planning.get() is not None:
+                raise Unresolved(repo)
+            self.query(set(), {repo}, after={repo: cursor})
+
+    def flush(self) -> bool:
+        with self.lock:
+            commits = self.pending_commits - self.flushed_commits
+            tags = self.pending_tags - self.flushed_tags
+            self.pending_commits, self.pending_tags = set(), set()
+            self.flushed_commits |= commits
+            self.flushed_tags |= tags
+        repos = sorted({repo for repo, _ref in commits} | tags)
+        for start in range(0, len(repos), GRAPHQL_BATCH):
+            batch = set(repos[start : start + GRAPHQL_BATCH])
+            # Failed lookups are made (and reported) again while processing
+            try:
+                self.query(
+                    {(repo, ref) for repo, ref in commits if repo in batch},
+                    tags & batch,
+                )
+            except Exception:  # ruff:ignore[blind-except]
+                break
+        return bool(repos)
+
+    def query(
+        self,
+        commits: set[tuple[str, str]],
+        tags: set[str],
+        *,
+        after: dict[str, str] | None = None,
+    ) -> None:
+        repos = sorted({repo for repo, _ref in commits} | tags)
+        refs = {repo: sorted(ref for r, ref in commits if r == repo) for repo in repos}
+        after = after or {}
+        if self.failure is not None:
+            raise Unreachable(GRAPHQL_URL)
+        import requests  # ruff:ignore[import-outside-top-level]
+
+        try:
+            response = post(GRAPHQL_URL, {"query": build_query(refs, tags, after)})
+        except requests.HTTPError as err:
+            # Like a token that is invalid or expired
+            self.fail(str(err))
+        # Missing repositories are errors too, but leave the rest of the data
+        data = response.get("data")
+        if data is None:
+            errors = response.get("errors") or []
+            if any(error.get("type") == "RATE_LIMITED" for error in errors):
+                # The limit resets within the hour. The headers usually say when
+                #  (see `Scheduler.update`); otherwise hold back like for a host
+                #  that can't be reached.
+                host = network.host_of(GRAPHQL_URL)
+                network.scheduler.pause(host, network.UNREACHABLE_TTL)
+                network.warn_rate_limited(host)
+                raise RateLimited(GRAPHQL_URL)
+            self.fail("; ".join(error.get("message", "") for error in errors))
+        with self.lock:
+            for i, repo in enumerate(repos):
+                result = data.get(f"r{i}")
+                for j, ref in enumerate(refs[repo]):
+                    target = result and result[f"f{j}"] and result[f"f{j}"]["target"]
+                    self.commits[repo, ref] = target and peel(target)
+                if repo in tags:
+                    self.add_tags(repo, result and result["tags"], after.get(repo))
+
+    # Holds `self.lock`
+    def add_tags(  # type: ignore[explicit-any]
+        self,
+        repo: str,
+        page: dict[str, Any] | None,
+        after: str | None,
+    ) -> None:
+        if page is None:
+            self.tag_lists[repo] = None
+            return
+        if after is not None and self.cursors.get(repo) != after:
+            # Another thread looked up this page already
+            return
+        tags = [(node["name"], peel(node["target"])) for node in page["nodes"]]
+        if after is not None:
+            tags = [*(self.tag_lists.get(repo) or []), *tags]
+        self.tag_lists[repo] = tags
+        info = page["pageInfo"]
+        self.cursors[repo] = info["endCursor"] if info["hasNextPage"] else None
+
+    def fail(self, reason: str) -> NoReturn:
+        if self.failure is None:
+            self.failure = reason
+            report(
+                Diagnostic(
+                    None,
+                    None,
+                    "warning",
+                    f"GitHub GraphQL queries fail ({reason}), running without the "
+                    f"autofixes that need them. Use `--resolver rest` or "
+                    f"`--resolver git` to look up tags and branches another way.",
+                )
+            )
+        raise Unreachable(GRAPHQL_URL)
+
+
+def build_query(
+    refs: dict[str, list[str]], tags: Iterable[str], after: Mapping[str, str]
+) -> str:
+    """
+    Build a query for the `refs` and `tags` of the repositories in `refs`.
+
+    The tags of the repositories in `after` start after that cursor.
+
+    Returns:
+        A query with an alias per repository (`r0`, `r1`, ...), with an alias
+        per ref (`f0`, `f1`, ...) and `tags` if requested
+
+    """
+    fields = []
+    for i, (repo, repo_refs) in enumerate(refs.items()):
+        owner, name = repo.split("/")
+        repo_fields = [
+            f"f{j}: ref(qualifiedName: {json.dumps(ref)}) {{ target {{ ...Oid }} }}"
+            for j, ref in enumerate(repo_refs)
+        ]
+        if repo in tags:
+            cursor = f", after: {json.dumps(after[repo])}" if repo in after else ""
+            repo_fields.append(
+                f'tags: refs(refPrefix: "refs/tags/", first: {TAGS_PER_REPOSITORY}, '
+                f"orderBy: {{field: TAG_COMMIT_DATE, direction: DESC}}{cursor}) "
+                "{ nodes { name target { ...Oid } } "
+                "pageInfo { hasNextPage endCursor } }"
+            )
+        fields.append(
+            f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) "
+            f"{{ {" ".join(repo_fields)} }}"
+        )
+    # Annotated tags point to a tag object, which points to the commit
+    return (
+        f"query {{ {" ".join(fields)} }} "
+        "fragment Oid on GitObject { oid ... on Tag { target { oid } } }"
+    )
+
+
+def peel(target: dict[str, object]) -> str:
+    inner = target.get("target")
+    oid = inner["oid"] if isinstance(inner, dict) else target["oid"]
+    assert isinstance(oid, str)  # ruff:ignore[assert]
+    return oid
+
+
+class GitResolver(Resolver):
+    """
+    Uses `git ls-remote`, which needs no token and isn't rate limited.
+
+    A single call lists all branches and tags of a repository, so it answers
+    both kinds of lookups. Like with `GraphQLResolver`, the lookups queued while
+    planning are made at once by `flush`.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.refs: dict[str, dict[str, str] | None] = {}
+        self.pending: set[str] = set()
+        # Like in `GraphQLResolver`
+        self.flushed: set[str] = set()
+        network.batches.append(self.flush)
+
+    def commit(self, repo: str, ref: str) -> str | None:
+        if is_valid_sha1(ref):
+            return ref
+        refs = self.lookup(repo)
+        if refs is None:
+            return None
+        # Like git, prefer a tag over a branch with the same name
+        return refs.get(f"refs/tags/{ref}") or refs.get(f"refs/heads/{ref}")
+
+    def tags(self, repo: str) -> list[Tag] | None:
+        refs = self.lookup(repo)
+        if refs is None:
+            return None
+        return [
+            (name.removeprefix("refs/tags/"), sha)
+            for name, sha in refs.items()
+            if name.startswith("refs/tags/")
+        ]
+
+    def lookup(self, repo: str) -> dict[str, str] | None:
+        with self.lock:
+            if repo in self.refs:
+                return self.refs[repo]
+            if network.planning.get() is not None:
+                self.pending.add(repo)
+                raise Unresolved(repo)
+        refs = ls_remote(repo)
+        with self.lock:
+            self.refs[repo] = refs
+        return refs
+
+    def flush(self) -> bool:
+        from concurrent.futures import (  # ruff:ignore[import-outside-top-level]
+            ThreadPoolExecutor,
+        )
+
+        with self.lock:
+            repos, self.pending = self.pending - self.flushed, set()
+            self.flushed |= repos
+
+        def lookup(repo: str) -> None:
+            # Failed lookups are made (and reported) again while processing
+            try:
+                refs = ls_remote(repo)
+            except Unreachable:
+                return
+            with self.lock:
+                self.refs[repo] = refs
+
+        if repos:
+            with ThreadPoolExecutor(max_workers=min(len(repos), GIT_JOBS)) as executor:
+                # So diagnostics are collected like those of the caller
+                futures = [
+                    executor.submit(contextvars.copy_context().run, lookup, repo)
+                    for repo in repos
+                ]
+                for future in futures:
+                    future.result()
+        return bool(repos)
+
+
+def ls_remote(repo: str) -> dict[str, str] | None:
+    """
+    List the branches and tags of `repo` with `git ls-remote`.
+
+    Returns:
+        The commit of every ref (like `refs/tags/v1`), with annotated tags
+        peeled. `None` if there's no such repository.
+
+    Raises:
+        Unreachable: When running offline, when the host can't be reached, or
+            when git can't be run
+
+    """
+    import subprocess  # ruff:ignore[import-outside-top-level]
+
+    url = GIT_URL.format(repo)
+    if not network.is_connected(url):
+        raise Unreachable(url)
+    try:
+        out = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+            ["git", "ls-remote", "--tags", "--heads", url],  # ruff:ignore[start-process-with-partial-path]
+            # Missing repositories ask for credentials, as they could be private
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            capture_output=True,
+            text=True,
+            timeout=60,
+            check=True,
+        ).stdout
+    except subprocess.CalledProcessError as err:
+        if "unable to access" not in err.stderr:
+            return None
+        network.mark_unreachable(network.host_of(url), Exception(err.stderr.strip()))
+        raise Unreachable(url) from err
+    except subprocess.TimeoutExpired as err:
+        network.mark_unreachable(network.host_of(url), err)
+        raise Unreachable(url) from err
+    except OSError as err:
+        raise Unreachable(url) from err
+
+    refs: dict[str, str] = {}
+    for line in out.splitlines():
+        sha, name = line.split("\t")
+        if name.endswith("^{}"):
+            # The commit an annotated tag points to, listed after the tag object
+            refs[name.removesuffix("^{}")] = sha
+        else:
+            refs.setdefault(name, sha)
+    return refs
+
+
+class AutoResolver(Resolver):
+    """Uses GraphQL if there's a GitHub token (which it requires), otherwise REST."""
+
+    @cached_property
+    def backend(self) -> Resolver:
+        return get_resolver("graphql" if network.gh_token() else "rest")
+
+    def commit(self, repo: str, ref: str) -> str | None:
+        return self.backend.commit(repo, ref)
+
+    def tags(self, repo: str) -> list[Tag] | None:
+        return self.backend.tags(repo)
+
+    def matching_tags(
+        self,
+        repo: str,
+        commit: str,
+        *,
+        prefix: str | None,
+        enough: Callable[[str], bool],
+    ) -> list[str] | None:
+        return self.backend.matching_tags(repo, commit, prefix=prefix, enough=enough)
+
+
+# Shared by all processors in the process, like the lookups of `request`
+@cache
+def get_resolver(name: ResolverName) -> Resolver:
+    resolver_types: dict[ResolverName, type[Resolver]] = {
+        "auto": AutoResolver,
+        "rest": RestResolver,
+        "graphql": GraphQLResolver,
+        "git": GitResolver,
+    }
+    return resolver_types[name]()
+
+
+network.lookup_caches.append(get_resolver.cache_clear)
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import operator
+import sys
+from argparse import ArgumentParser
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import cache, fleet
+from pre_commit_hooks.common.git import CatFile, ls_tree, rev_list
+from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.network import offline
+from pre_commit_hooks.report import FORMATS, Diagnostic, Format, collect, make_reporter
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from pre_commit_hooks.report import Level
+
+
+class Args(argparse.Namespace):
+    revisions: list[str]
+    repo: Path
+    hooks: list[str] | None
+    online: bool
+    stats: bool
+    format: Format
+    group: bool
+
+
+# What a diagnostic is about, regardless of where in the file it is. Lines move
+#  around between commits, so line numbers can't tell if a problem is new.
+type Key = tuple[Level, str | None, str]
+
+
+def key(diagnostic: Diagnostic) -> Key:
+    return diagnostic.level, diagnostic.id, diagnostic.message
+
+
+class Audit:
+    """
+    Finds the commits that introduced diagnostics.
+
+    Blobs are analysed once per hook, no matter how many commits and paths
+    they appear in.
+    """
+
+    def __init__(
+        self, repo: Path, hooks: Sequence[str], parents: Iterable[str] = ()
+    ) -> None:
+        self.repo = repo
+        self.hooks = hooks
+        self.cat_file = CatFile(repo)
+        # By hook and blob id
+        self.analysed: dict[tuple[str, str], list[Diagnostic]] = {}
+        # The blob of each path, by commit. Only kept while commits that have
+        #  `parents` as a parent are left to analyse.
+        self.trees: dict[str, dict[str, str]] = {}
+        self.children = Counter(parents)
+
+    def tree(self, commit: str) -> dict[str, str]:
+        if commit not in self.trees:
+            self.trees[commit] = ls_tree(commit, cwd=self.repo)
+        return self.trees[commit]
+
+    def analyse(
+        self, hook: str, path: str, oid: str, content: bytes
+    ) -> list[Diagnostic]:
+        if (hook, oid) in self.analysed:
+            return self.analysed[hook, oid]
+
+        diagnostics: list[Diagnostic] = []
+        processor = fleet.get_processor(hook)
+        if not processor.triggers or any(t in content for t in processor.triggers):
+            try:
+                text = content.decode("utf-8")
+            except UnicodeDecodeError:
+                text = None
+            if text is not None:
+                file = Path(path)
+                with collect() as diagnostics:
+                    processor.start_file(file)
+                    # Only the diagnostics are used, nothing is written
+                    processor.process_content(text, logger=Logger.from_file(file))
+        self.analysed[hook, oid] = diagnostics
+        return diagnostics
+
+    def counts(self, hook: str, path: str, oid: str | None) -> Counter[Key]:
+        if oid is None:
+            return Counter()
+        read = functools.cache(functools.partial(self.cat_file.read, oid))
+        if not fleet.matches(hook, Path(path), read):
+            return Counter()
+        return Counter(map(key, self.analyse(hook, path, oid, read())))
+
+    def commit(self, commit: str, parents: Sequence[str]) -> list[Diagnostic]:
+        """
+        Analyse the files of `commit` that changed since its parents.
+
+        Returns:
+            The diagnostics that weren't there in any of the parents, with the
+            commit in their file name
+
+        """
+        blobs = self.tree(commit)
+        # Root commits start from scratch
+        before = [self.tree(parent) for parent in parents] or [{}]
+        introduced = []
+        for path, oid in blobs.items():
+            # Unchanged since a parent, so nothing is new
+            if any(tree.get(path) == oid for tree in before):
+                continue
+            # Only read if a hook needs the content
+            read = functools.cache(functools.partial(self.cat_file.read, oid))
+            for hook in self.hooks:
+                if not fleet.matches(hook, Path(path), read):
+                    continue
+                diagnostics = self.analyse(hook, path, oid, read())
+                counts = Counter(map(key, diagnostics))
+                # A merge only introduces what none of its parents had
+                new = functools.reduce(
+                    operator.and_,
+                    (
+                        counts - self.counts(hook, path, tree.get(path))
+                        for tree in before
+                    ),
+                )
+                for diagnostic in diagnostics:
+                    if new[key(diagnostic)] > 0:
+                        new[key(diagnostic)] -= 1
+                        introduced.append(
+                            Diagnostic(
+                                Path(f"{commit[:12]}:{path}"),
+                                diagnostic.lnr,
+                                diagnostic.level,
+                                diagnostic.message,
+                                diagnostic.id,
+                            )
+                        )
+        for parent in parents:
+            self.children[parent] -= 1
+            if self.children[parent] <= 0:
+                del self.trees[parent]
+        if self.children[commit] <= 0:
+            del self.trees[commit]
+        return introduced
+
+    def close(self) -> None:
+        self.cat_file.close()
+
+
+def parse_args(argv: Sequence[str] | None) -> Args:
+    parser = ArgumentParser(
+        description="Find the commits that introduced problems, "
+        "without checking them out",
+    )
+    parser.add_argument(
+        "revisions",
+        nargs="*",
+        default=["HEAD"],
+        help="commits to audit, as passed to `git rev-list` (default: HEAD)",
+    )
+    parser.add_argument(
+        "--repo",
+        type=Path,
+        default=Path(),
+        help="repository to audit (default: current directory)",
+    )
+    parser.add_argument(
+        "--hook",
+        dest="hooks",
+        action="append",
+        choices=fleet.FILE_RULES,
+        help=f"hook id to run, can be repeated "
+        f"(default: {", ".join(fleet.DEFAULT_HOOKS)})",
+    )
+    parser.add_argument(
+        "--online",
+        action="store_true",
+        help="allow network lookups, for the diagnostics that need them",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print how many commits and distinct files were analysed",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        help="output format for diagnostics",
+    )
+    parser.add_argument(
+        "--group",
+        action="store_true",
+        help="print each distinct diagnostic once, with a count (text format only)",
+    )
+    return parser.parse_args(argv, namespace=Args())
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    commits = rev_list(args.revisions, cwd=args.repo)
+
+    reporter = make_reporter(
+        args.format,
+        sys.stdout,
+        tool="pre-commit-hooks-history",
+        version=cache.package_version(),
+        flush_per_file=True,
+        group=args.group,
+    )
+    audit = Audit(
+        args.repo,
+        args.hooks or fleet.DEFAULT_HOOKS,
+        (parent for _, parents in commits for parent in parents),
+    )
+    retval = 0
+    # Old revisions have many distinct files, and the autofixes aren't needed
+    token = offline.set(not args.online)
+    try:
+        # Each commit is compared to its parents, so only problems introduced
+        #  in the range are reported
+        for commit, parents in commits:
+            introduced = audit.commit(commit, parents)
+            reporter.add(introduced)
+            retval |= bool(introduced)
+    finally:
+        offline.reset(token)
+        audit.close()
+    reporter.close()
+
+    if args.stats:
+        print(
+            f"Analysed {len(audit.analysed)} distinct files in {len(commits)} commits",
+            file=sys.stdout if args.format == "text" else sys.stderr,
+        )
+    return retval
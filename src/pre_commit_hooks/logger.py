@@ -1,26 +1,30 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Self, overload
 
-from termcolor import colored
-
 from pre_commit_hooks.default_allows import default_allows, infos
+from pre_commit_hooks.report import Diagnostic, report
 
 
 if TYPE_CHECKING:
     from pathlib import Path
 
+    from pre_commit_hooks.report import Level
+
 
-@dataclass
+# Line processors reuse a single line logger for all lines of a file (see
+#  `at_line`), so nothing is allocated for lines without diagnostics.
+@dataclass(slots=True)
 class Logger:
     file: Path
     lnr: int | None
     allow: str | None
-
-    def __post_init__(self) -> None:
-        self.retval = 0
-        self.info: str | None = None
+    retval: int = field(default=0, init=False)
+    info: str | None = field(default=None, init=False)
+    # Set for lines that weren't changed in incremental mode. Errors are
+    #  suppressed, and don't trigger autofixes.
+    quiet: bool = field(default=False, init=False)
 
     @classmethod
     def from_file(cls, file: Path) -> Self:
@@ -35,6 +39,14 @@ class Logger:
             raise ValueError(msg)
         return self.__class__(self.file, lnr, allow)
 
+    def at_line(self, lnr: int, allow: str | None, *, quiet: bool = False) -> None:
+        # Move a line logger to another line. `retval` is kept, so it can be
+        #  consumed by the file logger once all lines are processed.
+        self.lnr = lnr
+        self.allow = allow
+        self.info = None
+        self.quiet = quiet
+
     def use_defaults(self, hook: str, key_type: str, key: str) -> None:
         default_allow = default_allows[hook].get(key)
         if default_allow:
@@ -55,16 +67,13 @@ class Logger:
     def consume(self, other: Self) -> None:
         self.retval |= other.retval
 
-    def log_no_info(self, msg: str) -> None:
-        if self.lnr is not None:
-            print(f"({self.file}:{self.lnr + 1}) {msg}")
-        else:
-            print(f"({self.file}) {msg}")
+    def report(self, diagnostic: Diagnostic) -> None:  # ruff:ignore[no-self-use]
+        report(diagnostic)
 
-    def log(self, msg: str) -> None:
-        self.log_no_info(msg)
+    def log(self, level: Level, msg: str, id: str | None = None) -> None:  # ruff:ignore[builtin-argument-shadowing]
+        self.report(Diagnostic(self.file, self.lnr, level, msg, id))
         if self.info is not None:
-            self.log_no_info(colored("Info", "light_blue") + f": {self.info}")
+            self.report(Diagnostic(self.file, self.lnr, "info", self.info))
 
     # It's allowed to pass a string in here, which means some errors
     #  will not have ids. But `allow-all` will still block these, as
@@ -72,7 +81,7 @@ class Logger:
     @overload
     def error(self, error: Error | str) -> bool: ...
     @overload
-    def error(self, *, id: str, msg: str) -> bool: ...
+    def error(self, *, id: str, msg: str, args: tuple[object, ...] = ()) -> bool: ...
 
     def error(
         self,
@@ -80,6 +89,7 @@ class Logger:
         *,
         id: str | None = None,  # ruff:ignore[builtin-argument-shadowing]  # This is nice for caller
         msg: str | None = None,
+        args: tuple[object, ...] = (),
     ) -> bool:
         """
         Log an error.
@@ -92,23 +102,35 @@ class Logger:
             # Guaranteed because of the overload
             assert id is not None  # ruff:ignore[assert]
             assert msg is not None  # ruff:ignore[assert]
-            error = Error(id, msg)
+            error = Error(id, msg, args)
 
-        if isinstance(error, Error) and error.id == self.allow:
+        if self.quiet or (isinstance(error, Error) and error.id == self.allow):
             return False
 
-        self.log(colored("Error", "light_red") + f": {error}")
+        if isinstance(error, Error):
+            self.log("error", error.message, error.id)
+        else:
+            self.log("error", error)
         self.retval |= 1
         return True
 
     def warn(self, msg: str) -> None:
-        self.log(colored("Warning", "yellow") + f": {msg}")
+        if self.quiet:
+            return
+        self.log("warning", msg)
 
 
-@dataclass
+# `msg` is formatted with `args` only when the error is actually logged, so
+#  errors that are allowed or quiet don't pay for building their message.
+@dataclass(slots=True, frozen=True)
 class Error:
     id: str
     msg: str
+    args: tuple[object, ...] = ()
+
+    @property
+    def message(self) -> str:
+        return self.msg.format(*self.args) if self.args else self.msg
 
     def __str__(self) -> str:
-        return f"[{self.id}] {self.msg}"
+        return f"[{self.id}] {self.message}"
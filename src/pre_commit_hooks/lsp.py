@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import difflib
+import json
+import re
+import sys
+import threading
+import urllib.parse
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pre_commit_hooks import docker, docker_apt_renovate, gha
+from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.network import offline
+from pre_commit_hooks.report import collect
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+    from concurrent.futures import ThreadPoolExecutor
+    from typing import BinaryIO
+
+    from pre_commit_hooks.processors import LineProcessor
+    from pre_commit_hooks.report import Diagnostic
+
+
+type Json = Any  # type: ignore[explicit-any]
+
+
+# The hooks that are run on a document, like the `files` and `types` in
+#  `.pre-commit-hooks.yaml`
+HOOKS: list[tuple[str, re.Pattern[str], set[str], type[LineProcessor]]] = [
+    (
+        "gha-pin",
+        re.compile(r"\.ya?ml$"),
+        {"yaml", "github-actions-workflow"},
+        gha.Processor,
+    ),
+    (
+        "docker-image-pin",
+        re.compile(r"docker-compose\.ya?ml$|Dockerfile$"),
+        {"dockercompose", "dockerfile"},
+        docker.Processor,
+    ),
+    (
+        "docker-apt-renovate",
+        re.compile(r"Dockerfile$"),
+        {"dockerfile"},
+        docker_apt_renovate.Processor,
+    ),
+]
+
+SEVERITIES = {"error": 1, "warning": 2, "info": 3}
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+
+def uri_to_path(uri: str) -> Path:
+    return Path(urllib.parse.unquote(urllib.parse.urlparse(uri).path))
+
+
+def utf16_len(s: str) -> int:
+    if s.isascii():
+        return len(s)
+    return len(s.encode("utf-16-le")) // 2
+
+
+# Positions in LSP count UTF-16 code units
+def utf16_to_index(line: str, character: int) -> int:
+    if line.isascii():
+        return min(character, len(line))
+    units = 0
+    for index, c in enumerate(line):
+        if units >= character:
+            return index
+        units += 2 if ord(c) > 0xFFFF else 1  # ruff:ignore[magic-value-comparison]
+    return len(line)
+
+
+def line_range(start: int, end: int) -> Json:
+    # Whole lines, `end` exclusive. A position past the last line is clamped
+    #  by the editor.
+    return {
+        "start": {"line": start, "character": 0},
+        "end": {"line": end, "character": 0},
+    }
+
+
+class Analysis:
+    """
+    The diagnostics of a single hook for a document.
+
+    Stateless processors are re-run on edited lines only. Other processors
+    depend on previous lines (e.g. the `FROM` line for a `RUN` line), so they
+    are re-run on the whole document, which is fine for the sizes of those
+    files.
+    """
+
+    def __init__(
+        self, hook: str, processor_type: type[LineProcessor], file: Path
+    ) -> None:
+        self.hook = hook
+        self.processor_type = processor_type
+        self.args = processor_type.parse_args([str(file)])
+        self.file = file
+        self.processor = processor_type(self.args)
+        self.cursor = Logger.from_file(file).with_line(0, None)
+        # Per line
+        self.diagnostics: list[list[Diagnostic]] = []
+
+    def run_all(self, lines: Sequence[str]) -> None:
+        if self.processor_type.stateless:
+            self.diagnostics = self.run_lines(lines, 0, len(lines))
+            return
+
+        # A new processor, so no state is left from the previous run
+        processor = self.processor_type(self.args)
+        with collect() as diagnostics:
+            processor.process_lines(lines, logger=Logger.from_file(self.file))
+        self.diagnostics = self.by_line(diagnostics, 0, len(lines))
+
+    def update(self, lines: Sequence[str], start: int, end: int, count: int) -> None:
+        # Lines `start` up to `end` were replaced by `count` lines
+        if not self.processor_type.stateless:
+            self.run_all(lines)
+            return
+        self.diagnostics[start:end] = self.run_lines(lines, start, start + count)
+
+    def run_lines(
+        self, lines: Sequence[str], start: int, end: int
+    ) -> list[list[Diagnostic]]:
+        with collect() as diagnostics:
+            for lnr in range(start, end):
+                self.processor.process_line(lnr, lines[lnr], logger=self.cursor)
+        return self.by_line(diagnostics, start, end)
+
+    @staticmethod
+    def by_line(
+        diagnostics: Iterable[Diagnostic], start: int, end: int
+    ) -> list[list[Diagnostic]]:
+        result: list[list[Diagnostic]] = [[] for _ in range(start, end)]
+        for diagnostic in diagnostics:
+            # Skip diagnostics about the run itself, like the offline warning
+            if diagnostic.file is None:
+                continue
+            lnr = diagnostic.lnr or 0
+            if start <= lnr < end:
+                result[lnr - start].append(diagnostic)
+        return result
+
+
+class Document:
+    def __init__(self, uri: str, language_id: str, version: int, text: str) -> None:
+        self.uri = uri
+        self.version = version
+        self.lines = text.splitlines(keepends=True)
+        self.file = uri_to_path(uri)
+        self.analyses = [
+            Analysis(hook, processor_type, self.file)
+            for hook, pattern, language_ids, processor_type in HOOKS
+            if language_id in language_ids or pattern.search(self.file.name)
+        ]
+        for analysis in self.analyses:
+            analysis.run_all(self.lines)
+        # Proposed edits by the autofixes, for `fixes_version`
+        self.fixes: list[Json] = []
+        self.fixes_version: int | None = None
+
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    def change(self, change: Json) -> None:
+        if "range" not in change:
+            self.lines = change["text"].splitlines(keepends=True)
+            for analysis in self.analyses:
+                analysis.run_all(self.lines)
+            return
+
+        start = change["range"]["start"]
+        end = change["range"]["end"]
+        # A position can be just after the last line
+        start_line = (
+            self.lines[start["line"]] if start["line"] < len(self.lines) else ""
+        )
+        end_line = self.lines[end["line"]] if end["line"] < len(self.lines) else ""
+        new_lines = (
+            start_line[: utf16_to_index(start_line, start["character"])]
+            + change["text"]
+            + end_line[utf16_to_index(end_line, end["character"]) :]
+        ).splitlines(keepends=True)
+        end_lnr = min(end["line"] + 1, len(self.lines))
+        self.lines[start["line"] : end_lnr] = new_lines
+        for analysis in self.analyses:
+            analysis.update(self.lines, start["line"], end_lnr, len(new_lines))
+
+    def diagnostics(self) -> list[Json]:
+        return [
+            {
+                "range": {
+                    "start": {"line": lnr, "character": 0},
+                    "end": {
+                        "line": lnr,
+                        "character": utf16_len(self.lines[lnr].rstrip("\r\n")),
+                    },
+                },
+                "severity": SEVERITIES[diagnostic.level],
+                "code": diagnostic.id,
+                "source": analysis.hook,
+                "message": diagnostic.message,
+            }
+            for analysis in self.analyses
+            for lnr, diagnostics in enumerate(analysis.diagnostics)
+            for diagnostic in diagnostics
+        ]
+
+    def has_errors(self) -> bool:
+        return any(
+            diagnostic.level == "error"
+            for analysis in self.analyses
+            for diagnostics in analysis.diagnostics
+            for diagnostic in diagnostics
+        )
+
+
+def compute_fixes(document: Document, text: str) -> list[Json]:
+    """
+    Run the autofixes of all hooks on `text`, with network access.
+
+    Returns:
+        The edits to `text`, as LSP `TextEdit`s
+
+    """
+    offline.set(False)
+    new_text = text
+    for analysis in document.analyses:
+        processor = analysis.processor_type(analysis.args)
+        with collect():
+            new_text = processor.process_content(
+                new_text, logger=Logger.from_file(document.file)
+            )
+
+    lines = text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(a=lines, b=new_lines, autojunk=False)
+    return [
+        {
+            "range": line_range(i1, i2),
+            "newText": "".join(new_lines[j1:j2]),
+        }
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def resolve_fixes(document: Document, version: int, text: str) -> None:
+    # Skip if the document changed while this was queued
+    if document.version != version:
+        return
+    fixes = compute_fixes(document, text)
+    if document.version == version:
+        document.fixes = fixes
+        document.fixes_version = version
+
+
+class Server:
+    def __init__(self, reader: BinaryIO, writer: BinaryIO) -> None:
+        from concurrent.futures import (  # ruff:ignore[import-outside-top-level]
+            ThreadPoolExecutor,
+        )
+
+        self.reader = reader
+        self.writer = writer
+        self.write_lock = threading.Lock()
+        self.documents: dict[str, Document] = {}
+        # Autofixes wait on the network, so they are resolved in the background
+        self.fixer: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+        self.shutdown_requested = False
+        self.handlers: dict[str, Callable[[Json], Json]] = {
+            "initialize": self.initialize,
+            "shutdown": self.shutdown,
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+            "textDocument/codeAction": self.code_action,
+        }
+
+    def read_message(self) -> Json | None:
+        length = None
+        while True:
+            header = self.reader.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        if length is None:
+            return None
+        return json.loads(self.reader.read(length))
+
+    def send(self, message: Json) -> None:
+        body = json.dumps({"jsonrpc": "2.0", **message}).encode()
+        with self.write_lock:
+            self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            self.writer.flush()
+
+    def notify(self, method: str, params: Json) -> None:
+        self.send({"method": method, "params": params})
+
+    def serve(self) -> int:
+        # Diagnostics must never wait on the network
+        offline.set(True)
+        try:
+            while (message := self.read_message()) is not None:
+                if message.get("method") == "exit":
+                    break
+                self.dispatch(message)
+        finally:
+            self.fixer.shutdown(wait=False, cancel_futures=True)
+        return 0 if self.shutdown_requested else 1
+
+    def dispatch(self, message: Json) -> None:
+        method = message.get("method")
+        handler = self.handlers.get(method) if method is not None else None
+        if "id" not in message:
+            # Notifications, including unsupported ones, don't get a response
+            if handler is not None:
+                handler(message.get("params"))
+            return
+        if handler is None:
+            self.send({
+                "id": message["id"],
+                "error": {
+                    "code": METHOD_NOT_FOUND,
+                    "message": f"unsupported method {method}",
+                },
+            })
+            return
+        try:
+            result = handler(message.get("params"))
+        except Exception as e:  # ruff:ignore[blind-except]
+            self.send({
+                "id": message["id"],
+                "error": {"code": INTERNAL_ERROR, "message": str(e)},
+            })
+        else:
+            self.send({"id": message["id"], "result": result})
+
+    def initialize(self, _params: Json) -> Json:  # ruff:ignore[no-self-use]
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": 2},
+                "codeActionProvider": {"codeActionKinds": ["quickfix"]},
+            },
+            "serverInfo": {"name": "pre-commit-hooks"},
+        }
+
+    def shutdown(self, _params: Json) -> None:
+        self.shutdown_requested = True
+
+    def did_open(self, params: Json) -> None:
+        item = params["textDocument"]
+        document = Document(
+            item["uri"], item["languageId"], item["version"], item["text"]
+        )
+        self.documents[document.uri] = document
+        self.publish(document)
+
+    def did_change(self, params: Json) -> None:
+        document = self.documents[params["textDocument"]["uri"]]
+        for change in params["contentChanges"]:
+            document.change(change)
+        document.version = params["textDocument"]["version"]
+        self.publish(document)
+
+    def did_close(self, params: Json) -> None:
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self.notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []})
+
+    def publish(self, document: Document) -> None:
+        self.notify(
+            "textDocument/publishDiagnostics",
+            {
+                "uri": document.uri,
+                "version": document.version,
+                "diagnostics": document.diagnostics(),
+            },
+        )
+        if document.has_errors():
+            self.fixer.submit(
+                resolve_fixes, document, document.version, document.text()
+            )
+
+    def code_action(self, params: Json) -> Json:
+        document = self.documents.get(params["textDocument"]["uri"])
+        if document is None or document.fixes_version != document.version:
+            # Not resolved (yet), the editor will ask again
+            return []
+        start = params["range"]["start"]["line"]
+        end = params["range"]["end"]["line"]
+        fixes = [
+            fix
+            for fix in document.fixes
+            if fix["range"]["start"]["line"] <= end
+            and max(fix["range"]["end"]["line"] - 1, fix["range"]["start"]["line"])
+            >= start
+        ]
+        actions = [
+            {
+                "title": "Apply pin fix",
+                "kind": "quickfix",
+                "edit": {"changes": {document.uri: [fix]}},
+            }
+            for fix in fixes
+        ]
+        if len(document.fixes) > 1:
+            actions.append({
+                "title": "Apply all pin fixes",
+                "kind": "quickfix",
+                "edit": {"changes": {document.uri: document.fixes}},
+            })
+        return actions
+
+
+def main() -> int:
+    return Server(sys.stdin.buffer, sys.stdout.buffer).serve()
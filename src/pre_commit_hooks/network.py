@@ -1,37 +1,163 @@
 from __future__ import annotations
 
-import socket
+import contextlib
+import contextvars
+import dataclasses
+import json as jsonlib
+import os
+import threading
+import time
+from contextvars import ContextVar
 from functools import cache
-from typing import Any, Literal, overload
+from typing import TYPE_CHECKING, Any, Literal, overload
 
-import ghtoken
-import requests
-from termcolor import colored
+from pre_commit_hooks import cache as cache_module, ratelimit
+from pre_commit_hooks.report import Diagnostic, report
 
 
-REMOTE_SERVER = "one.one.one.one"
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
 
+    import requests
 
-@cache
-def is_connected() -> bool:
+
+# With `--cache`, responses are fresh for this long. After that, they're used for
+#  another `stale_while_revalidate()` seconds while they're revalidated in the
+#  background. Revalidating is cheap: GitHub doesn't count 304 responses
+#  against the rate limit.
+FRESH_TTL = 10 * 60
+STALE_WHILE_REVALIDATE = 24 * 60 * 60
+# 404s and responses that can't be parsed are cached for a shorter time
+NEGATIVE_TTL = 60 * 60
+# How long to wait for background revalidations before closing the cache
+REFRESH_TIMEOUT = 2
+
+# Background revalidations
+refreshes: list[threading.Thread] = []
+
+# Set to run without network access (and so without network-backed autofixes)
+#  in the current context, e.g. for diagnostics that must never wait on it.
+offline: ContextVar[bool] = ContextVar("offline", default=False)
+
+# The arguments of a `fetch` call
+type Need = tuple[str, frozenset[tuple[str, str]] | None, bool]
+# Set while planning, see `pre_commit_hooks.prefetch`. Requests that weren't made
+#  yet are added to it, instead of being made.
+planning: ContextVar[set[Need] | None] = ContextVar("planning", default=None)
+# Lookups that are batched (like GraphQL queries) are queued while planning,
+#  instead of being added to `planning`. After planning, these make the queued
+#  lookups, and return whether there were any.
+batches: list[Callable[[], bool]] = []
+
+
+class Unresolved(Exception):  # ruff:ignore[error-suffix-on-exception-name]
+    """Raised by `request` while planning, for requests that weren't made yet."""
+
+
+class Unreachable(Exception):  # ruff:ignore[error-suffix-on-exception-name]
+    """Raised by `request` when the host can't be reached, or lookups are off."""
+
+
+class RateLimited(Unreachable):
+    """Raised by `request` when the rate limit of the host won't reset soon."""
+
+
+# Set to any value but "0" to run without network lookups (and so without
+#  network-backed autofixes), without trying to connect
+OFFLINE_ENV = "PRE_COMMIT_HOOKS_OFFLINE"
+# After a lookup on a host fails to connect, the host isn't tried again for this
+#  long. This is shared with other processes (like the other hooks of a
+#  pre-commit run), so each of them doesn't wait for the same timeout.
+UNREACHABLE_TTL = 5 * 60
+
+# Until when hosts aren't tried again, by host
+unreachable_until: dict[str, float] = {}
+# Hosts that were warned about, see `reset_warnings`
+unreachable_warned: set[str] = set()
+unreachable_lock = threading.Lock()
+
+
+def is_connected(url: str) -> bool:
+    """
+    Find out if lookups on the host of `url` should be made.
+
+    Nothing is probed: hosts are assumed to be reachable, until a lookup on
+    them fails to connect.
+
+    Returns:
+        `False` when running offline, or when the host couldn't be reached
+        recently
+
+    """
+    if is_offline():
+        return False
+    host = host_of(url)
+    # Under the lock, so a marker written by a concurrent lookup isn't taken
+    #  for one of another process, and the warning is only reported once
+    with unreachable_lock:
+        if host not in unreachable_until:
+            unreachable_until[host] = marked_until(host)
+        connected = time.time() >= unreachable_until[host]
+        warn = not connected and host not in unreachable_warned
+        if warn:
+            unreachable_warned.add(host)
+    if warn:
+        warn_unreachable(host, "it couldn't be reached recently")
+    return connected
+
+
+def is_offline() -> bool:
+    return offline.get() or os.environ.get(OFFLINE_ENV, "") not in {"", "0"}
+
+
+def host_of(url: str) -> str:
+    import urllib.parse  # ruff:ignore[import-outside-top-level]
+
+    return urllib.parse.urlsplit(url).netloc
+
+
+def marker(host: str) -> Path:
+    return cache_module.user_cache_dir() / "unreachable" / host.replace(":", "_")
+
+
+# When other processes marked `host` as unreachable, see `mark_unreachable`
+def marked_until(host: str) -> float:
     try:
-        # See if we can resolve the host name - tells us if there is
-        # A DNS listening
-        host = socket.gethostbyname(REMOTE_SERVER)
-        # Connect to the host - tells us if the host is actually reachable
-        s = socket.create_connection((host, 80), 2)
-        s.close()
-        return True  # ruff:ignore[try-consider-else]
-    except Exception as err:  # ruff:ignore[blind-except]
-        print(
-            colored("Warning", "yellow") + f": no network connection detected "
-            f"(error: {err}), running without autofixes. "
-            f"If you're seeing this in CI, you can fix most "
-            f"of these errors automatically by running this hook "
-            f"locally."
-        )
+        return marker(host).stat().st_mtime + UNREACHABLE_TTL
+    except OSError:
+        return 0
 
-    return False
+
+def mark_unreachable(host: str, error: Exception) -> None:
+    # Concurrent lookups can fail at the same time, but one warning is enough
+    with unreachable_lock:
+        marked = time.time() < unreachable_until.get(host, 0)
+        unreachable_until[host] = time.time() + UNREACHABLE_TTL
+        warn = host not in unreachable_warned
+        unreachable_warned.add(host)
+    if not marked:
+        # Not being able to share this only costs other processes a timeout
+        with contextlib.suppress(OSError):
+            marker(host).parent.mkdir(parents=True, exist_ok=True)
+            marker(host).touch()
+    if warn:
+        warn_unreachable(host, f"error: {error}")
+
+
+def warn_unreachable(host: str, reason: str) -> None:
+    report(
+        Diagnostic(
+            None,
+            None,
+            "warning",
+            f"can't reach {host} ({reason}), running without the autofixes "
+            f"that need it for the next {UNREACHABLE_TTL // 60} minutes. "
+            f"Set {OFFLINE_ENV}=1 to skip network lookups entirely. "
+            f"If you're seeing this in CI, you can fix most of these errors "
+            f"automatically by running this hook locally.",
+        )
+    )
 
 
 @overload
@@ -46,26 +172,374 @@ def request(  # type: ignore[explicit-any]
 def request(  # type: ignore[explicit-any]
     url: str, params: frozenset[tuple[str, str]] | None = None
 ) -> Any: ...  # ruff:ignore[any-type]
-@cache
-def request(  # type: ignore[explicit-any, misc]
+def request(  # type: ignore[explicit-any]
     url: str, params: frozenset[tuple[str, str]] | None = None, *, json: bool = True
 ) -> Any:
-    headers = {}
+    return fetch(url, params, json=json)
+
+
+# Cached by all arguments, no matter how `request` was called
+@cache
+def fetch(  # type: ignore[explicit-any, misc]
+    url: str, params: frozenset[tuple[str, str]] | None, *, json: bool
+) -> Any:  # ruff:ignore[any-type]
+    # `cache` doesn't store exceptions, so this is only reached for requests that
+    #  weren't made yet
+    needs = planning.get()
+    if needs is not None:
+        needs.add((url, params, json))
+        raise Unresolved(url)
+
+    store = cache_module.current
+    if store is None:
+        if not is_connected(url):
+            raise Unreachable(url)
+        response = get(url, params)
+        response.raise_for_status()
+        return response.json() if json else response.text
+
+    key = response_key(url, params)
+    cached = store.get_response(key)
+    now = time.time()
+    # Answers that are already cached don't need a connection
+    if cached is not None and now < cached.expires:
+        return parse(cached, json=json)
+    # Errors aren't served stale
+    stale = (
+        cached
+        if cached is not None
+        and cached.status < 400  # ruff:ignore[magic-value-comparison]
+        and now < cached.expires + stale_while_revalidate()
+        else None
+    )
+    if not is_connected(url):
+        if stale is not None:
+            return parse(stale, json=json)
+        raise Unreachable(url)
+    if stale is not None:
+        # Use it right away, and have it revalidated for the next run
+        # In a copy of this context, so diagnostics are collected like those of
+        #  the lookup
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(refresh, store, key, url, params, stale),
+            kwargs={"json": json},
+            daemon=True,
+        )
+        thread.start()
+        refreshes.append(thread)
+        return parse(stale, json=json)
+    return parse(revalidate(store, key, url, params, cached, json=json), json=json)
+
+
+def stale_while_revalidate() -> float:
+    value = os.environ.get("PRE_COMMIT_HOOKS_STALE_WHILE_REVALIDATE")
+    return STALE_WHILE_REVALIDATE if value is None else float(value)
+
+
+def wait_for_refreshes() -> None:
+    deadline = time.monotonic() + REFRESH_TIMEOUT
+    for thread in refreshes:
+        thread.join(max(0, deadline - time.monotonic()))
+    refreshes.clear()
+
+
+def response_key(url: str, params: frozenset[tuple[str, str]] | None) -> str:
+    if not params:
+        return url
+    import urllib.parse  # ruff:ignore[import-outside-top-level]
+
+    return f"{url}?{urllib.parse.urlencode(sorted(params))}"
+
+
+def get(
+    url: str,
+    params: frozenset[tuple[str, str]] | None,
+    headers: dict[str, str] | None = None,
+) -> requests.Response:
+    return send("GET", url, headers=headers, params=params)
+
+
+def post(url: str, body: object) -> Any:  # type: ignore[explicit-any]  # ruff:ignore[any-type]
+    """
+    Send `body` as JSON, for APIs that take queries that way (like GraphQL).
+
+    Unlike `request`, this isn't cached, so callers keep the results they need.
+
+    Returns:
+        The JSON response
+
+    Raises:
+        Unreachable: When running offline, or when the host can't be reached
+
+    """
+    if not is_connected(url):
+        raise Unreachable(url)
+    response = send("POST", url, json=body)
+    response.raise_for_status()
+    return response.json()
+
+
+def send(
+    method: str,
+    url: str,
+    *,
+    headers: dict[str, str] | None = None,
+    params: frozenset[tuple[str, str]] | None = None,
+    json: object = None,
+) -> requests.Response:
+    import requests  # ruff:ignore[import-outside-top-level]
+
+    headers = dict(headers or {})
     if url.startswith("https://api.github.com"):
         token = gh_token()
         if token:
             headers["Authorization"] = f"token {token}"
 
-    resp = requests.get(url, timeout=60, headers=headers, params=params)
-    resp.raise_for_status()
-    if json:
-        return resp.json()
-    return resp.text
+    host = host_of(url)
+    retries = 0
+    while True:
+        if not scheduler.acquire(host):
+            warn_rate_limited(host)
+            raise RateLimited(url)
+        try:
+            response = session(url).request(
+                method,
+                url,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                headers=headers,
+                params=params,
+                json=json,
+            )
+        except (requests.ConnectionError, requests.Timeout) as err:
+            mark_unreachable(host, err)
+            raise Unreachable(url) from err
+        # Rate limited responses are retried once `acquire` is done waiting.
+        #  A rate limit that keeps coming back is skipped like a long one.
+        if not scheduler.update(host, response.status_code, response.headers):
+            return response
+        if retries == RATE_LIMIT_RETRIES:
+            warn_rate_limited(host)
+            raise RateLimited(url)
+        retries += 1
+
+
+# Requests to a host are spaced out, and wait for its rate limit instead of
+#  failing, see `Scheduler`
+scheduler = ratelimit.Scheduler()
+os.register_at_fork(after_in_child=scheduler.reset)
+# Rate limited responses are retried this often, when the host asks for a short
+#  wait
+RATE_LIMIT_RETRIES = 3
+# Hosts that were warned about, see `warn_rate_limited` and `reset_warnings`
+rate_limited_hosts: set[str] = set()
+
+
+def warn_rate_limited(host: str) -> None:
+    if host in rate_limited_hosts:
+        return
+    rate_limited_hosts.add(host)
+    report(
+        Diagnostic(
+            None,
+            None,
+            "warning",
+            f"the rate limit of {host} won't reset soon, running without the "
+            f"autofixes that need it. Set a GitHub token (GH_TOKEN) for a higher "
+            f"rate limit of the GitHub API.",
+        )
+    )
+
+
+# Connections kept open per host. Enough for the thread pools of the parallel
+#  runner and fleet mode, so concurrent lookups don't wait for a connection.
+POOL_SIZE = 32
+# Transient server errors are retried, after 0.5, 1 and 2 seconds. `Retry-After`
+#  headers are left to the `scheduler`, which holds back the other requests to
+#  the host too.
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+# Lookups decide whether a host can be reached, so a host that doesn't answer
+#  fails fast (and isn't retried), like a connection probe would. Responses can
+#  take longer.
+CONNECT_TIMEOUT = 2
+READ_TIMEOUT = 60
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+# A session per host (scheme and port included), so connections are reused
+#  instead of doing a new TCP and TLS handshake for every lookup. Sessions are
+#  shared by threads; their connection pools are thread-safe.
+sessions: dict[str, requests.Session] = {}
+sessions_lock = threading.Lock()
+# Connections can't be shared with forked worker processes
+os.register_at_fork(after_in_child=sessions.clear)
+
+
+def session(url: str) -> requests.Session:
+    import urllib.parse  # ruff:ignore[import-outside-top-level]
+
+    parts = urllib.parse.urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    with sessions_lock:
+        if origin not in sessions:
+            sessions[origin] = make_session()
+        return sessions[origin]
+
+
+def make_session() -> requests.Session:
+    import requests  # ruff:ignore[import-outside-top-level]
+
+    # `urllib3` is only a dependency of `requests`, so use its re-export
+    from requests.adapters import (  # ruff:ignore[import-outside-top-level]
+        HTTPAdapter,
+        Retry,
+    )
+
+    adapter = HTTPAdapter(
+        pool_maxsize=POOL_SIZE,
+        max_retries=Retry(
+            total=RETRIES,
+            connect=0,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods={"GET"},
+            respect_retry_after_header=False,
+            # Let `raise_for_status` report the last response
+            raise_on_status=False,
+        ),
+    )
+    new_session = requests.Session()
+    new_session.mount("https://", adapter)
+    new_session.mount("http://", adapter)
+    return new_session
+
+
+def revalidate(  # ruff:ignore[too-many-arguments]
+    store: cache_module.Cache,
+    key: str,
+    url: str,
+    params: frozenset[tuple[str, str]] | None,
+    cached: cache_module.CachedResponse | None,
+    *,
+    json: bool,
+) -> cache_module.CachedResponse:
+    response = get(url, params, cached.validators() if cached is not None else None)
+    now = time.time()
+    if response.status_code == 304 and cached is not None:  # ruff:ignore[magic-value-comparison]
+        result = dataclasses.replace(cached, expires=now + FRESH_TTL)
+    elif response.status_code == 404:  # ruff:ignore[magic-value-comparison]
+        result = cache_module.CachedResponse(
+            url, 404, "", None, None, now + NEGATIVE_TTL
+        )
+    else:
+        # Other errors (like rate limits) are not cached
+        response.raise_for_status()
+        result = cache_module.CachedResponse(
+            url,
+            response.status_code,
+            response.text,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            now + FRESH_TTL,
+        )
+        if json and not is_json(result.body):
+            result = dataclasses.replace(result, expires=now + NEGATIVE_TTL)
+    store.set_response(key, result)
+    return result
+
+
+def refresh(  # ruff:ignore[too-many-arguments]
+    store: cache_module.Cache,
+    key: str,
+    url: str,
+    params: frozenset[tuple[str, str]] | None,
+    cached: cache_module.CachedResponse,
+    *,
+    json: bool,
+) -> None:
+    # Nobody waits on this, so it yields to the lookups that are waited on
+    ratelimit.background.set(True)
+    # If this fails, the stale response is revalidated again on the next run
+    with contextlib.suppress(Exception):
+        revalidate(store, key, url, params, cached, json=json)
+
+
+def is_json(text: str) -> bool:
+    try:
+        jsonlib.loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+def parse(  # type: ignore[explicit-any]
+    response: cache_module.CachedResponse, *, json: bool
+) -> Any:  # ruff:ignore[any-type]
+    if response.status >= 400:  # ruff:ignore[magic-value-comparison]
+        import requests  # ruff:ignore[import-outside-top-level]
+
+        # Raise like `requests` does for a response that wasn't cached
+        error = requests.Response()
+        error.status_code = response.status
+        error.url = response.url
+        error.reason = "(cached)"
+        error.raise_for_status()
+    return jsonlib.loads(response.body) if json else response.body
 
 
 @cache
 def gh_token() -> str | None:
+    import ghtoken  # ruff:ignore[import-outside-top-level]
+
     try:
         return ghtoken.get_ghtoken()
     except ghtoken.GHTokenNotFound:
         return None
+
+
+# Other in-memory caches of lookups (like the resolvers of `github`), cleared
+#  along with those of `fetch`
+lookup_caches: list[Callable[[], None]] = []
+# When the lookups kept in memory were last cleared, in `time.monotonic()` seconds
+lookups_cleared = time.monotonic()
+
+
+def clear_lookups() -> None:
+    global lookups_cleared  # ruff:ignore[global-statement]
+    fetch.cache_clear()
+    gh_token.cache_clear()
+    for cache_clear in lookup_caches:
+        cache_clear()
+    # The flushers of the resolvers that were just dropped
+    batches.clear()
+    lookups_cleared = time.monotonic()
+
+
+def reset_warnings() -> None:
+    """
+    Warn again about the hosts that lookups skip.
+
+    Hosts are warned about once per run. Processes that run the hooks more than
+    once (like the daemon) call this before each run, so every run that skips
+    a host says so.
+    """
+    with unreachable_lock:
+        unreachable_warned.clear()
+    rate_limited_hosts.clear()
+
+
+def expire_lookups() -> bool:
+    """
+    Forget the lookups kept in memory once they are `FRESH_TTL` old.
+
+    For processes that run the hooks more than once (like the daemon), so
+    their answers don't get older than those of the persistent cache.
+
+    Returns:
+        Whether the lookups were forgotten
+
+    """
+    if time.monotonic() - lookups_cleared < FRESH_TTL:
+        return False
+    clear_lookups()
+    return True
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+from typing import TYPE_CHECKING, Literal
+
+from pre_commit_hooks import cache
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+    from pathlib import Path
+
+    from pre_commit_hooks.logger import Logger
+    from pre_commit_hooks.processors import Args, FileProcessor
+    from pre_commit_hooks.report import Diagnostic
+
+
+type ExecutorType = Literal["process", "thread"]
+
+
+# Starting a worker costs about as much as processing this many bytes in-process,
+#  so we don't start more workers than the total size of the files warrants.
+BYTES_PER_JOB = 256 * 1024
+
+
+def default_jobs(files: Sequence[Path]) -> int:
+    total_size = 0
+    for file in files:
+        # Nonexistent files will be reported by the processor itself
+        with contextlib.suppress(OSError):
+            total_size += file.stat().st_size
+    return max(1, min(os.cpu_count() or 1, len(files), total_size // BYTES_PER_JOB))
+
+
+# Every worker (process or thread) gets its own processor instance, as
+#  processors are allowed to keep state between lines and files.
+_worker = threading.local()
+
+
+def _init_worker(
+    processor_type: type[FileProcessor], args: Args, logger_type: type[Logger]
+) -> None:
+    if args.cache:
+        cache.open_cache()
+    _worker.processor = processor_type(args)
+    _worker.logger_type = logger_type
+
+
+def _process_file(file: Path) -> tuple[int, list[Diagnostic]]:
+    processor: FileProcessor = _worker.processor
+    return processor.process_file_captured(file, logger_type=_worker.logger_type)
+
+
+def process_files_parallel(
+    processor_type: type[FileProcessor],
+    args: Args,
+    files: Sequence[Path],
+    *,
+    jobs: int,
+    logger_type: type[Logger],
+) -> Iterator[tuple[int, list[Diagnostic]]]:
+    from concurrent.futures import (  # ruff:ignore[import-outside-top-level]
+        ProcessPoolExecutor,
+        ThreadPoolExecutor,
+    )
+
+    executor_type = (
+        ThreadPoolExecutor
+        if processor_type.executor == "thread"
+        else ProcessPoolExecutor
+    )
+    with executor_type(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(processor_type, args, logger_type),
+    ) as executor:
+        # `map` yields in input order, so the output is stable regardless
+        #  of which worker finishes first.
+        yield from executor.map(
+            _process_file, files, chunksize=max(1, len(files) // (jobs * 4))
+        )
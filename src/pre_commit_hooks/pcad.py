@@ -7,12 +7,12 @@ from typing import TYPE_CHECKING
 
 from packaging.requirements import Requirement
 
-from pre_commit_hooks.processors import FileProcessor
-from pre_commit_hooks.yaml import yaml
+from pre_commit_hooks.yaml import YamlProcessor
 
 
 if TYPE_CHECKING:
     from argparse import ArgumentParser
+    from collections.abc import Sequence
 
     from ruamel.yaml import CommentedMap  # type: ignore[attr-defined]
 
@@ -28,7 +28,7 @@ def normalize_package(name: str) -> str:
     return re.sub(r"[-_.]+", "-", name).lower()
 
 
-class Processor(FileProcessor):
+class Processor(YamlProcessor):
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
         parser.add_argument(
@@ -49,6 +49,14 @@ class Processor(FileProcessor):
             default=Path("uv.lock"),
         )
 
+    @classmethod
+    def files_argv(cls, files: Sequence[Path]) -> list[str]:
+        return ["--configs", *map(str, files)]
+
+    @classmethod
+    def cache_dependencies(cls, args: Args) -> Sequence[Path]:  # type: ignore[override]
+        return [args.pyproject, args.lockfile]
+
     def __init__(self, args: Args) -> None:
         super().__init__(args)
 
@@ -96,10 +104,7 @@ class Processor(FileProcessor):
 
         return f"{pak}=={lockfile_version}"
 
-    def process_file_path_internal(self, file: Path, *, logger: Logger) -> None:  # ruff:ignore[unused-method-argument]
-        with file.open("rb") as f:
-            data = yaml.load(f)
-
+    def process_yaml_internal(self, data: CommentedMap, *, logger: Logger) -> bool:  # ruff:ignore[unused-method-argument]
         repos = data["repos"]
         mypy: CommentedMap
         mypy = next(
@@ -112,16 +117,14 @@ class Processor(FileProcessor):
         additional_dependencies = self.additional_deps or None
         # If the correct data is already present
         if mypy.get("additional_dependencies") == additional_dependencies:
-            # Don't write it for performance, and to keep formatting
-            return
+            return False
 
         if additional_dependencies:
             mypy["additional_dependencies"] = additional_dependencies
         else:
             mypy.pop("additional_dependencies")
 
-        with file.open("wb") as f:
-            yaml.dump(data, f)
+        return True
 
 
 main = Processor.main
@@ -2,26 +2,22 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from pre_commit_hooks.processors import FileProcessor
-from pre_commit_hooks.yaml import yaml
+from pre_commit_hooks.yaml import YamlProcessor
 
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from ruamel.yaml import CommentedMap  # type: ignore[attr-defined]
 
     from pre_commit_hooks.logger import Logger
 
 
-class Processor(FileProcessor):
-    def process_file_path_internal(  # ruff:ignore[no-self-use]
+class Processor(YamlProcessor):
+    def process_yaml_internal(  # ruff:ignore[no-self-use]
         self,
-        file: Path,
+        data: CommentedMap,
         *,
         logger: Logger,  # ruff:ignore[unused-method-argument]
-    ) -> None:
-        with file.open("rb") as f:
-            data = yaml.load(f)
-
+    ) -> bool:
         to_skip = [
             hook["id"]
             for repo in data["repos"]
@@ -29,7 +25,7 @@ class Processor(FileProcessor):
             if "language" in hook and hook["language"] in {"unsupported", "system"}
         ]
         if not to_skip:
-            return
+            return False
 
         keys = list(data.keys())
         if "ci" not in data:
@@ -41,12 +37,10 @@ class Processor(FileProcessor):
         else:
             # If the correct data is already present
             if data["ci"].get("skip") == to_skip:
-                # Don't write it for performance, and to keep formatting
-                return
+                return False
             data["ci"]["skip"] = to_skip
 
-        with file.open("wb") as f:
-            yaml.dump(data, f)
+        return True
 
 
 main = Processor.main
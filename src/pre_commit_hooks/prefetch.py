@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import threading
+import urllib.parse
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.network import (
+    batches,
+    fetch,
+    is_connected,
+    is_offline,
+    planning,
+)
+from pre_commit_hooks.ratelimit import background
+from pre_commit_hooks.report import collect
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+    from pre_commit_hooks.network import Need
+    from pre_commit_hooks.processors import Args, FileProcessor
+    from pre_commit_hooks.report import Diagnostic
+
+
+# Lookups can depend on the results of others (like the tags of the commit a
+#  branch points to), so planning is repeated until nothing new is needed. The
+#  lookups that are still left after this are made while processing.
+MAX_ROUNDS = 3
+# Concurrent lookups per host, to stay clear of secondary rate limits
+PER_HOST = 8
+
+
+def plan(
+    processor_type: type[FileProcessor], args: Args, files: Sequence[Path]
+) -> tuple[set[Need], list[Diagnostic]]:
+    """
+    Process `files` without making network lookups, to find the lookups needed.
+
+    Nothing is written. Lines that need a lookup are skipped, see
+    `LineProcessor.process_lines`.
+
+    Returns:
+        The lookups, and the diagnostics that aren't about a file (like the
+        warning when there's no network connection)
+
+    """
+    needs: set[Need] = set()
+    token = planning.set(needs)
+    try:
+        processor = processor_type(args)
+        with collect() as diagnostics:
+            for file in files:
+                try:
+                    content = file.read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError):
+                    # Reported while processing
+                    continue
+                processor.start_file(file)
+                processor.process_content(content, logger=Logger.from_file(file))
+    finally:
+        planning.reset(token)
+    return needs, [diagnostic for diagnostic in diagnostics if diagnostic.file is None]
+
+
+def resolve(needs: set[Need]) -> None:
+    """Make the lookups concurrently, so they are cached for processing."""
+    from concurrent.futures import (  # ruff:ignore[import-outside-top-level]
+        ThreadPoolExecutor,
+    )
+
+    limits: dict[str, threading.Semaphore] = {}
+    for url, _params, _json in needs:
+        limits.setdefault(
+            urllib.parse.urlsplit(url).netloc, threading.Semaphore(PER_HOST)
+        )
+
+    def lookup(need: Need) -> None:
+        url, params, json = need
+        # Yield to lookups that processing is already waiting on, like those of
+        #  other hooks or of the language server
+        background.set(True)
+        # Failed lookups are made (and reported) again while processing
+        with (
+            limits[urllib.parse.urlsplit(url).netloc],
+            contextlib.suppress(Exception),
+        ):
+            fetch(url, params, json=json)
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(needs), PER_HOST * len(limits))
+    ) as executor:
+        # In a copy of this context, so diagnostics (like the warning for a host
+        #  that can't be reached) are collected instead of printed
+        futures = [
+            executor.submit(contextvars.copy_context().run, lookup, need)
+            for need in needs
+        ]
+        # Consume the results, so exceptions in `lookup` itself aren't hidden
+        for future in futures:
+            future.result()
+
+
+def prefetch(
+    processor_type: type[FileProcessor], args: Args, files: Sequence[Path]
+) -> list[Diagnostic]:
+    """
+    Make the network lookups that processing `files` needs, concurrently.
+
+    Processors make their lookups one at a time, as they come across them.
+    Doing them all up front means processing waits about as long as the slowest
+    lookup, instead of the sum of all of them. Lookups are cached per process,
+    so processing then only uses their results.
+
+    Returns:
+        The diagnostics that aren't about a file, to be reported before the
+        diagnostics of the files
+
+    """
+    diagnostics: list[Diagnostic] = []
+    if not processor_type.network_bound or not files or is_offline():
+        return diagnostics
+    # Failed lookups are planned again, but only made again while processing
+    tried: set[Need] = set()
+    for _ in range(MAX_ROUNDS):
+        needs, round_diagnostics = plan(processor_type, args, files)
+        diagnostics.extend(round_diagnostics)
+        with collect() as lookup_diagnostics:
+            batched = [flush() for flush in batches]
+            needs = {need for need in needs - tried if is_connected(need[0])}
+            if needs:
+                resolve(needs)
+        diagnostics.extend(lookup_diagnostics)
+        tried |= needs
+        if not needs and not any(batched):
+            break
+    return diagnostics
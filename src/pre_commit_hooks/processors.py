@@ -1,46 +1,112 @@
 from __future__ import annotations
 
 import argparse
-import random
-import string
+import mmap
+import sys
 from abc import ABC, abstractmethod
 from argparse import ArgumentParser
 from pathlib import Path
-from typing import TYPE_CHECKING, ClassVar
-
+from typing import TYPE_CHECKING, ClassVar, TextIO
+
+from pre_commit_hooks import cache, prefetch
+from pre_commit_hooks.common.dispatch import Dispatcher
+from pre_commit_hooks.common.files import (
+    atomic_write,
+    contains_any,
+    iter_line_spans,
+)
+from pre_commit_hooks.common.git import changed_lines
+from pre_commit_hooks.common.lines import EditList
 from pre_commit_hooks.logger import Logger
+from pre_commit_hooks.network import Unresolved, scheduler
+from pre_commit_hooks.parallel import (
+    ExecutorType,
+    default_jobs,
+    process_files_parallel,
+)
+from pre_commit_hooks.report import FORMATS, Format, collect, make_reporter
 
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable, Sequence
+    import re
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+
+    from pre_commit_hooks.report import Diagnostic
+
+    type LineHandler = Callable[[str, str, re.Match[str], Logger], str | None]
 
 
 class Args(argparse.Namespace):
     hook: str
     files: Sequence[Path]
+    jobs: int | None
+    incremental: bool
+    cache: bool
+    stats: bool
+    format: Format
+    group: bool
+    daemon: bool
+    watch: bool
 
 
 class FileProcessor(ABC):
+    # Processors that spend their time waiting on the network should use threads,
+    #  so they share the request cache.
+    executor: ClassVar[ExecutorType] = "process"
+    # Processors that make network lookups with `network.request`. Their lookups
+    #  for all files are made concurrently before processing, see
+    #  `pre_commit_hooks.prefetch`.
+    network_bound: ClassVar[bool] = False
+    # If set, files that contain none of these are skipped before they are
+    #  decoded. Only use this if such files can never have any diagnostics or
+    #  changes.
+    triggers: ClassVar[tuple[bytes, ...]] = ()
+
     def __init__(self, _args: Args) -> None:  # ruff:ignore[empty-method-without-abstract-decorator]
         pass
 
-    def process_files(self, files: Iterable[Path], *, logger_type: type[Logger]) -> int:
-        retval = 0
+    def process_files(
+        self, files: Iterable[Path], *, logger_type: type[Logger]
+    ) -> Iterator[tuple[int, list[Diagnostic]]]:
         for file in files:
-            retval |= self.process_file_path(file, logger_type=logger_type)
-        return retval
+            yield self.process_file_captured(file, logger_type=logger_type)
+
+    def process_file_captured(
+        self, file: Path, *, logger_type: type[Logger]
+    ) -> tuple[int, list[Diagnostic]]:
+        with collect() as diagnostics:
+            retval = self.process_file_path(file, logger_type=logger_type)
+        return retval, diagnostics
 
     def process_file_path(self, file: Path, *, logger_type: type[Logger]) -> int:
         logger = logger_type.from_file(file)
+        self.start_file(file)
         self.process_file_path_internal(file, logger=logger)
         return logger.retval
 
+    # Called before processing each file, also when the composite hook passes
+    #  the content directly to `process_file_internal`.
+    def start_file(self, file: Path) -> None:  # ruff:ignore[empty-method-without-abstract-decorator]
+        pass
+
     # If files are changed, pre-commit doesn't need a non-zero exit code to
     #  mark the hook as failed, so we don't need an exit code here. Any
     #  non-modifying failures will be marked with `logger.error`.
     @abstractmethod
     def process_file_path_internal(self, file: Path, *, logger: Logger) -> None: ...
 
+    # Process the content of a file in memory, without writing anything, for the
+    #  library API (`pre_commit_hooks.api`).
+    @abstractmethod
+    def process_content(self, content: str, *, logger: Logger) -> str:
+        """
+        Process the content of `logger.file`, as passed in `content`.
+
+        Returns:
+            The new content (equal to `content` if nothing changed)
+
+        """
+
     @classmethod
     def add_arguments(cls, parser: ArgumentParser) -> None:
         parser.add_argument(
@@ -49,12 +115,113 @@ class FileProcessor(ABC):
             type=Path,
         )
 
+    # Files other than the processed files that influence the results,
+    #  like configuration files.
+    @classmethod
+    def cache_dependencies(cls, _args: Args) -> Sequence[Path]:
+        return []
+
+    # Arguments to pass `files` to this processor
+    @classmethod
+    def files_argv(cls, files: Sequence[Path]) -> list[str]:
+        return list(map(str, files))
+
     @classmethod
     def parse_args(cls, argv: Sequence[str] | None) -> Args:
         parser = ArgumentParser()
         cls.add_arguments(parser)
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=None,
+            help="amount of files to process in parallel "
+            "(default: based on the amount and size of files)",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="skip files that were clean (no changes and no diagnostics) "
+            "in a previous run, and cache network lookups",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="print how many files were skipped, and cache hit rates",
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="text",
+            help="output format for diagnostics",
+        )
+        parser.add_argument(
+            "--group",
+            action="store_true",
+            help="print each distinct diagnostic once, with a count, "
+            "instead of per line (text format only)",
+        )
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="run in a background process that is kept running between "
+            "invocations, so network lookups stay cached",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="keep running, and process files again when they change",
+        )
         return parser.parse_args(argv, namespace=Args())
 
+    @classmethod
+    def prefilter(cls, files: Sequence[Path]) -> Sequence[Path]:
+        if not cls.triggers:
+            return files
+        return [file for file in files if contains_any(file, cls.triggers)]
+
+    @classmethod
+    def print_stats(cls, *, skipped: int, total: int, file: TextIO) -> None:
+        if cls.triggers:
+            print(
+                f"Prefilter: skipped {skipped}/{total} files without triggers",
+                file=file,
+            )
+        if cache.current is not None:
+            print(f"Cache: {cache.current.stats()}", file=file)
+        if budget := scheduler.budget():
+            print(
+                "Rate limits: "
+                + ", ".join(f"{host}: {left} left" for host, left in budget.items()),
+                file=file,
+            )
+
+    @classmethod
+    def tool_name(cls) -> str:
+        return cls.__module__.rsplit(".", maxsplit=1)[-1].replace("_", "-")
+
+    @classmethod
+    def forward_to_daemon(cls, argv: Sequence[str]) -> int | None:
+        from pre_commit_hooks import daemon  # ruff:ignore[import-outside-top-level]
+
+        if daemon.serving:
+            return None
+        return daemon.call(cls.__module__, argv)
+
+    # Runs the hook in watch mode or in the daemon, if requested
+    @classmethod
+    def run_elsewhere(
+        cls, args: Args, argv: Sequence[str], *, logger_type: type[Logger]
+    ) -> int | None:
+        if args.watch:
+            from pre_commit_hooks import watch  # ruff:ignore[import-outside-top-level]
+
+            return watch.watch(cls, args, logger_type=logger_type)
+        if args.daemon:
+            # `None` (run in-process) if the daemon can't be reached
+            return cls.forward_to_daemon(argv)
+        return None
+
     @classmethod
     def main(
         cls,
@@ -63,55 +230,188 @@ class FileProcessor(ABC):
         logger_type: type[Logger] = Logger,
     ) -> int:
         args = cls.parse_args(argv)
-        processor = cls(args)
-        return processor.process_files(args.files, logger_type=logger_type)
+        exit_code = cls.run_elsewhere(
+            args, sys.argv[1:] if argv is None else argv, logger_type=logger_type
+        )
+        if exit_code is not None:
+            return exit_code
+
+        files = cls.prefilter(args.files)
+        skipped = len(args.files) - len(files)
+
+        result_cache = None
+        if args.cache:
+            cache.open_cache()
+            result_cache = cache.ResultCache.open(cls, args)
+        if result_cache is not None:
+            files = result_cache.filter(files)
+
+        early_diagnostics = prefetch.prefetch(cls, args, files)
+        jobs = min(args.jobs or default_jobs(files), len(files))
+        if jobs > 1:
+            results = process_files_parallel(
+                cls, args, files, jobs=jobs, logger_type=logger_type
+            )
+        else:
+            results = cls(args).process_files(files, logger_type=logger_type)
+
+        reporter = make_reporter(
+            args.format,
+            sys.stdout,
+            tool=cls.tool_name(),
+            version=cache.package_version(),
+            flush_per_file=jobs > 1,
+            group=args.group,
+        )
+        reporter.add(early_diagnostics)
+        retval = 0
+        for file, (file_retval, diagnostics) in zip(files, results, strict=True):
+            reporter.add(diagnostics)
+            retval |= file_retval
+            if result_cache is not None and not file_retval and not diagnostics:
+                result_cache.record_clean(file)
+        reporter.close()
+
+        if args.stats:
+            cls.print_stats(
+                skipped=skipped,
+                total=len(args.files),
+                # Keep machine-readable output parseable
+                file=sys.stdout if args.format == "text" else sys.stderr,
+            )
+        if cache.current is not None:
+            cache.close_cache()
+        return retval
 
 
 class FileContentProcessor(FileProcessor, ABC):
     def process_file_path_internal(self, file: Path, *, logger: Logger) -> None:
         content = file.read_text(encoding="utf-8")
-        new_content = self.process_file_internal(content, logger=logger)
-        if new_content is not None and new_content != content:
+        new_content = self.process_content(content, logger=logger)
+        if new_content != content:
             file.write_text(new_content, encoding="utf-8")
             # See comment on abstract definition
 
+    def process_content(self, content: str, *, logger: Logger) -> str:
+        new_content = self.process_file_internal(content, logger=logger)
+        return content if new_content is None else new_content
+
     @abstractmethod
     def process_file_internal(self, content: str, *, logger: Logger) -> str | None: ...
 
 
 class LineProcessor(FileContentProcessor, ABC):
     remove_comments: ClassVar[bool] = True
+    # Files larger than this are processed one line at a time from a memory map,
+    #  instead of being read into memory in full.
+    stream_threshold: ClassVar[int] = 8 * 1024 * 1024
+    # If lines can be processed without knowing about previous lines, unchanged
+    #  lines are skipped entirely in incremental mode.
+    stateless: ClassVar[bool] = False
+    # `(pattern, method name)` pairs, see `dispatch`. The methods are called
+    #  like `process_line_internal`, with the match of their pattern.
+    line_patterns: ClassVar[Sequence[tuple[str, str]]] = ()
+    dispatcher: ClassVar[Dispatcher[str]] = Dispatcher(())
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        if "line_patterns" in cls.__dict__:
+            cls.dispatcher = Dispatcher(cls.line_patterns)
+
+    @classmethod
+    def add_arguments(cls, parser: ArgumentParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="only report errors on lines changed since the last commit",
+        )
 
     def __init__(self, args: Args) -> None:
         super().__init__(args)
-        self.bookmarks: list[Bookmark] = []
-        self.bookmarks_this_line: list[Bookmark] = []
+        self.edits = EditList()
+        self.lnr = 0
+        self.changes = changed_lines(args.files) if args.incremental else None
+        self.changed_lines: set[int] | None = None
 
-    def process_file_internal(self, content: str, *, logger: Logger) -> str:
-        new_content = ""
-        for lnr, line in enumerate(content.splitlines(keepends=True)):
-            new_line = self.process_line(lnr, line, file_logger=logger)
-            new_content += new_line
-
-        for bookmark in self.bookmarks:
-            new_content = new_content.replace(
-                bookmark.placeholder(), "".join(bookmark.lines)
-            )
+    def start_file(self, file: Path) -> None:
+        if self.changes is not None:
+            self.changed_lines = self.changes.get(file.resolve())
 
-        return new_content
+    def process_file_path_internal(self, file: Path, *, logger: Logger) -> None:
+        if file.stat().st_size <= self.stream_threshold:
+            super().process_file_path_internal(file, logger=logger)
+            return
+
+        with (
+            file.open("rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+        ):
+            self.process_lines(
+                (
+                    buffer[start:end].decode("utf-8")
+                    for start, end in iter_line_spans(buffer)
+                ),
+                logger=logger,
+            )
+            if self.edits:
+                with atomic_write(file) as out:
+                    self.edits.write_buffer(buffer, iter_line_spans(buffer), out)
 
+    def process_file_internal(self, content: str, *, logger: Logger) -> str:
+        lines = content.splitlines(keepends=True)
+        self.process_lines(lines, logger=logger)
+
+        if not self.edits:
+            return content
+        return self.edits.apply(lines)
+
+    def process_lines(self, lines: Iterable[str], *, logger: Logger) -> None:
+        self.edits = EditList()
+        # A single line logger is moved along the lines, see `Logger.at_line`
+        line_logger = logger.with_line(0, None)
+        for lnr, line in enumerate(lines):
+            self.lnr = lnr
+            unchanged = self.changed_lines is not None and lnr not in self.changed_lines
+            if unchanged and self.stateless:
+                continue
+            try:
+                new_line = self.process_line(
+                    lnr, line, logger=line_logger, unchanged=unchanged
+                )
+            except Unresolved:
+                # While planning the network lookups, see `prefetch.plan`
+                continue
+            if new_line != line:
+                self.edits.replace(lnr, new_line)
+        logger.consume(line_logger)
+
+    def dispatch(self, line: str) -> tuple[LineHandler, re.Match[str]] | None:
+        """
+        Find the handler for `line` in `line_patterns`.
+
+        Returns:
+            The bound handler method and the match of its pattern, or `None`
+            if no pattern matches
+
+        """
+        dispatched = self.dispatcher.dispatch(line)
+        if dispatched is None:
+            return None
+        name, match = dispatched
+        return getattr(self, name), match
+
+    # Lines written to the bookmark are inserted before the current line
     def bookmark(self) -> Bookmark:
-        bookmark = Bookmark()
-        self.bookmarks.append(bookmark)
-        self.bookmarks_this_line.append(bookmark)
-        return bookmark
+        return Bookmark(self.edits, self.lnr)
 
     def process_line(
         self,
         lnr: int,
         line: str,
         *,
-        file_logger: Logger,
+        logger: Logger,
+        unchanged: bool = False,
     ) -> str:
         orig_line = line
         line = line.strip()
@@ -131,7 +431,7 @@ class LineProcessor(FileContentProcessor, ABC):
         if allow == "all":
             return orig_line
 
-        logger = file_logger.with_line(lnr, allow)
+        logger.at_line(lnr, allow, quiet=unchanged)
 
         if self.remove_comments:
             if "#" in line:
@@ -144,12 +444,6 @@ class LineProcessor(FileContentProcessor, ABC):
         ret = self.process_line_internal(orig_line, line, logger)
         if ret is None:
             ret = orig_line
-
-        for bookmark in self.bookmarks_this_line:
-            ret = bookmark.placeholder() + ret
-        self.bookmarks_this_line = []
-
-        file_logger.consume(logger)
         return ret
 
     @abstractmethod
@@ -159,15 +453,9 @@ class LineProcessor(FileContentProcessor, ABC):
 
 
 class Bookmark:
-    def __init__(self) -> None:
-        self.id = "".join(random.choices(string.ascii_letters + string.digits, k=10))  # ruff:ignore[suspicious-non-cryptographic-random-usage]
-        self.lines: list[str] = []
-
-    def placeholder(self) -> str:
-        return f"<bookmark id={self.id}>\n"
-
-    def __hash__(self) -> int:
-        return hash(self.id)
+    def __init__(self, edits: EditList, lnr: int) -> None:
+        self.edits = edits
+        self.lnr = lnr
 
     def write(self, line: str) -> None:
-        self.lines.append(line)
+        self.edits.insert_before(self.lnr, line)
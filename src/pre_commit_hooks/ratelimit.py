@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+# Requests per second per host. GitHub's secondary rate limits allow about 900
+#  REST requests per minute; the package indexes have no documented limit, so
+#  they get a polite default.
+RATES: dict[str, float] = {"api.github.com": 10}
+DEFAULT_RATE = 5
+# Requests that can be made at once after a quiet period
+BURST = 10
+# The longest a request waits for its host. Hooks run while someone waits on
+#  them, so beyond this (like a primary rate limit that resets in half an hour)
+#  the request isn't made at all.
+MAX_WAIT = 60
+# How long to back off after a 429 without a `Retry-After` header. GitHub asks
+#  for at least a minute.
+DEFAULT_RETRY_AFTER = 60
+
+# Set for lookups nobody is waiting on yet (prefetches and background
+#  revalidations). These yield to the other requests to the same host.
+background: ContextVar[bool] = ContextVar("background", default=False)
+
+
+@dataclass
+class Bucket:
+    """A token bucket for the requests to a host, paused when the host asks."""
+
+    rate: float
+    tokens: float = BURST
+    # In `time.monotonic()` seconds
+    updated: float = field(default_factory=time.monotonic)
+    paused_until: float = 0
+    # The requests left until the rate limit resets, as last reported by the host
+    remaining: int | None = None
+    # Requests waiting for a token that aren't in the background
+    waiting: int = 0
+
+    def delay(self, now: float) -> float:
+        self.tokens = min(BURST, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        refill = 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(self.paused_until - now, refill)
+
+
+class Scheduler:
+    """
+    Spaces out the requests to each host, so they aren't rate limited.
+
+    Requests take a token from the bucket of their host, waiting for one if
+    needed. Hosts that report their rate limit (like GitHub) pause their bucket
+    when it runs out, or when they send `Retry-After`.
+    """
+
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.buckets: dict[str, Bucket] = {}
+
+    def bucket(self, host: str) -> Bucket:
+        if host not in self.buckets:
+            self.buckets[host] = Bucket(RATES.get(host, DEFAULT_RATE))
+        return self.buckets[host]
+
+    def acquire(self, host: str) -> bool:
+        """
+        Wait until a request to `host` can be made.
+
+        Returns:
+            `False` if that would take longer than `MAX_WAIT`, without waiting
+
+        """
+        foreground = not background.get()
+        with self.condition:
+            bucket = self.bucket(host)
+            deadline = time.monotonic() + MAX_WAIT
+            bucket.waiting += foreground
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = bucket.delay(now)
+                    if now + delay > deadline:
+                        return False
+                    if delay <= 0 and (foreground or not bucket.waiting):
+                        bucket.tokens -= 1
+                        return True
+                    # Also woken up when a request stops waiting, or the host
+                    #  reports its limits
+                    self.condition.wait(delay if delay > 0 else None)
+            finally:
+                bucket.waiting -= foreground
+                self.condition.notify_all()
+
+    def update(self, host: str, status: int, headers: Mapping[str, str]) -> bool:
+        """
+        Track the rate limit that `host` reported in a response.
+
+        Returns:
+            Whether the response was rate limited, so the request can be
+            retried after `acquire`
+
+        """
+        now = time.monotonic()
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        with self.condition:
+            bucket = self.bucket(host)
+            if remaining is not None:
+                bucket.remaining = int(remaining)
+            pause = None
+            if retry_after is not None:
+                pause = retry_after
+            elif bucket.remaining == 0 and reset is not None:
+                # The reset is in epoch seconds
+                pause = float(reset) - time.time()
+            elif status == 429:  # ruff:ignore[magic-value-comparison]
+                pause = DEFAULT_RETRY_AFTER
+            if pause is not None:
+                self.pause(host, pause, now=now)
+        # GitHub uses 403 for rate limits too, but also for other errors
+        return status == 429 or (status == 403 and pause is not None)  # ruff:ignore[magic-value-comparison]
+
+    def pause(self, host: str, seconds: float, *, now: float | None = None) -> None:
+        """Hold back the requests to `host`, for limits reported another way."""
+        with self.condition:
+            bucket = self.bucket(host)
+            start = time.monotonic() if now is None else now
+            bucket.paused_until = max(bucket.paused_until, start + seconds)
+            self.condition.notify_all()
+
+    def budget(self) -> dict[str, int]:
+        """
+        Get the requests left per host.
+
+        Returns:
+            The requests left until the rate limit resets, for the hosts that
+            reported it
+
+        """
+        with self.condition:
+            return {
+                host: bucket.remaining
+                for host, bucket in sorted(self.buckets.items())
+                if bucket.remaining is not None
+            }
+
+    def reset(self) -> None:
+        # The lock could have been held by another thread while forking
+        self.condition = threading.Condition()
+        self.buckets.clear()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    # Or an HTTP date
+    import email.utils  # ruff:ignore[import-outside-top-level]
+
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import json
+import sys
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal, TextIO
+
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Sequence
+    from pathlib import Path
+
+
+type Level = Literal["error", "warning", "info"]
+type Format = Literal["text", "jsonl", "sarif"]
+FORMATS: tuple[Format, ...] = ("text", "jsonl", "sarif")
+
+LEVEL_NAMES: dict[Level, str] = {
+    "error": "Error",
+    "warning": "Warning",
+    "info": "Info",
+}
+LEVEL_COLORS: dict[Level, Literal["light_red", "yellow", "light_blue"]] = {
+    "error": "light_red",
+    "warning": "yellow",
+    "info": "light_blue",
+}
+SARIF_LEVELS: dict[Level, str] = {
+    "error": "error",
+    "warning": "warning",
+    "info": "note",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Diagnostic:
+    # `None` for diagnostics that aren't about a specific file
+    file: Path | None
+    lnr: int | None
+    level: Level
+    message: str
+    id: str | None = None
+
+    def text(self, *, color: bool = False) -> str:
+        level = LEVEL_NAMES[self.level]
+        if color:
+            from termcolor import colored  # ruff:ignore[import-outside-top-level]
+
+            level = colored(level, LEVEL_COLORS[self.level])
+        if self.id is not None:
+            return f"{level}: [{self.id}] {self.message}"
+        return f"{level}: {self.message}"
+
+    def location(self) -> str | None:
+        if self.file is None:
+            return None
+        if self.lnr is None:
+            return str(self.file)
+        return f"{self.file}:{self.lnr + 1}"
+
+
+# Where diagnostics are collected. `None` means they are printed right away,
+#  which is what you want when using a `Logger` directly. This is a context
+#  variable so parallel workers can each collect the diagnostics of a single file.
+collected: ContextVar[list[Diagnostic] | None] = ContextVar("collected", default=None)
+
+
+@contextmanager
+def collect() -> Generator[list[Diagnostic]]:
+    diagnostics: list[Diagnostic] = []
+    token = collected.set(diagnostics)
+    try:
+        yield diagnostics
+    finally:
+        collected.reset(token)
+
+
+def report(diagnostic: Diagnostic) -> None:
+    diagnostics = collected.get()
+    if diagnostics is None:
+        TextReporter(sys.stdout, flush_per_file=True).add([diagnostic])
+    else:
+        diagnostics.append(diagnostic)
+
+
+class Reporter(ABC):
+    """
+    Formats diagnostics and writes them to `stream`.
+
+    Output is buffered, and written once in `close`. With `flush_per_file`, the
+    output of each file is written as soon as it's added instead, so progress is
+    visible when processing files in parallel.
+    """
+
+    def __init__(self, stream: TextIO, *, flush_per_file: bool = False) -> None:
+        self.stream = stream
+        self.flush_per_file = flush_per_file
+        self.buffer: list[str] = []
+
+    # The diagnostics of a single file
+    def add(self, diagnostics: Sequence[Diagnostic]) -> None:
+        if not diagnostics:
+            return
+        self.buffer.extend(self.format(diagnostics))
+        if self.flush_per_file:
+            self.flush()
+
+    @abstractmethod
+    def format(self, diagnostics: Sequence[Diagnostic]) -> list[str]: ...
+
+    def flush(self) -> None:
+        self.stream.write("".join(self.buffer))
+        self.stream.flush()
+        self.buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class TextReporter(Reporter):
+    def __init__(
+        self, stream: TextIO, *, flush_per_file: bool = False, group: bool = False
+    ) -> None:
+        super().__init__(stream, flush_per_file=flush_per_file and not group)
+        self.color = stream.isatty()
+        self.group = group
+        self.counts: Counter[tuple[Level, str | None, str]] = Counter()
+
+    def add(self, diagnostics: Sequence[Diagnostic]) -> None:
+        if self.group:
+            self.counts.update((d.level, d.id, d.message) for d in diagnostics)
+        else:
+            super().add(diagnostics)
+
+    def format(self, diagnostics: Sequence[Diagnostic]) -> list[str]:
+        lines = []
+        for diagnostic in diagnostics:
+            text = diagnostic.text(color=self.color)
+            location = diagnostic.location()
+            lines.append(f"({location}) {text}\n" if location else f"{text}\n")
+        return lines
+
+    def close(self) -> None:
+        # Most frequent first, ties in order of first occurrence
+        for (level, id_, message), count in self.counts.most_common():
+            text = Diagnostic(None, None, level, message, id_).text(color=self.color)
+            self.buffer.append(f"({count}x) {text}\n")
+        super().close()
+
+
+class JsonLinesReporter(Reporter):
+    def format(self, diagnostics: Sequence[Diagnostic]) -> list[str]:  # ruff:ignore[no-self-use]
+        return [
+            json.dumps({
+                "file": None if d.file is None else str(d.file),
+                "line": None if d.lnr is None else d.lnr + 1,
+                "level": d.level,
+                "id": d.id,
+                "message": d.message,
+            })
+            + "\n"
+            for d in diagnostics
+        ]
+
+
+class SarifReporter(Reporter):
+    """Writes a single SARIF 2.1.0 log, so everything is written at the end."""
+
+    def __init__(self, stream: TextIO, *, tool: str, version: str | None) -> None:
+        super().__init__(stream)
+        self.tool = tool
+        self.version = version
+        self.results: list[dict[str, object]] = []
+
+    def add(self, diagnostics: Sequence[Diagnostic]) -> None:
+        for d in diagnostics:
+            result: dict[str, object] = {
+                "level": SARIF_LEVELS[d.level],
+                "message": {"text": d.message},
+            }
+            if d.id is not None:
+                result["ruleId"] = d.id
+            if d.file is not None:
+                location: dict[str, object] = {
+                    "artifactLocation": {"uri": d.file.as_posix()}
+                }
+                if d.lnr is not None:
+                    location["region"] = {"startLine": d.lnr + 1}
+                result["locations"] = [{"physicalLocation": location}]
+            self.results.append(result)
+
+    def format(self, _diagnostics: Sequence[Diagnostic]) -> list[str]:  # ruff:ignore[no-self-use]
+        # Unused, as `add` collects results instead
+        return []
+
+    def close(self) -> None:
+        driver: dict[str, object] = {
+            "name": self.tool,
+            "informationUri": "https://github.com/GideonBear/pre-commit-hooks",
+        }
+        if self.version is not None:
+            driver["version"] = self.version
+        log = {
+            "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+            "version": "2.1.0",
+            "runs": [{"tool": {"driver": driver}, "results": self.results}],
+        }
+        self.buffer.append(json.dumps(log, indent=2) + "\n")
+        super().close()
+
+
+def make_reporter(  # ruff:ignore[too-many-arguments]
+    format_: Format,
+    stream: TextIO,
+    *,
+    tool: str,
+    version: str | None,
+    flush_per_file: bool,
+    group: bool,
+) -> Reporter:
+    if format_ == "sarif":
+        return SarifReporter(stream, tool=tool, version=version)
+    if format_ == "jsonl":
+        return JsonLinesReporter(stream, flush_per_file=flush_per_file)
+    return TextReporter(stream, flush_per_file=flush_per_file, group=group)
@@ -8,6 +8,7 @@ from pre_commit_hooks.processors import FileContentProcessor
 
 if TYPE_CHECKING:
     from argparse import ArgumentParser
+    from collections.abc import Sequence
 
     import pre_commit_hooks
     from pre_commit_hooks.logger import Logger
@@ -31,6 +32,10 @@ class Processor(FileContentProcessor):
             type=Path,
         )
 
+    @classmethod
+    def files_argv(cls, files: Sequence[Path]) -> list[str]:
+        return ["--configs", *map(str, files)]
+
     def __init__(self, args: Args) -> None:
         super().__init__(args)
 
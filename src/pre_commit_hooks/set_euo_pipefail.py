@@ -6,15 +6,17 @@ from pre_commit_hooks.processors import LineProcessor
 
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from pre_commit_hooks.logger import Logger
 
 
 class Processor(LineProcessor):
     start_part: bool
 
-    def process_file_internal(self, content: str, *, logger: Logger) -> str:
+    def process_lines(self, lines: Iterable[str], *, logger: Logger) -> None:
         self.reset()
-        return super().process_file_internal(content, logger=logger)
+        super().process_lines(lines, logger=logger)
 
     def reset(self) -> None:
         self.start_part = True
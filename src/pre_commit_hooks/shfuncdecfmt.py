@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
 
 from pre_commit_hooks.processors import FileContentProcessor
 
@@ -11,6 +11,8 @@ if TYPE_CHECKING:
 
 
 class Processor(FileContentProcessor):
+    triggers: ClassVar[tuple[bytes, ...]] = (b"{",)
+
     def process_file_internal(  # ruff:ignore[no-self-use]
         self,
         content: str,
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import cache, network
+from pre_commit_hooks.report import make_reporter
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+
+    from pre_commit_hooks.logger import Logger
+    from pre_commit_hooks.processors import Args, FileProcessor
+
+
+# Saves within this many seconds of each other are handled in a single run,
+#  e.g. "save all" in an editor, or a `git checkout`
+DEBOUNCE = 0.1
+# How often `PollingWatcher` looks at the files
+POLL_INTERVAL = 0.5
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_Q_OVERFLOW = 0x4000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+type Signature = tuple[int, int] | None
+
+
+def signature(file: Path) -> Signature:
+    try:
+        stat = file.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher(ABC):
+    def __init__(self, files: Iterable[Path]) -> None:
+        self.files = {file.absolute() for file in files}
+
+    def wait(self) -> set[Path]:
+        """
+        Wait until some of the files change.
+
+        Returns:
+            The changed files, including those changed shortly after
+
+        """
+        changed = self.read(None)
+        while more := self.read(DEBOUNCE):
+            changed |= more
+        return changed
+
+    # The files that changed within `timeout` seconds (`None` to wait forever)
+    @abstractmethod
+    def read(self, timeout: float | None) -> set[Path]: ...
+
+    def close(self) -> None:  # ruff:ignore[empty-method-without-abstract-decorator]
+        pass
+
+
+class InotifyWatcher(Watcher):
+    """
+    Watches files using inotify (Linux).
+
+    The directories of the files are watched, as editors often save by replacing
+    the file, which would end a watch on the file itself.
+    """
+
+    def __init__(self, files: Iterable[Path]) -> None:
+        import ctypes  # ruff:ignore[import-outside-top-level]
+        import ctypes.util  # ruff:ignore[import-outside-top-level]
+
+        super().__init__(files)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd: int = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories: dict[int, Path] = {}
+        for directory in {file.parent for file in self.files}:
+            wd: int = libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO
+            )
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"can't watch {directory}")
+            self.directories[wd] = directory
+
+    def read(self, timeout: float | None) -> set[Path]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        buffer = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so anything may have changed
+                return set(self.files)
+            file = self.directories[wd] / os.fsdecode(name)
+            if file in self.files:
+                changed.add(file)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher(Watcher):
+    """For platforms without inotify."""
+
+    def __init__(self, files: Iterable[Path]) -> None:
+        super().__init__(files)
+        self.signatures = {file: signature(file) for file in self.files}
+
+    def read(self, timeout: float | None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for file, old in self.signatures.items():
+                new = signature(file)
+                if new != old:
+                    self.signatures[file] = new
+                    changed.add(file)
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(
+                POLL_INTERVAL
+                if deadline is None
+                else min(POLL_INTERVAL, max(0, deadline - time.monotonic()))
+            )
+
+
+def make_watcher(files: Iterable[Path]) -> Watcher:
+    if sys.platform == "linux":
+        try:
+            return InotifyWatcher(files)
+        except OSError:
+            # E.g. when out of inotify watches
+            pass
+    return PollingWatcher(files)
+
+
+class Session:
+    """
+    The state that is kept between runs.
+
+    The processor is kept, so parsed configuration and network lookups don't
+    have to be redone. If one of its `cache_dependencies` changes, a new
+    processor is created and all files are processed again. So is it once the
+    lookups are `network.FRESH_TTL` old, like those of the persistent cache.
+    Files are processed in-process, one at a time, to share this state.
+    """
+
+    def __init__(
+        self, processor_type: type[FileProcessor], args: Args, logger_type: type[Logger]
+    ) -> None:
+        self.processor_type = processor_type
+        self.args = args
+        self.logger_type = logger_type
+        # Diagnostics use the paths as passed, the watcher uses absolute paths
+        self.files = {file.absolute(): file for file in args.files}
+        self.dependencies = {
+            file.absolute() for file in processor_type.cache_dependencies(args)
+        }
+        self.watcher = make_watcher([*self.files, *self.dependencies])
+        self.processor = processor_type(args)
+        # To ignore the writes of autofixes, and saves without changes
+        self.signatures: dict[Path, Signature] = {}
+
+    def run(self, files: Sequence[Path]) -> None:
+        if network.expire_lookups():
+            self.processor = self.processor_type(self.args)
+        network.reset_warnings()
+        # Files may have been deleted since they were passed
+        files = self.processor.prefilter([file for file in files if file.exists()])
+        reporter = make_reporter(
+            self.args.format,
+            sys.stdout,
+            tool=self.processor.tool_name(),
+            version=cache.package_version(),
+            flush_per_file=True,
+            group=self.args.group,
+        )
+        failed = 0
+        for retval, diagnostics in self.processor.process_files(
+            files, logger_type=self.logger_type
+        ):
+            reporter.add(diagnostics)
+            failed += bool(retval or diagnostics)
+        reporter.close()
+        print(f"Checked {len(files)} files, {failed} with problems", file=sys.stderr)
+
+        self.signatures.update(
+            (file, signature(file)) for file in [*self.files, *self.dependencies]
+        )
+        print(f"Watching {len(self.files)} files for changes...", file=sys.stderr)
+
+    # The files to process next
+    def wait(self) -> list[Path]:
+        while True:
+            events = {
+                file
+                for file in self.watcher.wait()
+                if signature(file) != self.signatures.get(file)
+            }
+            if events & self.dependencies:
+                self.processor = self.processor_type(self.args)
+                return list(self.files.values())
+            changed = [self.files[file] for file in events if file in self.files]
+            if changed:
+                return changed
+
+
+def watch(
+    processor_type: type[FileProcessor],
+    args: Args,
+    *,
+    logger_type: type[Logger],
+) -> int:
+    """
+    Process `args.files`, and then process them again whenever they change.
+
+    Returns:
+        The exit code, when interrupted
+
+    """
+    if args.cache:
+        cache.open_cache()
+    session = Session(processor_type, args, logger_type)
+    try:
+        files = list(args.files)
+        while True:
+            session.run(files)
+            files = session.wait()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        session.watcher.close()
+        if cache.current is not None:
+            cache.close_cache()
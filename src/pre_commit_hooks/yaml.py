@@ -1,8 +1,61 @@
 from __future__ import annotations
 
-from ruamel.yaml import YAML
+import io
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import TYPE_CHECKING
 
+from pre_commit_hooks.processors import FileProcessor
 
-yaml = YAML()
-yaml.preserve_quotes = True
-yaml.indent(mapping=2, sequence=4, offset=2)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from ruamel.yaml import YAML, CommentedMap  # type: ignore[attr-defined]
+
+    from pre_commit_hooks.logger import Logger
+
+
+# ruamel is slow to import, so it's only imported when a file is actually parsed
+@cache
+def get_yaml() -> YAML:
+    from ruamel.yaml import YAML  # ruff:ignore[import-outside-top-level]
+
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    yaml.indent(mapping=2, sequence=4, offset=2)
+    return yaml
+
+
+def dumps(data: CommentedMap) -> str:
+    stream = io.StringIO()
+    get_yaml().dump(data, stream)
+    return stream.getvalue()
+
+
+class YamlProcessor(FileProcessor, ABC):
+    def process_file_path_internal(self, file: Path, *, logger: Logger) -> None:
+        with file.open("rb") as f:
+            data = get_yaml().load(f)
+
+        # Don't write the file if nothing changed, for performance,
+        #  and to keep formatting
+        if self.process_yaml_internal(data, logger=logger):
+            with file.open("wb") as f:
+                get_yaml().dump(data, f)
+
+    def process_content(self, content: str, *, logger: Logger) -> str:
+        data = get_yaml().load(content)
+        if self.process_yaml_internal(data, logger=logger):
+            return dumps(data)
+        return content
+
+    @abstractmethod
+    def process_yaml_internal(self, data: CommentedMap, *, logger: Logger) -> bool:
+        """
+        Process a parsed YAML document in place.
+
+        Returns:
+            `True` if `data` was changed
+
+        """
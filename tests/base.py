@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import shutil
 import tempfile
 import urllib.parse
@@ -11,6 +12,7 @@ from unittest.mock import patch
 
 import responses
 
+from pre_commit_hooks import network
 from pre_commit_hooks.logger import Logger
 
 
@@ -18,6 +20,8 @@ if TYPE_CHECKING:
     from collections.abc import Iterator, MutableSequence, Sequence
     from types import ModuleType
 
+    from pre_commit_hooks.report import Diagnostic
+
 
 def fs_url_decode(s: str) -> str:
     return urllib.parse.unquote(s)
@@ -28,9 +32,9 @@ class ATestLogger(Logger, ABC):
     @abstractmethod
     def _logs(self) -> MutableSequence[tuple[Path, int, str]]: ...
 
-    def log_no_info(self, msg: str) -> None:
-        super().log_no_info(msg)
-        self._logs.append((self.file, self.lnr, msg))
+    def report(self, diagnostic: Diagnostic) -> None:
+        super().report(diagnostic)
+        self._logs.append((self.file, self.lnr, diagnostic.text()))
 
 
 def make_test_logger(logs: MutableSequence[tuple[Path, int, str]]) -> type[ATestLogger]:
@@ -136,8 +140,11 @@ class TCBase(ABC):
                     body=mock.read_text(),
                 )
 
+            if self._offline:
+                # Lookups of earlier test cases are cached
+                network.fetch.cache_clear()
             with (
-                patch(f"{self.hook_module.__name__}.is_connected", return_value=False)
+                patch.dict(os.environ, {network.OFFLINE_ENV: "1"})
                 if self._offline
                 else nullcontext(),
             ):
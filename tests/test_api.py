@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import functools
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+import responses
+
+from pre_commit_hooks import network
+from pre_commit_hooks.api import run
+
+
+here = Path(__file__).parent
+
+
+def test_diagnostics() -> None:
+    results = run("set-euo-pipefail", [here / "set-euo-pipefail/bad.sh"])
+
+    assert results.failed
+    assert not results.changed
+    (diagnostic,) = results.diagnostics
+    assert diagnostic.file == here / "set-euo-pipefail/bad.sh"
+    assert diagnostic.text() == "Error: No `set -euo pipefail` found at start of script"
+
+
+def test_contents_and_apply(tmp_path: Path) -> None:
+    file = tmp_path / "readme.sh"
+    shutil.copy(here / "shfuncdecfmt/readme.sh", file)
+    content = file.read_text()
+
+    results = run("shfuncdecfmt", {file: content})
+    (result,) = results.changed
+    assert result.new_content == (here / "shfuncdecfmt/readme-out.sh").read_text()
+    assert result.diff().startswith(f"--- {file}\n+++ {file}\n")
+    # Nothing is written until applied
+    assert file.read_text() == content
+
+    results.apply()
+    assert file.read_text() == result.new_content
+    assert not run("shfuncdecfmt", [file]).failed
+
+
+def test_options() -> None:
+    file = here / "pccs/basic.yaml"
+    assert run("pre-commit-ci-skip", [file], {"jobs": 1}).files[0].file == file
+    with pytest.raises(ValueError, match="unknown option 'nonexistent'"):
+        run("pre-commit-ci-skip", [file], {"nonexistent": 1})
+    with pytest.raises(ValueError, match="unknown hook id 'nonexistent'"):
+        run("nonexistent", [file])
+
+
+@responses.activate
+def test_lookups_expire(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(network, "gh_token", functools.cache(lambda: None))
+    network.fetch.cache_clear()
+
+    # `v1` moves to another commit between the calls
+    def pin(sha: str) -> None:
+        responses.replace(
+            responses.GET,
+            "https://api.github.com/repos/actions/checkout/commits/v1",
+            json={"sha": sha},
+        )
+        responses.replace(
+            responses.GET,
+            "https://api.github.com/repos/actions/checkout/git/matching-refs/tags/v1",
+            json=[
+                {"ref": "refs/tags/v1.2.3", "object": {"sha": sha, "type": "commit"}}
+            ],
+        )
+
+    file = tmp_path / "workflow.yml"
+    workflow = {file: "steps:\n  - uses: actions/checkout@v1\n"}
+    options = {"resolver": "rest"}
+    responses.get("https://api.github.com/repos/actions/checkout/commits/v1")
+    responses.get(
+        "https://api.github.com/repos/actions/checkout/git/matching-refs/tags/v1"
+    )
+    try:
+        pin("a" * 40)
+        assert "a" * 40 in run("gha-pin", workflow, options).files[0].new_content
+        pin("b" * 40)
+        assert "a" * 40 in run("gha-pin", workflow, options).files[0].new_content
+        monkeypatch.setattr(
+            network, "lookups_cleared", time.monotonic() - network.FRESH_TTL
+        )
+        assert "b" * 40 in run("gha-pin", workflow, options).files[0].new_content
+    finally:
+        network.fetch.cache_clear()
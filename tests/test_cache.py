@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+import requests
+import responses
+
+from pre_commit_hooks import cache, network, set_euo_pipefail
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+here = Path(__file__).parent
+
+
+@pytest.fixture
+def files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "package_version", lambda: "0.0.0")
+    for name in ("good.sh", "bad.sh"):
+        shutil.copy(here / "set-euo-pipefail" / name, tmp_path / name)
+    return [str(tmp_path / "good.sh"), str(tmp_path / "bad.sh")]
+
+
+def test_clean_files_are_skipped(
+    files: list[str], capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = [*files, "--jobs", "1", "--cache", "--stats"]
+
+    assert set_euo_pipefail.main(args) == 1
+    assert "Cache: clean: 0/2 hits (0%)" in capsys.readouterr().out
+
+    # Only the clean file is skipped, the other one still fails
+    assert set_euo_pipefail.main(args) == 1
+    out = capsys.readouterr().out
+    assert "bad.sh" in out
+    assert "Cache: clean: 1/2 hits (50%)" in out
+
+
+def test_changed_files_are_not_skipped(
+    files: list[str], capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = [files[0], "--jobs", "1", "--cache", "--stats"]
+
+    assert set_euo_pipefail.main(args) == 0
+    Path(files[0]).write_text("echo hello\n", encoding="utf-8")
+    assert set_euo_pipefail.main(args) == 1
+    assert "Cache: clean: 0/1 hits (0%)" in capsys.readouterr().out
+
+
+def test_changed_files_in_a_subdirectory_are_not_skipped(
+    files: list[str], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Staged, so the content id comes from the index until it's changed
+    subdirectory = tmp_path / "sub"
+    subdirectory.mkdir()
+    shutil.move(files[0], subdirectory / "good.sh")
+    for command in (["init", "-q"], ["add", "sub/good.sh"]):
+        subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+            ["git", *command],  # ruff:ignore[start-process-with-partial-path]
+            cwd=tmp_path,
+            check=True,
+        )
+    monkeypatch.chdir(subdirectory)
+    args = ["good.sh", "--jobs", "1", "--cache"]
+
+    assert set_euo_pipefail.main(args) == 0
+    shutil.copy(files[1], "good.sh")
+    assert set_euo_pipefail.main(args) == 1
+
+
+URL = "https://api.github.com/repos/actions/checkout/tags"
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[cache.Cache]:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    # Responses need revalidation right away
+    monkeypatch.setattr(network, "FRESH_TTL", 0)
+    network.fetch.cache_clear()
+    yield cache.open_cache()
+    cache.close_cache()
+    network.fetch.cache_clear()
+
+
+def request_again() -> object:
+    # As a new process would
+    network.fetch.cache_clear()
+    return network.request(URL)
+
+
+@responses.activate
+def test_http_revalidation(store: cache.Cache, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PRE_COMMIT_HOOKS_STALE_WHILE_REVALIDATE", "0")
+    responses.get(URL, json=[{"name": "v6"}], headers={"ETag": '"v1"'})
+    assert network.request(URL) == [{"name": "v6"}]
+
+    responses.replace(responses.GET, URL, status=304)
+    assert request_again() == [{"name": "v6"}]
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    assert store.stats() == "http: 1/2 hits (50%)"
+
+
+@pytest.mark.usefixtures("store")
+@responses.activate
+def test_http_stale_while_revalidate() -> None:
+    responses.get(URL, json=[{"name": "v6"}], headers={"ETag": '"v1"'})
+    assert network.request(URL) == [{"name": "v6"}]
+
+    # The stale response is used, while the new one is fetched for the next run
+    responses.replace(responses.GET, URL, json=[{"name": "v7"}])
+    assert request_again() == [{"name": "v6"}]
+    network.wait_for_refreshes()
+    assert len(responses.calls) == 2
+    assert request_again() == [{"name": "v7"}]
+    # Before the mocked responses are gone
+    network.wait_for_refreshes()
+
+
+@pytest.mark.usefixtures("store")
+@responses.activate
+def test_http_negative_caching() -> None:
+    responses.get(URL, status=404)
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError, match="404"):
+            request_again()
+    # Errors are not served stale, but aren't fetched again until they expire
+    assert len(responses.calls) == 1
+
+
+@pytest.mark.usefixtures("store")
+@responses.activate
+def test_http_offline(monkeypatch: pytest.MonkeyPatch) -> None:
+    responses.get(URL, json=[{"name": "v6"}])
+    assert network.request(URL) == [{"name": "v6"}]
+
+    # Cached answers don't need a connection, even when they're stale
+    monkeypatch.setenv(network.OFFLINE_ENV, "1")
+    assert request_again() == [{"name": "v6"}]
+    assert len(responses.calls) == 1
+
+
+def test_cache_command(files: list[str], capsys: pytest.CaptureFixture[str]) -> None:
+    assert cache.main(["stats"]) == 0
+    assert capsys.readouterr().out.startswith("No cache at ")
+
+    set_euo_pipefail.main([*files, "--cache"])
+    capsys.readouterr()
+    assert cache.main(["prune"]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("Freed ")
+    assert out.splitlines()[-1] == "clean: 1 entries, 64 B"
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+import responses
+
+from pre_commit_hooks import composite
+from tests.base import TCFormatterBase
+
+
+class TC(TCFormatterBase):
+    hook_module = composite
+
+    def __init__(self, inp: str, *, hooks: list[str]) -> None:
+        super().__init__(inp, [*(f"--hook={hook}" for hook in hooks), inp])
+
+
+test_cases = [
+    # The same result as running pre-commit-ci-skip and pre-commit-config-fmt
+    #  separately, as in tests/pccf/pccs-basic-out.yaml
+    *TC.out_double(
+        "pre-commit-config.yaml",
+        hooks=["pre-commit-ci-skip", "pre-commit-config-fmt"],
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "test_case",
+    test_cases,
+    ids=repr,
+)
+@responses.activate
+def test_composite(test_case: TC) -> None:
+    test_case.run()
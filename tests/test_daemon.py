@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from pre_commit_hooks import daemon, network, set_euo_pipefail
+
+
+here = Path(__file__).parent
+
+
+def test_daemon(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    shutil.copy(here / "set-euo-pipefail/bad.sh", tmp_path / "bad.sh")
+    shutil.copy(here / "set-euo-pipefail/good.sh", tmp_path / "good.sh")
+    monkeypatch.chdir(tmp_path)
+    socket_path = tmp_path / "daemon.sock"
+
+    expected_retval = set_euo_pipefail.main(["bad.sh", "good.sh"])
+    expected_out = capsys.readouterr().out
+
+    # The first call starts the daemon, the second one reuses it
+    for _ in range(2):
+        assert (
+            daemon.call(
+                set_euo_pipefail.__name__,
+                ["bad.sh", "good.sh", "--daemon"],
+                path=socket_path,
+                idle_timeout=1,
+            )
+            == expected_retval
+        )
+        assert capsys.readouterr().out == expected_out
+
+    assert (
+        daemon.call(
+            set_euo_pipefail.__name__, ["bad.sh", "--nonexistent"], path=socket_path
+        )
+        == 2
+    )
+    assert "unrecognized arguments: --nonexistent" in capsys.readouterr().err
+
+    # Shuts down after the idle timeout
+    deadline = time.monotonic() + 10
+    while socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not socket_path.exists()
+
+
+def test_requests_use_the_environment_of_the_client(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(daemon, "previous_env", None)
+    monkeypatch.setenv("GH_TOKEN", "daemon")
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    hook = SimpleNamespace(main=lambda _argv: print(network.gh_token()) or 0)
+    monkeypatch.setitem(sys.modules, "hook", hook)
+    network.gh_token.cache_clear()
+
+    # As sent by `call`
+    def handle(env: dict[str, str]) -> str:
+        request = {"module": "hook", "argv": [], "cwd": str(tmp_path), "prog": "hook"}
+        f = io.BytesIO(json.dumps({**request, "env": env}).encode() + b"\n")
+        daemon.handle(f)
+        messages = [json.loads(line) for line in f.getvalue().splitlines()[1:]]
+        return "".join(message.get("data", "") for message in messages)
+
+    try:
+        assert handle({"GH_TOKEN": "client"}) == "client\n"
+        # Not the token that was cached for another client
+        assert handle({"GITHUB_TOKEN": "other"}) == "other\n"
+    finally:
+        network.gh_token.cache_clear()
+    assert os.environ["GH_TOKEN"] == "daemon"  # ruff:ignore[hardcoded-password-string]
+    assert "GITHUB_TOKEN" not in os.environ
+
+
+def test_each_request_warns_about_skipped_hosts(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(daemon, "previous_env", None)
+    url = "https://api.github.com"
+    monkeypatch.setattr(
+        network, "unreachable_until", {"api.github.com": time.time() + 60}
+    )
+    monkeypatch.setattr(network, "unreachable_warned", set())
+    hook = SimpleNamespace(main=lambda _argv: int(network.is_connected(url)))
+    monkeypatch.setitem(sys.modules, "hook", hook)
+
+    for _ in range(2):
+        request = {"module": "hook", "argv": [], "cwd": str(tmp_path), "prog": "hook"}
+        f = io.BytesIO(json.dumps({**request, "env": {}}).encode() + b"\n")
+        daemon.handle(f)
+        messages = [json.loads(line) for line in f.getvalue().splitlines()[1:]]
+        assert "can't reach api.github.com" in messages[0]["data"]
+
+
+@pytest.mark.parametrize(
+    ("code", "exit_code", "err"), [(None, 0, ""), (3, 3, ""), ("failed", 1, "failed\n")]
+)
+def test_exit_codes(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    code: str | int | None,
+    exit_code: int,
+    err: str,
+) -> None:
+    monkeypatch.setattr(daemon, "previous_env", None)
+
+    def main(_argv: list[str]) -> int:
+        raise SystemExit(code)
+
+    monkeypatch.setitem(sys.modules, "hook", SimpleNamespace(main=main))
+    request = {"module": "hook", "argv": [], "cwd": str(tmp_path), "prog": "hook"}
+    f = io.BytesIO(json.dumps({**request, "env": {}}).encode() + b"\n")
+    daemon.handle(f)
+    messages = [json.loads(line) for line in f.getvalue().splitlines()[1:]]
+    assert messages[-1] == {"exit": exit_code}
+    assert "".join(m["data"] for m in messages if m.get("stream") == "stderr") == err
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from pre_commit_hooks.common.dispatch import Dispatcher
+
+
+def test_dispatch() -> None:
+    dispatcher = Dispatcher([
+        (r"FROM (?P<image>\S+)", "from"),
+        (r"(RUN) (.*)", "run"),
+        (r"RUN", "never"),
+    ])
+
+    assert dispatcher.dispatch("COPY . .") is None
+    assert dispatcher.dispatch("# FROM debian") is None
+
+    dispatched = dispatcher.dispatch("FROM debian:trixie AS build")
+    assert dispatched is not None
+    handler, match = dispatched
+    assert handler == "from"
+    assert match.group("image") == "debian:trixie"
+
+    # Earlier patterns win, and group numbers are the pattern's own
+    dispatched = dispatcher.dispatch("RUN true")
+    assert dispatched is not None
+    handler, match = dispatched
+    assert handler == "run"
+    assert match.groups() == ("RUN", "true")
+
+
+def test_dispatch_empty() -> None:
+    assert Dispatcher[str](()).dispatch("anything") is None
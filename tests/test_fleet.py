@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest.mock import Mock, patch
+
+from ruamel.yaml import YAML
+
+from pre_commit_hooks import fleet, network
+
+
+if TYPE_CHECKING:
+    import pytest
+
+
+WORKFLOW = (
+    "steps:\n  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6\n"
+)
+COMPOSE = "services:\n  app:\n    image: nginx:1.27\n"
+
+
+def test_fleet(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    git_repo = tmp_path / "git-repo"
+    (git_repo / ".github/workflows").mkdir(parents=True)
+    (git_repo / ".github/workflows/ci.yml").write_text(WORKFLOW)
+    (git_repo / "docker-compose.yml").write_text(COMPOSE)
+    for command in (["init", "-q"], ["add", "."]):
+        subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+            ["git", *command],  # ruff:ignore[start-process-with-partial-path]
+            cwd=git_repo,
+            check=True,
+        )
+    # Untracked files are skipped, like with `pre-commit run --all-files`
+    (git_repo / "untracked.yml").write_text(WORKFLOW)
+
+    plain = tmp_path / "plain"
+    plain.mkdir()
+    (plain / "workflow.yaml").write_text(WORKFLOW)
+    (plain / "unrelated.yml").write_text("key: value\n")
+    (plain / "script.sh").write_text("echo hi\n")
+
+    (tmp_path / "repos.txt").write_text(f"{git_repo}\n{plain}\n")
+    with patch.dict(os.environ, {network.OFFLINE_ENV: "1"}):
+        assert fleet.main([f"@{tmp_path / "repos.txt"}", "--format", "jsonl"]) == 1
+
+    diagnostics = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(d["file"], d["line"], d["id"]) for d in diagnostics] == [
+        (f"{git_repo}/.github/workflows/ci.yml", 2, "major"),
+        (f"{git_repo}/docker-compose.yml", 3, None),
+        (f"{plain}/workflow.yaml", 2, "major"),
+    ]
+
+
+def test_fix(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    script = tmp_path / "script.sh"
+    script.write_text("#!/bin/bash\nfunction f {\n  :\n}\n")
+    (tmp_path / "bin").mkdir()
+    # Detected by its shebang
+    (tmp_path / "bin/tool").write_text("#!/usr/bin/env bash\nset -euo pipefail\n")
+
+    assert fleet.main([str(tmp_path), "--hook", "set-euo-pipefail"]) == 1
+    assert capsys.readouterr().out == (
+        f"({script}:2) Error: No `set -euo pipefail` found at start of script\n"
+    )
+
+    assert fleet.main([str(tmp_path), "--hook", "shfuncdecfmt"]) == 1
+    assert capsys.readouterr().out == (
+        f"({script}) Error: shfuncdecfmt can fix this file, run with --fix\n"
+    )
+    assert fleet.main([str(tmp_path), "--hook", "shfuncdecfmt", "--fix"]) == 1
+    assert fleet.main([str(tmp_path), "--hook", "shfuncdecfmt"]) == 0
+    assert script.read_text() != "#!/bin/bash\nfunction f {\n  :\n}\n"
+
+
+def test_hooks_of_a_file_run_together(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    script = tmp_path / "script.sh"
+    script.write_text("#!/bin/bash\nfunction f {\n  :\n}\n")
+    process = Mock(wraps=fleet.process)
+    monkeypatch.setattr(fleet, "process", process)
+
+    hooks = ["--hook", "shfuncdecfmt", "--hook", "set-euo-pipefail"]
+    assert fleet.main([str(tmp_path), *hooks, "--fix"]) == 1
+    # So their fixes can't overwrite each other
+    assert process.call_count == 1
+    assert script.read_text() != "#!/bin/bash\nfunction f {\n  :\n}\n"
+    assert capsys.readouterr().out == (
+        f"({script}:2) Error: No `set -euo pipefail` found at start of script\n"
+    )
+
+
+def test_file_rules_match_the_hooks() -> None:
+    hooks_file = Path(__file__).parents[1] / ".pre-commit-hooks.yaml"
+    hooks = {hook["id"]: hook for hook in YAML(typ="safe").load(hooks_file)}
+    for hook_id, (pattern, types) in fleet.FILE_RULES.items():
+        assert (pattern.pattern if pattern else None) == hooks[hook_id].get("files")
+        assert types == frozenset(hooks[hook_id].get("types", []))
@@ -12,7 +12,8 @@ class TC(TCBase):
     hook_module = gha
 
     def __init__(self, inp: str, retval: int) -> None:
-        super().__init__(inp, retval, [inp])
+        # The mocks are of the REST API
+        super().__init__(inp, retval, [inp, "--resolver", "rest"])
 
     def run(self, *args, **kwargs) -> None:  # ruff:ignore[missing-type-args, missing-type-kwargs]
         removed = {
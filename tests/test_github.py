@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import re
+import subprocess
+import time
+from typing import TYPE_CHECKING
+from unittest.mock import Mock, patch
+
+import pytest
+import responses
+from responses import matchers
+
+from pre_commit_hooks import cache, gha, github, network
+from pre_commit_hooks.ratelimit import Scheduler
+from pre_commit_hooks.report import collect
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from requests import PreparedRequest
+
+
+ACTIONS = [f"owner/action-{i}" for i in range(6)]
+WORKFLOW = "".join(f"  - uses: {action}@v1\n" for action in ACTIONS)
+REPOSITORY_RE = re.compile(r'(r\d+): repository\(owner: "(.*?)", name: "(.*?)"\)')
+
+pytestmark = pytest.mark.usefixtures("fresh")
+
+
+@pytest.fixture
+def fresh(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(network, "gh_token", functools.cache(lambda: "token"))
+    # Without the tokens that earlier tests took
+    monkeypatch.setattr(network, "scheduler", Scheduler())
+    monkeypatch.setattr(network, "rate_limited_hosts", set())
+    monkeypatch.setattr(network, "unreachable_warned", set())
+    github.get_resolver.cache_clear()
+    network.batches.clear()
+    network.fetch.cache_clear()
+    network.unreachable_until.clear()
+    yield
+    github.get_resolver.cache_clear()
+    network.batches.clear()
+    network.fetch.cache_clear()
+
+
+def sha(repo: str) -> str:
+    return repo[-1] * 40
+
+
+def graphql(request: PreparedRequest) -> tuple[int, dict[str, str], str]:
+    # Answers like the GraphQL API, with a `v1` branch and `v1.2.3` tag per repo
+    assert request.body is not None
+    query = json.loads(request.body)["query"]
+    data: dict[str, object] = {}
+    for alias, owner, name in REPOSITORY_RE.findall(query):
+        repo = f"{owner}/{name}"
+        if name == "missing":
+            data[alias] = None
+            continue
+        result: dict[str, object] = {"f0": {"target": {"oid": sha(repo)}}}
+        if "tags: refs(" in query:
+            # An annotated tag
+            result["tags"] = {
+                "nodes": [
+                    {
+                        "name": "v1.2.3",
+                        "target": {"oid": "f" * 40, "target": {"oid": sha(repo)}},
+                    }
+                ],
+                "pageInfo": {"hasNextPage": False, "endCursor": "c1"},
+            }
+        data[alias] = result
+    return 200, {}, json.dumps({"data": data})
+
+
+@responses.activate
+def test_graphql_batches_lookups(tmp_path: Path) -> None:
+    responses.add_callback(responses.POST, github.GRAPHQL_URL, callback=graphql)
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    assert gha.main([str(file), "--resolver", "graphql"]) == 1
+    assert file.read_text() == "".join(
+        f"  - uses: {action}@{sha(action)} # v1.2.3\n" for action in ACTIONS
+    )
+    # The refs and tags of all repositories in a single query
+    assert len(responses.calls) == 1
+    assert responses.calls[0].request.headers["Authorization"] == "token token"
+
+
+@responses.activate
+def test_graphql_unplanned_lookups() -> None:
+    responses.add_callback(responses.POST, github.GRAPHQL_URL, callback=graphql)
+    resolver = github.get_resolver("graphql")
+
+    assert resolver.commit("owner/action-3", "v1") == sha("owner/action-3")
+    assert resolver.tags("owner/action-3") == [("v1.2.3", sha("owner/action-3"))]
+    assert resolver.commit("owner/action-3", "v1") == sha("owner/action-3")
+    assert resolver.tags("owner/missing") is None
+    assert len(responses.calls) == 3
+
+
+def paged_tags(request: PreparedRequest) -> tuple[int, dict[str, str], str]:
+    # Two pages of tags; the tag of commit `a...` is on the second one
+    assert request.body is not None
+    second = 'after: "c1"' in json.loads(request.body)["query"]
+    names = [f"v1.{i}.0" for i in range(100, 200)] if second else ["v2.0.0"] * 100
+    nodes = [
+        {"name": name, "target": {"oid": ("a" if name == "v1.150.0" else "b") * 40}}
+        for name in names
+    ]
+    page_info = {"hasNextPage": not second, "endCursor": "c1"}
+    return (
+        200,
+        {},
+        json.dumps({"data": {"r0": {"tags": {"nodes": nodes, "pageInfo": page_info}}}}),
+    )
+
+
+@responses.activate
+def test_graphql_tags_are_paged_lazily() -> None:
+    responses.add_callback(responses.POST, github.GRAPHQL_URL, callback=paged_tags)
+    resolver = github.get_resolver("graphql")
+
+    assert resolver.matching_tags(
+        "owner/action", "b" * 40, prefix=None, enough=is_full_version
+    ) == ["v2.0.0"]
+    assert len(responses.calls) == 1
+    assert resolver.matching_tags(
+        "owner/action", "a" * 40, prefix=None, enough=is_full_version
+    ) == ["v1.150.0"]
+    assert len(responses.calls) == 2
+    # All pages were looked up now
+    tags = resolver.tags("owner/action")
+    assert tags is not None
+    assert len(tags) == 200
+    assert len(responses.calls) == 2
+
+
+def is_full_version(tag: str) -> bool:
+    return tag.count(".") == 2
+
+
+def add_tags_page(page: int, tags: list[tuple[str, str]]) -> None:
+    responses.get(
+        "https://api.github.com/repos/owner/action/tags",
+        json=[{"name": name, "commit": {"sha": sha}} for name, sha in tags],
+        match=[matchers.query_param_matcher({"per_page": "100", "page": str(page)})],
+    )
+
+
+@responses.activate
+def test_rest_tags_are_paged_lazily() -> None:
+    old = "a" * 40
+    add_tags_page(1, [(f"v2.0.{i}", "b" * 40) for i in range(100)])
+    add_tags_page(2, [("v1", old), ("v1.0.0", old), *[("v0.1.0", "c" * 40)] * 98])
+    add_tags_page(3, [("v0.0.1", old)])
+    resolver = github.RestResolver()
+
+    assert resolver.matching_tags(
+        "owner/action", old, prefix=None, enough=is_full_version
+    ) == ["v1", "v1.0.0"]
+    # Stopped at the first full version
+    assert len(responses.calls) == 2
+    assert resolver.tags("owner/action") == [
+        *[(f"v2.0.{i}", "b" * 40) for i in range(100)],
+        ("v1", old),
+        ("v1.0.0", old),
+        *[("v0.1.0", "c" * 40)] * 98,
+        ("v0.0.1", old),
+    ]
+
+
+@responses.activate
+def test_rest_tags_with_prefix() -> None:
+    commit = "a" * 40
+    responses.get(
+        "https://api.github.com/repos/owner/action/git/matching-refs/tags/v1",
+        json=[
+            {"ref": "refs/tags/v1", "object": {"sha": commit, "type": "commit"}},
+            {"ref": "refs/tags/v1-beta", "object": {"sha": commit, "type": "commit"}},
+            {"ref": "refs/tags/v1.0.0", "object": {"sha": "b" * 40, "type": "tag"}},
+            {"ref": "refs/tags/v1.0.1", "object": {"sha": "c" * 40, "type": "tag"}},
+        ],
+    )
+    responses.get(
+        "https://api.github.com/repos/owner/action/git/tags/" + "b" * 40,
+        json={"object": {"sha": commit, "type": "commit"}},
+    )
+    # Not found with the prefix, so all tags are searched
+    responses.get(
+        "https://api.github.com/repos/owner/action/git/matching-refs/tags/v2",
+        json=[],
+    )
+    add_tags_page(1, [("v1.0.0", commit)])
+    resolver = github.RestResolver()
+
+    assert resolver.matching_tags(
+        "owner/action", commit, prefix="v1", enough=is_full_version
+    ) == ["v1", "v1.0.0"]
+    # The annotated tag after the full version isn't peeled
+    assert len(responses.calls) == 2
+    assert resolver.matching_tags(
+        "owner/action", commit, prefix="v2", enough=is_full_version
+    ) == ["v1.0.0"]
+
+
+def test_expired_resolvers_are_not_flushed() -> None:
+    for _ in range(5):
+        github.get_resolver("graphql")
+        github.get_resolver("git")
+        network.clear_lookups()
+    assert network.batches == []
+    resolver = github.get_resolver("git")
+    assert isinstance(resolver, github.GitResolver)
+    assert network.batches == [resolver.flush]
+
+
+def test_auto_resolver() -> None:
+    resolver = github.get_resolver("auto")
+    assert isinstance(resolver, github.AutoResolver)
+    assert isinstance(resolver.backend, github.GraphQLResolver)
+
+
+def test_auto_resolver_without_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(network, "gh_token", lambda: None)
+    resolver = github.get_resolver("auto")
+    assert isinstance(resolver, github.AutoResolver)
+    assert isinstance(resolver.backend, github.RestResolver)
+
+
+def git(*args: str, cwd: Path) -> str:
+    return subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        ["git", *args],  # ruff:ignore[start-process-with-partial-path]
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def remotes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    # Bare repositories for `ACTIONS[:2]`, with a `v1` branch and `v1.2.3` tag.
+    #  Returns the commit they point to.
+    source = tmp_path / "source"
+    source.mkdir()
+    git("init", "-q", cwd=source)
+    (source / "action.yml").write_text("name: action\n")
+    git("add", ".", cwd=source)
+    identity = ("-c", "user.name=test", "-c", "user.email=test@example.com")
+    git(*identity, "commit", "-qm", "Add action", cwd=source)
+    # An annotated tag, which ls-remote lists both unpeeled and peeled
+    git(*identity, "tag", "-a", "v1.2.3", "-m", "v1.2.3", cwd=source)
+    git("branch", "v1", cwd=source)
+    for action in ACTIONS[:2]:
+        git("clone", "-q", "--bare", str(source), str(tmp_path / action), cwd=source)
+    monkeypatch.setattr(github, "GIT_URL", f"file://{tmp_path}/{{}}")
+    # Without a token, to show it isn't needed
+    monkeypatch.setattr(network, "gh_token", lambda: None)
+    return git("rev-parse", "HEAD", cwd=source)
+
+
+def test_git(remotes: str) -> None:
+    resolver = github.get_resolver("git")
+
+    assert resolver.commit("owner/action-0", "v1") == remotes
+    assert resolver.commit("owner/action-0", "v1.2.3") == remotes
+    assert resolver.commit("owner/action-0", "v2") is None
+    assert resolver.tags("owner/action-0") == [("v1.2.3", remotes)]
+    assert resolver.tags("owner/missing") is None
+
+
+def test_git_lists_each_repository_once(
+    tmp_path: Path, remotes: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[str] = []
+    ls_remote = github.ls_remote
+
+    def counting(repo: str) -> dict[str, str] | None:
+        calls.append(repo)
+        return ls_remote(repo)
+
+    monkeypatch.setattr(github, "ls_remote", counting)
+    file = tmp_path / "workflow.yml"
+    file.write_text("".join(f"  - uses: {action}@v1\n" for action in ACTIONS[:2]))
+
+    assert gha.main([str(file), "--resolver", "git"]) == 1
+    assert file.read_text() == "".join(
+        f"  - uses: {action}@{remotes} # v1.2.3\n" for action in ACTIONS[:2]
+    )
+    # Both the branch and the tags of a repository from a single listing
+    assert sorted(calls) == ACTIONS[:2]
+
+
+@pytest.mark.usefixtures("remotes")
+def test_git_offline() -> None:
+    resolver = github.get_resolver("git")
+    with (
+        patch.dict(os.environ, {network.OFFLINE_ENV: "1"}),
+        pytest.raises(network.Unreachable),
+    ):
+        resolver.tags("owner/action-0")
+
+
+@responses.activate
+def test_graphql_rate_limited(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    responses.post(
+        github.GRAPHQL_URL,
+        json={
+            "data": None,
+            "errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}],
+        },
+        # GitHub answers 200, with the reset in the headers
+        headers={
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(int(time.time()) + 30 * 60),
+        },
+    )
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    assert gha.main([str(file), "--resolver", "graphql"]) == 1
+    assert file.read_text() == WORKFLOW
+    assert capsys.readouterr().out.count("the rate limit of api.github.com") == 1
+    with collect(), pytest.raises(network.RateLimited):
+        github.get_resolver("graphql").commit("owner/action-0", "v1")
+    # The host is paused, so later requests aren't made
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_graphql_invalid_token(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    responses.post(github.GRAPHQL_URL, status=401, json={"message": "Bad credentials"})
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    assert gha.main([str(file), "--resolver", "graphql"]) == 1
+    assert file.read_text() == WORKFLOW
+    out = capsys.readouterr().out
+    assert out.count("GitHub GraphQL queries fail (401") == 1
+    with pytest.raises(network.Unreachable):
+        github.get_resolver("graphql").tags("owner/action-0")
+    # Not tried again after the first failure
+    assert len(responses.calls) == 1
+
+
+def test_matching_tags_are_cached_per_prefix(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    # Finds `{prefix}.0` as the only tag of every commit
+    resolver = Mock(spec=github.Resolver)
+    resolver.matching_tags.side_effect = lambda *_args, prefix, **_kwargs: [
+        f"{prefix}.0"
+    ]
+    cache.open_cache()
+    try:
+        for prefix in ("v1", "v2", "v1"):
+            assert gha.get_matching_tags(
+                "owner/action", "a" * 40, resolver=resolver, prefix=prefix
+            ) == [f"{prefix}.0"]
+    finally:
+        cache.close_cache()
+    # The second lookup with `v1` was cached
+    assert resolver.matching_tags.call_count == 2
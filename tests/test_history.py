@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import subprocess
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import history
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+PINNED = (
+    "  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6.0.1\n"
+)
+MAJOR = "  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6\n"
+
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        [  # ruff:ignore[start-process-with-partial-path]
+            "git",
+            "-c",
+            "user.name=test",
+            "-c",
+            "user.email=test@example.com",
+            *args,
+        ],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def commit(repo: Path, files: dict[str, str], message: str) -> str:
+    for name, content in files.items():
+        (repo / name).parent.mkdir(parents=True, exist_ok=True)
+        (repo / name).write_text(content)
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", message)
+    return git(repo, "rev-parse", "HEAD")[:12]
+
+
+def test_history(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        ["git", "init", "-q", str(tmp_path)],  # ruff:ignore[start-process-with-partial-path]
+        check=True,
+    )
+    workflow = ".github/workflows/ci.yml"
+    commit(tmp_path, {workflow: f"steps:\n{PINNED}"}, "Add CI")
+    introduced = commit(tmp_path, {workflow: f"steps:\n{MAJOR}"}, "Use v6")
+    # Moving the problem to another line doesn't introduce it again
+    commit(tmp_path, {workflow: f"steps:\n{PINNED}{MAJOR}", "README": "hi\n"}, "More")
+    # Neither does copying the file, which is only analysed once
+    copied = commit(tmp_path, {"other.yml": f"steps:\n{PINNED}{MAJOR}"}, "Copy")
+
+    assert history.main(["--repo", str(tmp_path), "--stats"]) == 1
+    message = (
+        "Error: [major] version contains only one part (major). "
+        "Can the version be pinned further?"
+    )
+    assert capsys.readouterr().out == (
+        f"({introduced}:{workflow}:2) {message}\n"
+        f"({copied}:other.yml:3) {message}\n"
+        "Analysed 3 distinct files in 4 commits\n"
+    )
+
+    # Only commits in the range
+    assert history.main(["--repo", str(tmp_path), f"{introduced}..HEAD"]) == 1
+    assert capsys.readouterr().out == f"({copied}:other.yml:3) {message}\n"
+
+
+def test_merges(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    git(tmp_path, "init", "-q", "-b", "main")
+    workflow = ".github/workflows/ci.yml"
+    commit(tmp_path, {workflow: f"steps:\n{PINNED}"}, "Add CI")
+    git(tmp_path, "checkout", "-qb", "branch")
+    introduced = commit(tmp_path, {workflow: f"steps:\n{MAJOR}"}, "Use v6")
+    git(tmp_path, "checkout", "-q", "main")
+    # The commits of both branches are interleaved, but compared to their parents
+    other = commit(tmp_path, {"other.yml": f"steps:\n{PINNED}{MAJOR}"}, "Other")
+    git(tmp_path, "merge", "-q", "--no-ff", "-m", "Merge", "branch")
+
+    assert history.main(["--repo", str(tmp_path)]) == 1
+    message = (
+        "Error: [major] version contains only one part (major). "
+        "Can the version be pinned further?"
+    )
+    # Not again for the merge, which has the problems of both its parents
+    assert sorted(capsys.readouterr().out.splitlines()) == sorted([
+        f"({introduced}:{workflow}:2) {message}",
+        f"({other}:other.yml:3) {message}",
+    ])
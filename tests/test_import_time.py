@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import re
+import subprocess
+import sys
+import tomllib
+from pathlib import Path
+
+import pytest
+
+
+here = Path(__file__).parent
+
+with (here.parent / "pyproject.toml").open("rb") as f:
+    entry_points = sorted({
+        script.split(":")[0]
+        for script in tomllib.load(f)["project"]["scripts"].values()
+    })
+
+# Only imported on first use, so hooks that don't need them don't pay for them
+LAZY_MODULES = (
+    "concurrent.futures",
+    "ghtoken",
+    "requests",
+    "ruamel.yaml",
+    "sqlite3",
+    "termcolor",
+)
+# Cumulative import time of a hook module. This is generous, so it only fails
+#  when something heavy is imported at module level again.
+BUDGET_US = 150_000
+
+
+@pytest.mark.parametrize("module", entry_points)
+def test_import_time(module: str) -> None:
+    result = subprocess.run(  # ruff:ignore[subprocess-without-shell-equals-true]
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import sys, {module}; print(*sorted(sys.modules))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    imported = set(result.stdout.split())
+    assert not imported.intersection(LAZY_MODULES)
+
+    match = re.search(
+        rf"^import time:\s*\d+ \|\s*(\d+) \| {re.escape(module)}$",
+        result.stderr,
+        flags=re.MULTILINE,
+    )
+    assert match is not None
+    assert int(match.group(1)) < BUDGET_US
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import subprocess
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+import pytest
+
+from pre_commit_hooks import docker_apt_renovate
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def git(*args: str) -> None:
+    subprocess.run(["git", *args], check=True, capture_output=True)  # ruff:ignore[subprocess-without-shell-equals-true, start-process-with-partial-path]
+
+
+@pytest.mark.parametrize("name", ["Dockerfile", "my Dockerfile", 'my "Dockerfile"'])
+def test_only_changed_lines_are_reported(
+    name: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    dockerfile = tmp_path / name
+    dockerfile.write_text(
+        "FROM debian:trixie\nRUN apt-get install -y \\\n    curl \\\n    gosu\n"
+    )
+    git("init", "-q")
+    git("add", name)
+    git(
+        "-c",
+        "user.name=test",
+        "-c",
+        "user.email=test@example.com",
+        "commit",
+        "-qm",
+        ".",
+    )
+
+    # State from the unchanged `FROM` and `RUN` lines is still used
+    dockerfile.write_text(
+        "FROM debian:trixie\nRUN apt-get install -y \\\n    curl \\\n    jq \\\n    gosu\n"
+    )
+    with patch.object(docker_apt_renovate, "is_connected", return_value=False):
+        assert docker_apt_renovate.main([name, "--incremental"]) == 1
+
+    assert capsys.readouterr().out == f"({name}:4) Error: [unpinned] 'jq' is unpinned\n"
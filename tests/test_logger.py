@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks.logger import Error, Logger
+
+
+if TYPE_CHECKING:
+    import pytest
+
+
+class Unformattable:
+    def __format__(self, format_spec: str) -> str:
+        raise AssertionError
+
+
+def test_line_logger_is_reused(capsys: pytest.CaptureFixture[str]) -> None:
+    file_logger = Logger.from_file(Path("file"))
+    line_logger = file_logger.with_line(0, None)
+
+    line_logger.at_line(2, "some-id")
+    assert not line_logger.error(id="some-id", msg="allowed")
+    line_logger.at_line(4, None)
+    assert line_logger.error(id="some-id", msg="{} is not allowed", args=("this",))
+    line_logger.at_line(5, None, quiet=True)
+    assert not line_logger.error("quiet")
+
+    file_logger.consume(line_logger)
+    assert file_logger.retval == 1
+    assert capsys.readouterr().out.splitlines() == [
+        "(file:5) Error: [some-id] this is not allowed"
+    ]
+
+
+def test_allowed_errors_are_not_formatted() -> None:
+    logger = Logger(Path("file"), lnr=0, allow="some-id")
+    assert not logger.error(id="some-id", msg="{}", args=(Unformattable(),))
+    assert str(Error("id", "{} and {}", ("a", "b"))) == "[id] a and b"
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import pytest
+import responses
+
+from pre_commit_hooks import network
+from pre_commit_hooks.lsp import Server
+from tests.base import fs_url_decode
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+here = Path(__file__).parent
+URI = "file:///project/.github/workflows/ci.yml"
+
+
+class Client:
+    """Talks to a server running in a thread, like an editor would."""
+
+    def __init__(self) -> None:
+        server_in, self.server_in = os.pipe()
+        self.server_out, server_out = os.pipe()
+        self.writer = os.fdopen(self.server_in, "wb")
+        self.reader = os.fdopen(self.server_out, "rb")
+        self.server = Server(os.fdopen(server_in, "rb"), os.fdopen(server_out, "wb"))
+        self.exit_code: int | None = None
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+        self.next_id = 0
+        self.version = 0
+
+    def serve(self) -> None:
+        self.exit_code = self.server.serve()
+
+    def send(self, message: dict[str, Any]) -> None:
+        body = json.dumps({"jsonrpc": "2.0", **message}).encode()
+        self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        self.writer.flush()
+
+    def receive(self) -> Any:  # ruff:ignore[any-type]
+        length = int(self.reader.readline().split(b":")[1])
+        self.reader.readline()
+        return json.loads(self.reader.read(length))
+
+    def request(self, method: str, params: Any = None) -> Any:  # ruff:ignore[any-type]
+        self.next_id += 1
+        self.send({"id": self.next_id, "method": method, "params": params})
+        return self.receive()
+
+    def notify(self, method: str, params: Any) -> Any:  # ruff:ignore[any-type]
+        # Returns the published diagnostics, if any
+        self.send({"method": method, "params": params})
+        if method.startswith("textDocument/did"):
+            message = self.receive()
+            assert message["method"] == "textDocument/publishDiagnostics"
+            return message["params"]["diagnostics"]
+        return None
+
+    def open(self, text: str) -> Any:  # ruff:ignore[any-type]
+        self.version = 1
+        return self.notify(
+            "textDocument/didOpen",
+            {
+                "textDocument": {
+                    "uri": URI,
+                    "languageId": "yaml",
+                    "version": self.version,
+                    "text": text,
+                }
+            },
+        )
+
+    def change(self, line: int, start: int, end: int, text: str) -> Any:  # ruff:ignore[any-type]
+        self.version += 1
+        return self.notify(
+            "textDocument/didChange",
+            {
+                "textDocument": {"uri": URI, "version": self.version},
+                "contentChanges": [
+                    {
+                        "range": {
+                            "start": {"line": line, "character": start},
+                            "end": {"line": line, "character": end},
+                        },
+                        "text": text,
+                    }
+                ],
+            },
+        )
+
+    def close(self) -> None:
+        assert self.request("shutdown")["result"] is None
+        self.notify("exit", None)
+        self.thread.join()
+        self.writer.close()
+        self.reader.close()
+
+
+@pytest.fixture
+def no_fixes(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Fixes are resolved in the background, possibly after the test
+    monkeypatch.setenv(network.OFFLINE_ENV, "1")
+
+
+def make_client() -> Iterator[Client]:
+    client = Client()
+    response = client.request("initialize", {"capabilities": {}})
+    assert response["result"]["capabilities"]["codeActionProvider"]
+    yield client
+    client.close()
+    assert client.exit_code == 0
+
+
+def codes(diagnostics: list[Any]) -> list[tuple[int, str]]:
+    return [(d["range"]["start"]["line"], d["code"]) for d in diagnostics]
+
+
+@pytest.mark.usefixtures("no_fixes")
+def test_diagnostics() -> None:
+    for client in make_client():
+        diagnostics = client.open(
+            "steps:\n"
+            "  - uses: actions/checkout@v6.0.1\n"
+            "  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6\n"
+        )
+        assert codes(diagnostics) == [(1, "no-digest"), (2, "major")]
+        assert diagnostics[1]["severity"] == 1
+        assert diagnostics[1]["source"] == "gha-pin"
+
+        # Typing on a line only changes the diagnostics of that line
+        end = len(
+            "  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6"
+        )
+        assert codes(client.change(2, end, end, ".0.1")) == [(1, "no-digest")]
+        assert codes(client.change(0, 6, 6, "\n  - uses: actions/checkout@main")) == [
+            (1, "no-digest"),
+            (1, "main"),
+            (2, "no-digest"),
+        ]
+
+        assert (
+            client.notify("textDocument/didClose", {"textDocument": {"uri": URI}}) == []
+        )
+        assert client.request("textDocument/hover", {})["error"]["code"] == -32601
+
+
+@responses.activate
+def test_code_action() -> None:
+    for mock in (here / "mocks").iterdir():
+        responses.get(url=fs_url_decode(mock.name), body=mock.read_text())
+
+    for client in make_client():
+        # Diagnostics never wait on the network, fixes are resolved in the background
+        client.open("steps:\n  - uses: actions/checkout@v6.0.1\n")
+        deadline = time.monotonic() + 5
+        actions: list[Any] = []
+        while not actions and time.monotonic() < deadline:
+            actions = client.request(
+                "textDocument/codeAction",
+                {
+                    "textDocument": {"uri": URI},
+                    "range": {
+                        "start": {"line": 1, "character": 0},
+                        "end": {"line": 1, "character": 0},
+                    },
+                    "context": {"diagnostics": []},
+                },
+            )["result"]
+            time.sleep(0.01)
+
+        (action,) = actions
+        (edit,) = action["edit"]["changes"][URI]
+        assert edit["range"]["start"] == {"line": 1, "character": 0}
+        assert edit["newText"] == (
+            "  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6.0.1\n"
+        )
+
+
+@pytest.mark.usefixtures("no_fixes")
+def test_keystroke_latency() -> None:
+    # Only the edited line is checked again, so typing stays fast in large files
+    line = (
+        "  - uses: actions/checkout@8e8c483db84b4bee98b60c0593521ed34d9990e8 # v6.0.1\n"
+    )
+    for client in make_client():
+        assert client.open(line * 20_000) == []
+        times = []
+        for _ in range(10):
+            start = time.perf_counter()
+            assert client.change(10_000, 0, 0, " ") == []
+            assert client.change(10_000, 0, 1, "") == []
+            times.append((time.perf_counter() - start) / 2)
+        assert sorted(times)[len(times) // 2] < 0.05
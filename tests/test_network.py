@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+import requests
+import responses
+
+from pre_commit_hooks import network
+from pre_commit_hooks.ratelimit import Scheduler
+from pre_commit_hooks.report import collect
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+URL = "https://api.github.com/repos/actions/checkout/tags"
+
+pytestmark = pytest.mark.usefixtures("fresh")
+
+
+@pytest.fixture
+def fresh(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(network, "BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(network, "gh_token", functools.cache(lambda: None))
+    monkeypatch.setattr(network, "scheduler", Scheduler())
+    monkeypatch.setattr(network, "rate_limited_hosts", set())
+    monkeypatch.setattr(network, "unreachable_warned", set())
+    network.sessions.clear()
+    network.fetch.cache_clear()
+    network.unreachable_until.clear()
+    yield
+    network.sessions.clear()
+    network.fetch.cache_clear()
+    network.unreachable_until.clear()
+
+
+def test_sessions_per_host() -> None:
+    github = network.session(URL)
+    assert (
+        network.session("https://api.github.com/repos/actions/setup-python") is github
+    )
+    assert network.session("https://packages.debian.org/trixie/curl") is not github
+
+
+@responses.activate
+def test_transient_errors_are_retried() -> None:
+    responses.get(URL, status=503)
+    responses.get(URL, status=502)
+    responses.get(URL, json=[{"name": "v6"}])
+    assert network.request(URL) == [{"name": "v6"}]
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_retries_run_out() -> None:
+    responses.get(URL, status=503)
+    with pytest.raises(requests.HTTPError, match="503"):
+        network.request(URL)
+    assert len(responses.calls) == network.RETRIES + 1
+
+
+@responses.activate
+def test_unreachable_hosts_are_not_tried_again() -> None:
+    responses.get(URL, body=requests.ConnectionError("connection refused"))
+    responses.get("https://packages.debian.org/trixie/curl", body="curl")
+    with collect() as diagnostics:
+        for url in (URL, "https://api.github.com/repos/actions/setup-python/tags"):
+            with pytest.raises(network.Unreachable):
+                network.request(url)
+    assert len(responses.calls) == 1
+    assert [d.message.split(" (")[0] for d in diagnostics] == [
+        "can't reach api.github.com"
+    ]
+    assert network.request("https://packages.debian.org/trixie/curl", json=False)
+
+    # Also not by other processes, for a while
+    network.fetch.cache_clear()
+    network.unreachable_until.clear()
+    with collect(), pytest.raises(network.Unreachable):
+        network.request(URL)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_offline_switch(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(network.OFFLINE_ENV, "1")
+    with pytest.raises(network.Unreachable):
+        network.request(URL)
+    assert len(responses.calls) == 0
+    assert not network.is_connected(URL)
+
+    monkeypatch.setenv(network.OFFLINE_ENV, "0")
+    assert network.is_connected(URL)
+
+
+@responses.activate
+def test_rate_limits_are_waited_for() -> None:
+    responses.get(URL, status=429, headers={"Retry-After": "0.2"})
+    responses.get(URL, json=[], headers={"X-RateLimit-Remaining": "42"})
+    start = time.monotonic()
+    assert network.request(URL) == []
+    assert time.monotonic() - start >= 0.2
+    assert len(responses.calls) == 2
+    assert network.scheduler.budget() == {"api.github.com": 42}
+
+
+@responses.activate
+def test_rate_limits_that_keep_coming_back() -> None:
+    responses.get(URL, status=429, headers={"Retry-After": "0"})
+    with collect() as diagnostics, pytest.raises(network.RateLimited):
+        network.request(URL)
+    assert len(responses.calls) == network.RATE_LIMIT_RETRIES + 1
+    assert [d.message.split(",")[0] for d in diagnostics] == [
+        "the rate limit of api.github.com won't reset soon"
+    ]
+
+
+@responses.activate
+def test_rate_limits_that_reset_later() -> None:
+    responses.get(
+        URL,
+        status=403,
+        headers={
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(int(time.time()) + 30 * 60),
+        },
+    )
+    with collect() as diagnostics:
+        for url in (URL, "https://api.github.com/repos/actions/setup-python/tags"):
+            # Skipped like when the host can't be reached
+            with pytest.raises(network.Unreachable):
+                network.request(url)
+    assert len(responses.calls) == 1
+    assert [d.message.split(",")[0] for d in diagnostics] == [
+        "the rate limit of api.github.com won't reset soon"
+    ]
+    assert network.scheduler.budget() == {"api.github.com": 0}
+
+
+@responses.activate
+def test_other_forbidden_responses_are_not_retried() -> None:
+    responses.get(URL, status=403)
+    with pytest.raises(requests.HTTPError, match="403"):
+        network.request(URL)
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_lookups_in_memory_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    responses.get(URL, json=[])
+    network.request(URL)
+    network.request(URL)
+    assert len(responses.calls) == 1
+
+    assert not network.expire_lookups()
+    monkeypatch.setattr(
+        network, "lookups_cleared", time.monotonic() - network.FRESH_TTL
+    )
+    assert network.expire_lookups()
+    network.request(URL)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_hosts_that_dont_answer_fail_fast() -> None:
+    responses.get(URL, json=[])
+    network.request(URL)
+    (call,) = responses.calls
+    assert call.request.req_kwargs["timeout"] == (
+        network.CONNECT_TIMEOUT,
+        network.READ_TIMEOUT,
+    )
+    # Not retried, `Retry` would wait for the connect timeout every time
+    retry = network.session(URL).get_adapter(URL).max_retries
+    assert retry.connect == 0
+    assert retry.total == network.RETRIES
+
+
+@responses.activate
+def test_warnings_are_reset_per_run() -> None:
+    responses.get(URL, body=requests.ConnectionError("connection refused"))
+    with collect() as diagnostics, pytest.raises(network.Unreachable):
+        network.request(URL)
+    assert len(diagnostics) == 1
+
+    # Like the next request of the daemon
+    network.clear_lookups()
+    with collect() as diagnostics:
+        assert not network.is_connected(URL)
+    assert diagnostics == []
+    network.reset_warnings()
+    with collect() as diagnostics:
+        assert not network.is_connected(URL)
+    assert [d.message.split(" (")[0] for d in diagnostics] == [
+        "can't reach api.github.com"
+    ]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from pre_commit_hooks import cache, docker
+
+
+here = Path(__file__).parent
+files = [str(here / "docker/docker-compose.yml"), str(here / "docker/Dockerfile")]
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_parallel_matches_sequential(
+    executor: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(docker.Processor, "executor", executor)
+
+    sequential_retval = docker.main([*files, "--jobs", "1"])
+    sequential_out = capsys.readouterr().out
+
+    assert docker.main([*files, "--jobs", "2"]) == sequential_retval
+    assert capsys.readouterr().out == sequential_out
+
+
+# Runs in a forked worker
+def inherited_cache() -> bool:
+    return cache.current is not None
+
+
+def test_forked_workers_open_their_own_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache.open_cache()
+    try:
+        with ProcessPoolExecutor(
+            1, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            assert not executor.submit(inherited_cache).result()
+    finally:
+        cache.close_cache()
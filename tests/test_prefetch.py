@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+import pytest
+import requests
+import responses
+
+from pre_commit_hooks import docker_apt_renovate, gha, github, network, prefetch
+from pre_commit_hooks.ratelimit import Scheduler
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
+
+    from requests import PreparedRequest
+
+
+ACTIONS = [f"owner/action-{i}" for i in range(6)]
+WORKFLOW = "".join(f"  - uses: {action}@v1\n" for action in ACTIONS)
+
+pytestmark = pytest.mark.usefixtures("fresh")
+
+
+@pytest.fixture
+def fresh(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(network, "gh_token", lambda: None)
+    # Without the tokens that earlier tests took
+    monkeypatch.setattr(network, "scheduler", Scheduler())
+    network.fetch.cache_clear()
+    yield
+    network.fetch.cache_clear()
+
+
+class Server:
+    """Answers GitHub API requests slowly, and tracks how many run at once."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        for action in ACTIONS:
+            sha = action[-1] * 40
+            responses.add_callback(
+                responses.GET,
+                f"https://api.github.com/repos/{action}/commits/v1",
+                callback=self.respond(f'{{"sha": "{sha}"}}'),
+            )
+            responses.add_callback(
+                responses.GET,
+                f"https://api.github.com/repos/{action}/git/matching-refs/tags/v1",
+                callback=self.respond(
+                    f'[{{"ref": "refs/tags/v1.2.3", '
+                    f'"object": {{"sha": "{sha}", "type": "commit"}}}}]'
+                ),
+            )
+
+    def respond(
+        self, body: str
+    ) -> Callable[[PreparedRequest], tuple[int, dict[str, str], str]]:
+        def callback(_request: PreparedRequest) -> tuple[int, dict[str, str], str]:
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            time.sleep(0.1)
+            with self.lock:
+                self.running -= 1
+            return 200, {}, body
+
+        return callback
+
+
+@responses.activate
+def test_plan(tmp_path: Path) -> None:
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    needs, diagnostics = prefetch.plan(
+        gha.Processor,
+        gha.Processor.parse_args([str(file), "--resolver", "rest"]),
+        [file],
+    )
+    # Only the first lookup of each line; the tags are planned in the next round
+    assert needs == {
+        (f"https://api.github.com/repos/{action}/commits/v1", None, True)
+        for action in ACTIONS
+    }
+    assert diagnostics == []
+    assert len(responses.calls) == 0
+    assert file.read_text() == WORKFLOW
+
+
+def test_plan_finds_all_packages_of_a_line(tmp_path: Path) -> None:
+    file = tmp_path / "Dockerfile"
+    file.write_text("FROM debian:trixie\nRUN apt-get install -y curl git\n")
+
+    processor_type = docker_apt_renovate.Processor
+    needs, _ = prefetch.plan(
+        processor_type, processor_type.parse_args([str(file)]), [file]
+    )
+    assert needs == {
+        ("https://packages.debian.org/trixie/curl", None, False),
+        ("https://packages.debian.org/trixie/git", None, False),
+    }
+
+
+@responses.activate
+def test_lookups_are_concurrent(tmp_path: Path) -> None:
+    server = Server()
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    assert gha.main([str(file), "--resolver", "rest"]) == 1
+    assert file.read_text() == "".join(
+        f"  - uses: {action}@{action[-1] * 40} # v1.2.3\n" for action in ACTIONS
+    )
+    # Every lookup is made once, all of a round at the same time
+    assert len(responses.calls) == 2 * len(ACTIONS)
+    assert server.peak == len(ACTIONS)
+
+
+@responses.activate
+def test_lookups_per_host_are_limited(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(prefetch, "PER_HOST", 2)
+    server = Server()
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    assert gha.main([str(file), "--resolver", "rest"]) == 1
+    assert server.peak == 2
+
+
+@pytest.mark.parametrize("output_format", ["sarif", "jsonl"])
+@responses.activate
+def test_lookup_warnings_are_reported_in_the_format(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    output_format: str,
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(network, "unreachable_until", {})
+    monkeypatch.setattr(network, "unreachable_warned", set())
+    for action in ACTIONS:
+        responses.get(
+            f"https://api.github.com/repos/{action}/commits/v1",
+            body=requests.ConnectionError("connection refused"),
+        )
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    args = [str(file), "--resolver", "rest", "--format", output_format]
+    assert gha.main(args) == 1
+    out = capsys.readouterr().out
+    # The warning of the prefetch workers is part of the output, not before it
+    if output_format == "sarif":
+        (run,) = json.loads(out)["runs"]
+        messages = [result["message"]["text"] for result in run["results"]]
+    else:
+        messages = [json.loads(line)["message"] for line in out.splitlines()]
+    assert sum("can't reach api.github.com" in message for message in messages) == 1
+
+
+@responses.activate
+def test_failed_lookups_are_not_planned_again(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for action in ACTIONS:
+        responses.get(f"https://api.github.com/repos/{action}/commits/v1", status=404)
+    plan = Mock(wraps=prefetch.plan)
+    monkeypatch.setattr(prefetch, "plan", plan)
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    args = gha.Processor.parse_args([str(file), "--resolver", "rest"])
+    prefetch.prefetch(gha.Processor, args, [file])
+    # The second round finds nothing new
+    assert plan.call_count == 2
+    assert len(responses.calls) == len(ACTIONS)
+
+
+def test_failed_batches_are_not_flushed_again(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ls_remote = Mock(side_effect=network.Unreachable)
+    monkeypatch.setattr(github, "ls_remote", ls_remote)
+    plan = Mock(wraps=prefetch.plan)
+    monkeypatch.setattr(prefetch, "plan", plan)
+    github.get_resolver.cache_clear()
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    try:
+        gha.main([str(file), "--resolver", "git"])
+    finally:
+        github.get_resolver.cache_clear()
+    assert plan.call_count == 2
+    assert ls_remote.call_count == 2 * len(ACTIONS)
+
+
+def test_no_prefetch_offline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(network.OFFLINE_ENV, "1")
+    plan = Mock(wraps=prefetch.plan)
+    monkeypatch.setattr(prefetch, "plan", plan)
+    file = tmp_path / "workflow.yml"
+    file.write_text(WORKFLOW)
+
+    gha.main([str(file), "--resolver", "rest"])
+    assert plan.call_count == 0
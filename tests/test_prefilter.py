@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+from pre_commit_hooks import gha, network
+
+
+if TYPE_CHECKING:
+    import pytest
+
+
+here = Path(__file__).parent
+
+
+def test_files_without_triggers_are_skipped(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    files = [tmp_path / "basic.yaml", tmp_path / "workflow.yml"]
+    shutil.copy(here / "pccs/basic.yaml", files[0])
+    shutil.copy(here / "gha/workflow-offline.yml", files[1])
+
+    with patch.dict(os.environ, {network.OFFLINE_ENV: "1"}):
+        gha.main([*map(str, files), "--jobs", "1", "--stats"])
+
+    out = capsys.readouterr().out
+    assert "basic.yaml" not in out
+    assert "workflow.yml" in out
+    assert "Prefilter: skipped 1/2 files without triggers" in out
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import email.utils
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import ratelimit
+from pre_commit_hooks.ratelimit import Scheduler, background, parse_retry_after
+
+
+if TYPE_CHECKING:
+    import pytest
+
+
+HOST = "api.github.com"
+
+
+def test_bursts_then_rate(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(ratelimit.RATES, HOST, 20)
+    scheduler = Scheduler()
+    start = time.monotonic()
+    for _ in range(ratelimit.BURST + 2):
+        assert scheduler.acquire(HOST)
+    # Two requests more than the burst, at 20 per second
+    assert time.monotonic() - start >= 0.09
+
+
+def test_background_requests_yield(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(ratelimit.RATES, HOST, 10)
+    monkeypatch.setattr(ratelimit, "BURST", 1)
+    scheduler = Scheduler()
+    assert scheduler.acquire(HOST)
+    order = []
+
+    def acquire(name: str, *, in_background: bool) -> None:
+        background.set(in_background)
+        assert scheduler.acquire(HOST)
+        order.append(name)
+
+    threads = [
+        threading.Thread(
+            target=acquire, args=("prefetch",), kwargs={"in_background": True}
+        ),
+        threading.Thread(
+            target=acquire, args=("autofix",), kwargs={"in_background": False}
+        ),
+    ]
+    for thread in threads:
+        thread.start()
+        # The prefetch waits for a token first
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    assert order == ["autofix", "prefetch"]
+
+
+def test_long_pauses_are_not_waited_for() -> None:
+    scheduler = Scheduler()
+    headers = {
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(time.time() + 3600),
+    }
+    assert scheduler.update(HOST, 403, headers)
+    start = time.monotonic()
+    assert not scheduler.acquire(HOST)
+    assert time.monotonic() - start < 1
+    # Other hosts have a limit of their own
+    assert scheduler.acquire("packages.debian.org")
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after("120") == 120
+    in_a_minute = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 58 < parse_retry_after(in_a_minute) <= 60  # type: ignore[operator]
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import docker
+
+
+if TYPE_CHECKING:
+    import pytest
+
+
+here = Path(__file__).parent
+
+
+def run_docker(tmp_path: Path, capsys: pytest.CaptureFixture[str], *args: str) -> str:
+    file = tmp_path / "Dockerfile"
+    shutil.copy(here / "docker/Dockerfile", file)
+    assert docker.main([str(file), "--jobs", "1", *args]) == 1
+    return capsys.readouterr().out
+
+
+def test_jsonl(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    text = run_docker(tmp_path, capsys).splitlines()
+    jsonl = [
+        json.loads(line)
+        for line in run_docker(tmp_path, capsys, "--format", "jsonl").splitlines()
+    ]
+
+    assert len(jsonl) == len(text)
+    assert jsonl[0] == {
+        "file": str(tmp_path / "Dockerfile"),
+        "line": 1,
+        "level": "error",
+        "id": "weird-version",
+        "message": "version contains more than three parts (major.minor.patch.???)",
+    }
+
+
+def test_sarif(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    text = run_docker(tmp_path, capsys).splitlines()
+    sarif = json.loads(run_docker(tmp_path, capsys, "--format", "sarif"))
+
+    assert sarif["version"] == "2.1.0"
+    (run,) = sarif["runs"]
+    assert run["tool"]["driver"]["name"] == "docker"
+    assert len(run["results"]) == len(text)
+    result = run["results"][0]
+    assert result["ruleId"] == "weird-version"
+    assert result["locations"][0]["physicalLocation"]["region"] == {"startLine": 1}
+
+
+def test_group(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    text = run_docker(tmp_path, capsys).splitlines()
+    grouped = run_docker(tmp_path, capsys, "--group").splitlines()
+
+    assert len(grouped) < len(text)
+    assert sum(int(line[1 : line.index("x)")]) for line in grouped) == len(text)
+    assert (
+        "(2x) Error: [major-minor] version contains only two parts (major.minor). "
+        "Can the version be pinned further?"
+    ) in grouped
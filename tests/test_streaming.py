@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+import responses
+
+from pre_commit_hooks import bumpsync
+from pre_commit_hooks.processors import LineProcessor
+from tests import test_bumpsync, test_docker_apt_renovate, test_set_euo_pipefail
+
+
+if TYPE_CHECKING:
+    from tests.base import TCBase
+
+
+here = Path(__file__).parent
+
+
+# Run the line processor tests again, with every file being streamed
+streaming_test_cases = [
+    *test_bumpsync.test_cases,
+    *test_docker_apt_renovate.test_cases,
+    *test_set_euo_pipefail.test_cases,
+]
+
+
+@pytest.mark.parametrize(
+    "test_case",
+    streaming_test_cases,
+    ids=repr,
+)
+@responses.activate
+def test_streaming(test_case: TCBase, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(LineProcessor, "stream_threshold", 0)
+    test_case.run()
+
+
+# Fixes `single_line.py`
+def bumpsync_fix(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    bumpsync.main(["single_line.py", "--pyproject", "pyproject.toml"])
+    assert Path("single_line.py").read_text(encoding="utf-8") == (
+        here / "bumpsync/single_line-out.py"
+    ).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_fixes_keep_the_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, *, stream: bool
+) -> None:
+    if stream:
+        monkeypatch.setattr(LineProcessor, "stream_threshold", 0)
+    shutil.copy(here / "bumpsync/pyproject.toml", tmp_path)
+    file = tmp_path / "single_line.py"
+    shutil.copy(here / "bumpsync/single_line.py", file)
+    file.chmod(0o750)
+    os.utime(file, (0, 0))
+
+    bumpsync_fix(tmp_path, monkeypatch)
+    assert file.stat().st_mode & 0o777 == 0o750
+    assert file.stat().st_mtime > 0
+
+
+def test_fixes_keep_hard_links(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    shutil.copy(here / "bumpsync/pyproject.toml", tmp_path)
+    file = tmp_path / "single_line.py"
+    shutil.copy(here / "bumpsync/single_line.py", file)
+    (tmp_path / "link.py").hardlink_to(file)
+
+    bumpsync_fix(tmp_path, monkeypatch)
+    assert (tmp_path / "link.py").read_text() == file.read_text()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pre_commit_hooks import network, set_euo_pipefail, watch
+from pre_commit_hooks.logger import Logger
+
+
+if TYPE_CHECKING:
+    import pytest
+
+
+here = Path(__file__).parent
+
+
+def test_watcher_coalesces(tmp_path: Path) -> None:
+    files = [tmp_path / "a.sh", tmp_path / "b.sh", tmp_path / "c.sh"]
+    for file in files:
+        file.write_text("")
+    watcher_types: list[type[watch.Watcher]] = [watch.PollingWatcher]
+    if sys.platform == "linux":
+        watcher_types.append(watch.InotifyWatcher)
+    for watcher_type in watcher_types:
+        watcher = watcher_type(files)
+        try:
+            # A burst of saves, including an editor-style save by replacing
+            files[0].write_text("1")
+            files[0].write_text("12")
+            (tmp_path / "new").write_text("123")
+            (tmp_path / "new").replace(files[1])
+            (tmp_path / "unwatched.sh").write_text("")
+            assert watcher.wait() == set(files[:2])
+        finally:
+            watcher.close()
+
+
+def test_lookups_expire_between_runs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    shutil.copy(here / "set-euo-pipefail/good.sh", tmp_path / "good.sh")
+    monkeypatch.chdir(tmp_path)
+    args = set_euo_pipefail.Processor.parse_args(["good.sh"])
+    session = watch.Session(set_euo_pipefail.Processor, args, Logger)
+    try:
+        processor = session.processor
+        session.run(args.files)
+        assert session.processor is processor
+
+        monkeypatch.setattr(
+            network, "lookups_cleared", time.monotonic() - network.FRESH_TTL
+        )
+        session.run(args.files)
+        assert session.processor is not processor
+        assert not network.expire_lookups()
+    finally:
+        session.watcher.close()
+
+
+def test_watch(tmp_path: Path) -> None:
+    shutil.copy(here / "set-euo-pipefail/good.sh", tmp_path / "good.sh")
+    shutil.copy(here / "set-euo-pipefail/good.sh", tmp_path / "other.sh")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from pre_commit_hooks.set_euo_pipefail import main; main()",
+            "good.sh",
+            "other.sh",
+            "--watch",
+        ],
+        cwd=tmp_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    assert process.stdout is not None
+    assert process.stderr is not None
+    timer = threading.Timer(30, process.kill)
+    timer.start()
+    try:
+        assert process.stderr.readline() == "Checked 2 files, 0 with problems\n"
+        assert process.stderr.readline() == "Watching 2 files for changes...\n"
+
+        # Only the changed file is processed again
+        shutil.copy(here / "set-euo-pipefail/bad.sh", tmp_path / "good.sh")
+        assert process.stdout.readline() == (
+            "(good.sh:3) Error: No `set -euo pipefail` found at start of script\n"
+        )
+        assert process.stderr.readline() == "Checked 1 files, 1 with problems\n"
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()